@@ -0,0 +1,81 @@
+"""
+Compares detecting changes between two polls of a list of pods by
+deep equality of the whole lists, as list models used to do, against
+diffing by uid and resource version. Deep equality stops at the first
+difference, but then it can only tell that the whole list changed.
+
+    python benchmarks/diff_benchmark.py [number of items]
+"""
+import copy
+import sys
+import time
+
+from kubemgr.util.diff import diff_lists
+
+
+def make_items(count):
+    return [
+        {
+            "metadata": {
+                "name": f"pod-{i}",
+                "namespace": "default",
+                "uid": str(i),
+                "resourceVersion": str(i),
+                "labels": {"app": "web", "tier": "frontend"},
+                "managedFields": [
+                    {"manager": "kubelet", "operation": "Update", "fieldsV1": {f"f:field{j}": {} for j in range(40)}}
+                ],
+            },
+            "spec": {
+                "containers": [
+                    {"name": "main", "image": "nginx", "env": [{"name": f"VAR_{j}", "value": str(j)} for j in range(20)]}
+                ]
+            },
+            "status": {"phase": "Running", "conditions": [{"type": f"Condition{j}", "status": "True"} for j in range(4)]},
+        }
+        for i in range(count)
+    ]
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    old = make_items(count)
+    # Watchers return the same instances, a new list returns new objects
+    unchanged = copy.deepcopy(old)
+    changed = copy.deepcopy(old)
+    for item in changed[50::100]:
+        item["metadata"]["resourceVersion"] += "-1"
+        item["status"]["phase"] = "Pending"
+
+    watched = list(old)
+    for index in range(50, count, 100):
+        watched[index] = changed[index]
+
+    print(f"{count} items")
+    scenarios = [
+        ("Watch, no changes", list(old)),
+        ("Watch, 1% changed", watched),
+        ("List, no changes", unchanged),
+        ("List, 1% changed", changed),
+    ]
+    for title, new in scenarios:
+        equality_time, _ = measure(lambda: old != new)
+        diff_time, _ = measure(
+            diff_lists,
+            old,
+            new,
+            lambda item: item["metadata"]["uid"],
+            lambda item: item["metadata"]["resourceVersion"],
+        )
+        print(f"{title}:")
+        print(f"  Deep equality: {equality_time * 1000:8.1f} ms")
+        print(f"  Diff:          {diff_time * 1000:8.1f} ms ({equality_time / diff_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
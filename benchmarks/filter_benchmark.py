@@ -0,0 +1,82 @@
+"""
+Compares evaluating a filter by rendering its template for every item,
+as filters used to work, against the compiled filter engine, and
+against filtering again once only a few objects changed.
+
+    python benchmarks/filter_benchmark.py [number of items]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from jinja2 import Template
+
+from kubemgr.views.resource import Filter
+from kubemgr.views.templates import TemplateStore
+from kubemgr.views.util import BASE_JINJA_CONTEXT
+
+FILTER = """{#
+ Benchmark filter
+#}
+{{ item.metadata.namespace != 'kube-system' and item.status.phase == 'Running' }}
+"""
+
+
+def make_items(count):
+    return [
+        {
+            "metadata": {
+                "name": f"pod-{i}",
+                "namespace": "kube-system" if i % 10 == 0 else "default",
+                "uid": str(i),
+                "resourceVersion": str(i),
+            },
+            "status": {"phase": "Running" if i % 3 else "Pending"},
+        }
+        for i in range(count)
+    ]
+
+
+def render_filter(template, items):
+    result = []
+    for item in items:
+        ctx = dict(BASE_JINJA_CONTEXT)
+        ctx["item"] = item
+        if template.render(ctx).strip() == "True":
+            result.append(item)
+    return result
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    items = make_items(count)
+
+    rendered_time, rendered = measure(render_filter, Template(FILTER), items)
+    config_dir = tempfile.mkdtemp()
+    compiled_filter = Filter(FILTER, TemplateStore(config_dir, os.path.join(config_dir, "cache")))
+    compiled_time, compiled = measure(compiled_filter.filter_items, items)
+
+    assert rendered == compiled
+
+    # Next poll, with 1% of the objects changed
+    for item in items[:: 100]:
+        item["metadata"]["resourceVersion"] += "-1"
+    memoized_time, memoized = measure(compiled_filter.filter_items, items)
+
+    assert memoized == compiled
+
+    print(f"{count} items, {len(compiled)} pass the filter")
+    print(f"Template rendering: {rendered_time * 1000:8.1f} ms")
+    print(f"Compiled filter:    {compiled_time * 1000:8.1f} ms ({rendered_time / compiled_time:.1f}x)")
+    print(f"1% changed objects: {memoized_time * 1000:8.1f} ms ({rendered_time / memoized_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measures peak memory and time taken to decode a large list response,
+the way lists used to be decoded, reading the whole body then decoding
+it to a string and parsing it, against decoding items as chunks arrive.
+Decoding is measured both keeping all items, as lists without projection
+do, and keeping only projected items.
+
+    python benchmarks/list_decode_benchmark.py [number of items]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from kubemgr.projection import Projection
+from kubemgr.texts import POD_TEMPLATE
+from kubemgr.util import jsonstream
+from kubemgr.views.environment import ResourceEnvironment
+
+from projection_benchmark import make_pod
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def chunks(body):
+    for start in range(0, len(body), _CHUNK_SIZE):
+        yield body[start : start + _CHUNK_SIZE]
+
+
+def whole(body, projection):
+    data = b"".join(chunks(body))
+    items = json.loads(data.decode())["items"]
+    return [projection(item) for item in items] if projection else items
+
+
+def whole_accelerated(body, projection):
+    items = jsonstream.loads(b"".join(chunks(body)))["items"]
+    return [projection(item) for item in items] if projection else items
+
+
+def streamed(body, projection):
+    items = jsonstream.stream_list(chunks(body))["items"]
+    return [projection(item) for item in items] if projection else list(items)
+
+
+def measure(function, *args):
+    # Timed without tracing memory, as tracing slows allocations down
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    del result
+
+    tracemalloc.start()
+    result = function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    body = json.dumps(
+        {"kind": "PodList", "apiVersion": "v1", "metadata": {"resourceVersion": "1"}, "items": [make_pod(i) for i in range(count)]}
+    ).encode()
+    projection = Projection(ResourceEnvironment().item_fields(POD_TEMPLATE))
+
+    print(f"{count} pods, {len(body) / 2 ** 20:.1f} MB response, orjson {'installed' if jsonstream.orjson else 'not installed'}")
+    functions = [("Whole body", whole), ("Whole body, loads()", whole_accelerated), ("Streamed", streamed)]
+    for label, kept in [("all items kept", None), ("projected items kept", projection)]:
+        print(f"With {label}:")
+        for name, function in functions:
+            peak, elapsed = measure(function, body, kept)
+            print(f"  {name:20} peak {peak / 2 ** 20:8.1f} MB {elapsed * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
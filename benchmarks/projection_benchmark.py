@@ -0,0 +1,96 @@
+"""
+Measures the memory taken by a list of pods kept whole, as lists used
+to keep them, against keeping only the fields used by the default
+pod item template.
+
+    python benchmarks/projection_benchmark.py [number of items]
+"""
+import json
+import sys
+import tracemalloc
+
+from kubemgr.projection import Projection
+from kubemgr.texts import POD_TEMPLATE
+from kubemgr.views.environment import ResourceEnvironment
+
+
+def make_pod(i):
+    return {
+        "metadata": {
+            "name": f"web-7d4b9c8f6-{i:05d}",
+            "generateName": "web-7d4b9c8f6-",
+            "namespace": "default",
+            "uid": f"3f1c2e6a-0000-4000-8000-{i:012d}",
+            "resourceVersion": str(100000 + i),
+            "creationTimestamp": "2021-03-01T10:00:00Z",
+            "labels": {"app": "web", "pod-template-hash": "7d4b9c8f6", "tier": "frontend"},
+            "annotations": {
+                "kubectl.kubernetes.io/last-applied-configuration": json.dumps({"spec": {"replicas": 3}}) * 60,
+            },
+            "ownerReferences": [
+                {"apiVersion": "apps/v1", "kind": "ReplicaSet", "name": "web-7d4b9c8f6", "uid": "abc", "controller": True}
+            ],
+            "managedFields": [
+                {
+                    "manager": "kube-controller-manager",
+                    "operation": "Update",
+                    "apiVersion": "v1",
+                    "time": "2021-03-01T10:00:00Z",
+                    "fieldsType": "FieldsV1",
+                    "fieldsV1": {f"f:field{j}": {".": {}, "f:value": {}} for j in range(30)},
+                }
+            ],
+        },
+        "spec": {
+            "containers": [
+                {
+                    "name": "web",
+                    "image": "registry.example.com/web:1.2.3",
+                    "ports": [{"containerPort": 8080, "protocol": "TCP"}],
+                    "env": [{"name": f"SETTING_{j}", "value": f"value-{j}"} for j in range(25)],
+                    "resources": {"limits": {"cpu": "500m", "memory": "512Mi"}, "requests": {"cpu": "100m"}},
+                    "volumeMounts": [{"name": f"volume-{j}", "mountPath": f"/mnt/{j}"} for j in range(4)],
+                }
+            ],
+            "volumes": [{"name": f"volume-{j}", "configMap": {"name": f"config-{j}"}} for j in range(4)],
+            "nodeName": f"node-{i % 50}",
+            "restartPolicy": "Always",
+            "serviceAccountName": "default",
+        },
+        "status": {
+            "phase": "Running",
+            "podIP": f"10.0.{i // 250}.{i % 250}",
+            "conditions": [
+                {"type": t, "status": "True", "lastTransitionTime": "2021-03-01T10:00:00Z"}
+                for t in ["Initialized", "Ready", "ContainersReady", "PodScheduled"]
+            ],
+            "containerStatuses": [
+                {"name": "web", "ready": True, "restartCount": 0, "image": "registry.example.com/web:1.2.3"}
+            ],
+        },
+    }
+
+
+def measure(function):
+    tracemalloc.start()
+    result = function()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    documents = [json.dumps(make_pod(i)) for i in range(count)]
+    projection = Projection(ResourceEnvironment().item_fields(POD_TEMPLATE))
+
+    full_size, _ = measure(lambda: [json.loads(document) for document in documents])
+    projected_size, _ = measure(lambda: [projection(json.loads(document)) for document in documents])
+
+    print(f"{count} pods, fields kept: {', '.join(sorted('.'.join(path) for path in projection.paths))}")
+    print(f"Whole objects: {full_size / 2 ** 20:8.1f} MB")
+    print(f"Projected:     {projected_size / 2 ** 20:8.1f} MB ({full_size / projected_size:.1f}x less)")
+
+
+if __name__ == "__main__":
+    main()
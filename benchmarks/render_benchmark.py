@@ -0,0 +1,85 @@
+"""
+Compares repainting a list of pods by rendering the item template
+for every visible row, as rows used to be drawn, against rendering
+with the shared environment, and against the row cache of ItemRenderer.
+
+    python benchmarks/render_benchmark.py [visible rows] [repaints]
+"""
+import sys
+import time
+from types import SimpleNamespace
+
+from jinja2 import Template
+
+from kubemgr.texts import POD_TEMPLATE
+from kubemgr.views.renderer import ItemRenderer
+from kubemgr.views.environment import ResourceEnvironment
+from kubemgr.views.util import BASE_JINJA_CONTEXT
+
+
+def make_items(count):
+    return [
+        {
+            "metadata": {
+                "name": f"pod-{i}",
+                "namespace": "default",
+                "uid": str(i),
+                "resourceVersion": str(i),
+                "creationTimestamp": "2020-01-01T00:00:00Z",
+            },
+            "spec": {"containers": [{"name": "main"}]},
+            "status": {
+                "phase": "Running",
+                "containerStatuses": [{"name": "main", "ready": True, "restartCount": 0}],
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def render_rows(template, view, items):
+    for item in items:
+        ctx = dict(BASE_JINJA_CONTEXT)
+        ctx.update({"item": item, "width": view._rect.width})
+        template.render(ctx).replace("\n", "").strip()
+
+
+def render_environment_rows(template, view, items):
+    for item in items:
+        template.render(item=item, width=view._rect.width).replace("\n", "").strip()
+
+
+def measure(function, repaints, *args):
+    start = time.perf_counter()
+    for _ in range(repaints):
+        function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    repaints = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    items = make_items(rows)
+    template = Template(POD_TEMPLATE)
+    environment_template = ResourceEnvironment().from_string(POD_TEMPLATE)
+    app = SimpleNamespace(get_item_template=lambda kind: environment_template)
+    model = SimpleNamespace(resource_kind="Pod", mode="full", columns=None)
+    view = SimpleNamespace(_rect=SimpleNamespace(width=120), model=model)
+    renderer = ItemRenderer(app)
+
+    def render_cached(view, items):
+        for item in items:
+            renderer(view, item)
+
+    rendered_time = measure(render_rows, repaints, template, view, items)
+    environment_time = measure(render_environment_rows, repaints, environment_template, view, items)
+    cached_time = measure(render_cached, repaints, view, items)
+
+    print(f"{rows} rows, {repaints} repaints")
+    print(f"Template rendering: {rendered_time * 1000:8.1f} ms")
+    print(f"Environment:        {environment_time * 1000:8.1f} ms ({rendered_time / environment_time:.1f}x)")
+    print(f"Row cache:          {cached_time * 1000:8.1f} ms ({rendered_time / cached_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
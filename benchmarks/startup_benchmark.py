@@ -0,0 +1,82 @@
+"""
+Measures the time taken to import kubemgr.main, which is what runs
+before the first frame is drawn, using python -X importtime in a new
+interpreter for every run. Prints the median and the slowest imports,
+and fails if the median goes over a given budget, or if a module
+meant to be imported lazily was imported.
+
+    python benchmarks/startup_benchmark.py [--runs N] [--max-ms MS] [--top N]
+"""
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+# Modules which must only be imported when they are used
+LAZY_MODULES = ["kubernetes", "yaml", "jinja2"]
+
+_IMPORT_TIME = re.compile(r"^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)$")
+
+
+def run_once():
+    """
+    Returns the cumulative import time in microseconds of each module
+    imported by kubemgr.main, plus the set of top level packages imported.
+    Modules imported by the interpreter on its own startup are left out.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import kubemgr.main"],
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        matched = _IMPORT_TIME.match(line)
+        if not matched:
+            continue
+        module = matched.group(4)
+        times[module] = int(matched.group(2))
+        if len(matched.group(3)) == 1:
+            # Top level import, modules before it were imported by it
+            if module == "kubemgr.main":
+                break
+            times = {}
+    packages = {module.split(".")[0] for module in times}
+    return times, packages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        times, packages = run_once()
+        totals.append(times["kubemgr.main"] / 1000)
+
+    median = statistics.median(totals)
+    print(f"import kubemgr.main: median {median:.1f} ms, min {min(totals):.1f} ms over {args.runs} runs")
+    print("Slowest imports in last run (cumulative):")
+    slowest = sorted(times.items(), key=lambda entry: entry[1], reverse=True)
+    for module, cumulative in slowest[1 : args.top + 1]:
+        print(f"  {cumulative / 1000:8.1f} ms  {module}")
+
+    failed = False
+    eager = [module for module in LAZY_MODULES if module in packages]
+    if eager:
+        print(f"Imported at startup: {', '.join(eager)}")
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"Over budget of {args.max_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
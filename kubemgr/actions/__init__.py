@@ -1,5 +1,6 @@
+from .cluster import ShowClusterInfo
 from .create import CreateResource
-from .logs import ShowLogs
+from .logs import ShowLogs, ShowWorkloadLogs
 from .labels import ShowNodeLabels
 from .help import ShowHelp
 from .delete import DeleteResource
@@ -0,0 +1,27 @@
+class ShowClusterInfo:
+    """
+    Shows the connection of a cluster, and how well its connections are reused.
+    """
+
+    def __init__(self, app):
+        self._app = app
+
+    def __call__(self, target):
+        cluster = target.current_item
+        if not cluster:
+            return
+        stats = cluster.connection_stats
+        lines = [f"Cluster {cluster.name}", "======================", ""]
+        if stats is None:
+            lines.append("Not connected")
+        else:
+            reused = stats.requests - stats.connections
+            lines += [
+                f"{'Connection pool size':30} : {stats.pool_size}",
+                f"{'Requests':30} : {stats.requests}",
+                f"{'Connections opened':30} : {stats.connections}",
+                f"{'Requests on reused connections':30} : {max(0, reused)}",
+                f"{'TLS handshakes':30} : {stats.handshakes}",
+                f"{'TLS sessions resumed':30} : {stats.resumed}",
+            ]
+        self._app.show_text_popup("\n".join(lines + [""]))
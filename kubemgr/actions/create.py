@@ -1,6 +1,5 @@
 import logging
 from cdtui import FileChooser, Rect
-import yaml
 import traceback
 
 
@@ -21,6 +20,8 @@ class CreateResource:
         self._create_resource(path)
 
     def _create_resource(self, yaml_file_path):
+        import yaml
+
         try:
             cluster = self._app.selected_cluster
             with open(yaml_file_path, "r") as f:
@@ -1,5 +1,4 @@
 import io
-import yaml
 import json
 import logging
 
@@ -9,9 +8,15 @@ class EditResource:
         self._app = app
 
     def __call__(self, target):
-        item = target.current_item
         cluster = self._app.selected_cluster
-        if item and cluster:
+        if target.current_item and cluster:
+            try:
+                item = target.current_full_item
+            except Exception as e:
+                self._app.show_error(e)
+                return
+            import yaml
+
             item["kind"] = target.model.resource_kind
             item["apiVersion"] = target.model.api_group
             contents = yaml.dump(item, Dumper=yaml.SafeDumper)
@@ -21,6 +26,8 @@ class EditResource:
                 self._update(cluster, target, item, new_json)
 
     def _to_dict(self, yaml_string):
+        import yaml
+
         return yaml.load(io.StringIO(yaml_string), Loader=yaml.SafeLoader)
 
     def _update(self, cluster, target, item, contents):
@@ -21,7 +21,7 @@ class EditFilterAction:
                 target.model.filter = None
             elif new_text != text:
                 self._app.save_filter(target.model.resource_kind, new_text)
-                target.model.filter = Filter(new_text)
+                target.model.filter = Filter(new_text, self._app.templates)
 
 
 class EditGlobalFilterAction:
@@ -3,7 +3,11 @@ class ShowNodeLabels:
         self._app = app
 
     def __call__(self, target):
-        current = target.current_item
+        try:
+            current = target.current_full_item
+        except Exception as e:
+            self._app.show_error(e)
+            return
         labels = current["metadata"]["labels"]
         name = current["metadata"]["name"]
         labels_text = "\n".join(
@@ -1,26 +1,352 @@
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from ..util.executor import PRIORITY_INTERACTIVE
+from ..util.lines import LineBuffer, decode_line, split_lines
+from ..util.logmerge import LiveMerger, merge_lines
+from ..util.ratelimit import INTERACTIVE
+from ..views.logs import LogsListModel, LogsView
+
+if TYPE_CHECKING:
+    from ..util.connections import ResponseChunks
+
+_logger = logging.getLogger(__name__)
+
+_DEFAULT_TAIL_LINES = 1000
+_DEFAULT_LIMIT_BYTES = 10 * 1024 * 1024
+_DEFAULT_BUFFER_LINES = 10000
+_DEFAULT_WORKERS = 8
+_DEFAULT_MAX_STREAMS = 20
+# Containers are picked with keys 1 to 9
+_MAX_CONTAINER_OPTIONS = 9
+# Seconds after which a slow log download gets its worker replaced
+_READ_TIMEOUT = 60
+
+
+class LogStream:
+    """
+    Reads a stream of log chunks in a background thread, and writes them
+    to a sink, which has write(chunk) and close() methods. Stopping closes
+    the stream, which ends a read waiting for the next chunk.
+    """
+
+    def __init__(self, chunks: "ResponseChunks", sink):
+        self._chunks = chunks
+        self._sink = sink
+        self._active = False
+        self._thread = None
+
+    @property
+    def active(self) -> bool:
+        return self._active
+
+    def start(self):
+        self._active = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._active = False
+        self._chunks.close()
+
+    def run(self):
+        """
+        Reads the whole stream in the current thread.
+        """
+        self._active = True
+        self._run()
+
+    def _run(self):
+        try:
+            for chunk in self._chunks:
+                if not self._active:
+                    break
+                self._sink.write(chunk)
+        except Exception as e:
+            if self._active:
+                _logger.error(f"Error reading logs: {e}")
+                self._sink.write(f"\nError reading logs: {e}\n".encode())
+        finally:
+            self._active = False
+            self._chunks.close()
+            self._sink.close()
+
+
+class _FileSink:
+    def __init__(self, file):
+        self._file = file
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+
+    def write_lines(self, lines: List[str]):
+        self.write("".join(f"{line}\n" for line in lines).encode())
+
+    def close(self):
+        self._file.close()
+
+
+class _LogStreams:
+    """
+    Stops a group of log streams, and the merger of their lines.
+    """
+
+    def __init__(self, streams: List[LogStream], merger: Optional[LiveMerger] = None):
+        self._streams = streams
+        self._merger = merger
+
+    def stop(self):
+        for stream in self._streams:
+            stream.stop()
+        if self._merger:
+            self._merger.stop()
+
+
+def _run_viewer(app, path: str):
+    """
+    Shows a complete log file in the external viewer, then removes it.
+    """
+    try:
+        app.run_viewer(path)
+    finally:
+        os.unlink(path)
+
+
+def _container_names(pod: Dict[str, Any]) -> List[str]:
+    spec = pod.get("spec") or {}
+    containers = (spec.get("containers") or []) + (spec.get("initContainers") or [])
+    return [container["name"] for container in containers if "name" in container]
+
+
+def _log_options(config, follow: bool) -> Dict[str, Any]:
+    since_seconds = config.get("log_since_seconds")
+    return dict(
+        follow=follow,
+        tail_lines=config.getint("log_tail_lines", _DEFAULT_TAIL_LINES),
+        since_seconds=int(since_seconds) if since_seconds else None,
+        limit_bytes=None if follow else config.getint("log_limit_bytes", _DEFAULT_LIMIT_BYTES),
+    )
+
+
 class ShowLogs:
-    def __init__(self, app):
+    """
+    Shows the logs of a pod, asking which container for pods with more
+    than one. Only the last lines are requested, and with follow, new
+    lines are shown as they arrive. Logs are read into a bounded buffer
+    shown in a popup, or without follow and with an external viewer, into
+    a temporary file opened once complete.
+    """
+
+    def __init__(self, app, follow=False):
         self._app = app
+        self._follow = follow
 
     def __call__(self, target):
-
         cluster = self._app.get_selected_cluster()
         current = target.current_item
 
         if cluster and current:
+            containers = _container_names(current)
+            if not containers:
+                # Lists may not keep containers, with projection or metadata only
+                try:
+                    containers = _container_names(target.current_full_item)
+                except Exception as e:
+                    self._app.show_error(e)
+                    return
+
+            if len(containers) > 1:
+                options = [
+                    (str(index + 1), name, self._show_callback(cluster, current, name))
+                    for index, name in enumerate(containers[:_MAX_CONTAINER_OPTIONS])
+                ]
+                self._app.show_question_dialog("Logs", "Select container", options)
+            else:
+                self._show(cluster, current, containers[0] if containers else None)
 
-            name = current["metadata"]["name"]
-            namespace = current["metadata"]["namespace"]
+    def _show_callback(self, cluster, pod, container):
+        return lambda: self._show(cluster, pod, container)
 
+    def _show(self, cluster, pod: Dict[str, Any], container: Optional[str]):
+        config = self._app.get_general_config()
+        metadata = pod["metadata"]
+
+        try:
+            chunks = cluster.do_logs(
+                metadata["name"],
+                metadata.get("namespace"),
+                container,
+                timestamps=config.getboolean("log_timestamps", False),
+                **_log_options(config, self._follow),
+            )
+            # External viewers don't show lines added once open, so followed logs use the popup
+            if self._app.get_viewer() and not self._follow:
+                self._show_in_viewer(chunks)
+            else:
+                self._show_in_popup(chunks, config.getint("log_buffer_lines", _DEFAULT_BUFFER_LINES))
+        except Exception as e:
+            self._app.show_error(e)
+
+    def _show_in_viewer(self, chunks: "ResponseChunks"):
+        file = tempfile.NamedTemporaryFile(mode="wb", delete=False, suffix=".log")
+        stream = LogStream(chunks, _FileSink(file))
+
+        # Read in background, the viewer is opened in the UI thread once logs are complete
+        def read():
+            stream.run()
+            self._app.call_in_ui(lambda: _run_viewer(self._app, file.name))
+
+        self._app.add_task(read, False, priority=PRIORITY_INTERACTIVE, timeout=_READ_TIMEOUT)
+
+    def _show_in_popup(self, chunks: Iterator[bytes], max_lines: int):
+        buffer = LineBuffer(max_lines)
+        stream = LogStream(chunks, buffer)
+        stream.start()
+        model = LogsListModel(self._app, buffer)
+        self._app.open_popup(LogsView(self._app.popup_rect(), model, stream))
+
+
+class ShowWorkloadLogs:
+    """
+    Shows the logs of the pods of a workload, merged in timestamp order
+    and prefixed by pod name. Pods are found with the workload selector,
+    and their logs requested concurrently, up to log_workers at once.
+    With follow, up to log_max_streams pods are followed, lines are held
+    for a moment as they arrive, so lines of different pods are shown
+    in order.
+    """
+
+    def __init__(self, app, follow=False):
+        self._app = app
+        self._follow = follow
+
+    def __call__(self, target):
+        cluster = self._app.get_selected_cluster()
+        if not (cluster and target.current_item):
+            return
+
+        try:
+            workload = target.current_full_item
+        except Exception as e:
+            self._app.show_error(e)
+            return
+
+        from ..views.selectors import from_label_selector
+
+        spec = workload.get("spec") or {}
+        selector = from_label_selector(spec.get("selector") or {})
+        if not selector:
+            self._app.show_error(f"{workload['metadata']['name']} has no pod selector")
+            return
+
+        containers = _container_names(spec.get("template") or {})
+        if len(containers) > 1:
+            options = [
+                (str(index + 1), name, self._show_callback(cluster, workload, selector, name))
+                for index, name in enumerate(containers[:_MAX_CONTAINER_OPTIONS])
+            ]
+            self._app.show_question_dialog("Logs", "Select container", options)
+        else:
+            self._show(cluster, workload, selector, containers[0] if containers else None)
+
+    def _show_callback(self, cluster, workload, selector, container):
+        return lambda: self._show(cluster, workload, selector, container)
+
+    def _show(self, cluster, workload: Dict[str, Any], selector: str, container: Optional[str]):
+        config = self._app.get_general_config()
+        namespace = workload["metadata"].get("namespace")
+
+        try:
+            pages = cluster.do_list(
+                "v1", "Pod", namespace=namespace, label_selector=selector, metadata_only=True, priority=INTERACTIVE
+            )
+            names = sorted(pod["metadata"]["name"] for page in pages for pod in page["items"])
+            if not names:
+                self._app.show_error(f"No pods found for {workload['metadata']['name']}")
+                return
+
+            fetch = _PodLogs(cluster, namespace, container, config, self._follow)
+            # As for single pods, followed logs use the popup
+            if self._app.get_viewer() and not self._follow:
+                self._show_in_viewer(fetch, names)
+            else:
+                self._show_in_popup(fetch, names, config.getint("log_buffer_lines", _DEFAULT_BUFFER_LINES))
+        except Exception as e:
+            self._app.show_error(e)
+
+    def _show_in_viewer(self, fetch: "_PodLogs", names: List[str]):
+        file = tempfile.NamedTemporaryFile(mode="wb", delete=False, suffix=".log")
+        sink = _FileSink(file)
+
+        # Requested in background, the viewer is opened in the UI thread once logs are complete
+        def read():
             try:
-                logs = cluster.do_get(
-                    target.model.api_group,
-                    target.model.resource_kind,
-                    name,
-                    namespace,
-                    "log",
-                )
-
-                self._app.show_file(logs.decode(), "log")
-            except Exception as e:
-                self._app.show_error(e)
+                sink.write_lines(list(fetch.merged(names)))
+            finally:
+                sink.close()
+            self._app.call_in_ui(lambda: _run_viewer(self._app, file.name))
+
+        self._app.add_task(read, False, priority=PRIORITY_INTERACTIVE, timeout=_READ_TIMEOUT)
+
+    def _show_in_popup(self, fetch: "_PodLogs", names: List[str], max_lines: int):
+        buffer = LineBuffer(max_lines)
+        if self._follow:
+            streams = fetch.follow(names, buffer.append)
+        else:
+            # Requested in background, so the popup shows up right away
+            streams = _LogStreams([])
+            threading.Thread(target=lambda: buffer.append(list(fetch.merged(names))), daemon=True).start()
+        model = LogsListModel(self._app, buffer)
+        self._app.open_popup(LogsView(self._app.popup_rect(), model, streams))
+
+
+class _PodLogs:
+    """
+    Requests or follows the logs of several pods of a namespace.
+    """
+
+    def __init__(self, cluster, namespace, container, config, follow):
+        self._cluster = cluster
+        self._namespace = namespace
+        self._container = container
+        self._options = _log_options(config, follow)
+        self._timestamps = config.getboolean("log_timestamps", False)
+        self._workers = config.getint("log_workers", _DEFAULT_WORKERS)
+        self._max_streams = config.getint("log_max_streams", _DEFAULT_MAX_STREAMS)
+
+    def _chunks(self, name: str) -> "ResponseChunks":
+        return self._cluster.do_logs(name, self._namespace, self._container, timestamps=True, **self._options)
+
+    def _lines(self, name: str) -> List[str]:
+        lines = []
+        pending = b""
+        try:
+            for chunk in self._chunks(name):
+                new_lines, pending = split_lines(pending, chunk)
+                lines.extend(new_lines)
+            if pending:
+                lines.append(decode_line(pending))
+        except Exception as e:
+            _logger.error(f"Error reading logs of {name}: {e}")
+            lines.append(f"Error reading logs: {e}")
+        return lines
+
+    def merged(self, names: List[str]) -> Iterator[str]:
+        with ThreadPoolExecutor(max_workers=max(1, min(self._workers, len(names)))) as executor:
+            logs = list(executor.map(self._lines, names))
+        return merge_lines(zip(names, logs), self._timestamps)
+
+    def follow(self, names: List[str], output) -> _LogStreams:
+        followed = names[: self._max_streams]
+        if len(followed) < len(names):
+            output([f"Following {len(followed)} of {len(names)} pods, log_max_streams sets the maximum"])
+        merger = LiveMerger(output, timestamps=self._timestamps)
+        streams = [LogStream(self._chunks(name), merger.source(name)) for name in followed]
+        merger.start()
+        for stream in streams:
+            stream.start()
+        return _LogStreams(streams, merger)
@@ -1,7 +1,4 @@
 import logging
-import yaml
-from ..views.util import BASE_JINJA_CONTEXT
-import logging
 
 _logger = logging.getLogger(__name__)
 
@@ -10,8 +7,14 @@ class ViewResource:
         self._app = app
 
     def __call__(self, target):
-        current = target.current_item
+        try:
+            current = target.current_full_item
+        except Exception as e:
+            self._app.show_error(e)
+            return
         if current:
+            import yaml
+
             _logger.debug(f"View resource {current}")
             result = yaml.dump(current, Dumper=yaml.SafeDumper)
             self._app.show_file(result, "yaml")
@@ -24,13 +27,15 @@ class CustomViewResource:
     def __call__(self, target):
         kind = target.model.resource_kind
 
-        item = target.current_item
-        template = self._app._detail_templates.get(kind)
+        template = self._app.get_detail_template(kind)
 
         _logger.debug(f"Has template for {kind}? {template is not None}")
 
-        if item and template:
-            ctx = dict(BASE_JINJA_CONTEXT)
-            ctx.update({"item": item})
-            result = template.render(ctx)
+        if template and target.current_item:
+            try:
+                item = target.current_full_item
+            except Exception as e:
+                self._app.show_error(e)
+                return
+            result = template.render(item=item)
             self._app.show_file(result, None, True)
@@ -1,17 +1,34 @@
-import json
+import collections
 import logging
 import os
+import re
 import threading
 
-import yaml
 from cdtui import ListenerHandler
-from kubernetes import client
-from kubernetes.client.rest import ApiException
-from kubernetes.config.kube_config import KubeConfigLoader
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, Iterator, List, Optional, Tuple
+
+from .discovery import Discovery, DiscoveryCache, DiscoveryResponse, ResourceIndex, normalize_group_version
+from .table import TABLE_ACCEPT, table_events, table_rows
+from .util.connections import ConnectionStats, ResponseChunks, connection_stats, create_ssl_context
+from .util.jsonstream import loads, stream_list
+from .util.ratelimit import BACKGROUND, INTERACTIVE, RateLimiter
+
+if TYPE_CHECKING:
+    from kubernetes import client
+    from kubernetes.config.kube_config import KubeConfigLoader
 
 _logger = logging.getLogger(__name__)
 
+# Content types asking the server to return only object metadata
+_METADATA_LIST_ACCEPT = "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json"
+_METADATA_ACCEPT = "application/json;as=PartialObjectMetadata;g=meta.k8s.io;v=v1,application/json"
+
+# Size of the chunks read from streamed responses
+_CHUNK_SIZE = 64 * 1024
+
+# Times a request throttled by the server is sent again
+_THROTTLED_RETRIES = 3
+
 
 class UnknownResource(Exception):
     def __init__(self, api_group, name):
@@ -27,8 +44,37 @@ class ServiceError(Exception):
         self._status_code = status_code
         self._response = response
 
+    @property
+    def status_code(self) -> int:
+        return self._status_code
+
+    @property
+    def response(self) -> str:
+        return self._response
+
     def __str__(self):
-        return "Service error: {self.status_code} - {self.response}"
+        return f"Service error: {self.status_code} - {self.response}"
+
+
+class WatchEvents:
+    """
+    Iterator over the events of a watch stream. Closing it ends the
+    stream, even from another thread while waiting for an event.
+    """
+
+    def __init__(self, chunks: ResponseChunks, table=False):
+        self._chunks = chunks
+        events = (loads(line) for line in _iter_lines(chunks))
+        self._events = table_events(events) if table else events
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self
+
+    def __next__(self) -> Dict[str, Any]:
+        return next(self._events)
+
+    def close(self):
+        self._chunks.close()
 
 
 class Cluster:
@@ -37,20 +83,64 @@ class Cluster:
 
         config_file = config["configfile"]
         timeout = int(config.get("timeout", 5))
+        discovery_workers = int(config.get("discovery_workers", 8))
+        discovery_cache_ttl = int(config.get("discovery_cache_ttl", 600))
+        cache_dir = os.path.join(application.cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", name))
+        # By default enough connections for all requests the application may run at once
+        pool_size = int(config.get("pool_size", 0)) or max(discovery_workers, application.get_concurrent_requests())
+        qps = float(config.get("qps", 20))
+        burst = int(config.get("burst", 40))
+
+        return Cluster(
+            application,
+            name,
+            config_file,
+            timeout,
+            discovery_workers,
+            cache_dir,
+            discovery_cache_ttl,
+            pool_size,
+            qps,
+            burst,
+        )
 
-        return Cluster(application, name, config_file, timeout)
-
-    def __init__(self, application, name, config_file, request_timeout=5):
+    def __init__(
+        self,
+        application,
+        name,
+        config_file,
+        request_timeout=5,
+        discovery_workers=8,
+        cache_dir=None,
+        discovery_cache_ttl=600,
+        pool_size=None,
+        qps=20,
+        burst=40,
+    ):
         self._application = application
         self._config_loader = None
         self._config_name = name
         self._name = None
         self.config_file = config_file
         self._request_timeout = request_timeout
+        self._discovery_workers = discovery_workers
+        self._pool_size = pool_size
+        self._ssl_context = None
+        # No limit when qps is 0
+        self._rate_limiter = RateLimiter(qps, burst) if qps > 0 else None
+        self._discovery_cache = (
+            DiscoveryCache(os.path.join(cache_dir, "discovery"), discovery_cache_ttl) if cache_dir else None
+        )
+        self._cached_discovery = False
+        self._discovery_complete = False
+        self._discovery_thread = None
+        self._server_version = None
         self.config = None
         self._api_client = None
         self._connection_error = None
         self._resources = {}
+        self._resource_index = ResourceIndex()
+        self._informers = None
         self._connection_thread = None
         self._on_connect = ListenerHandler(self)
         self._on_error = ListenerHandler(self)
@@ -75,20 +165,46 @@ class Cluster:
 
     @property
     def connected(self) -> bool:
-        return self._api_client is not None
+        # Usable as soon as core resources are known, other groups may still be loading.
+        return self._api_client is not None and "v1" in self._resources
 
     @property
     def connecting(self):
-        return self._connection_thread is not None and self._connection_thread.is_alive() and self._api_client is None
+        return self._connection_thread is not None and self._connection_thread.is_alive() and not self.connected
 
     @property
-    def api_client(self) -> client.ApiClient:
+    def api_client(self) -> "client.ApiClient":
         return self._api_client
 
+    @property
+    def informers(self):
+        """
+        Watchers shared by all views of this cluster.
+        """
+        if self._informers is None:
+            from .informer import InformerCache
+
+            self._informers = InformerCache(self)
+        return self._informers
+
+    @property
+    def connection_stats(self) -> Optional[ConnectionStats]:
+        """
+        Requests sent and connections opened so far, to tell how well
+        connections are reused.
+        """
+        if self._api_client is None:
+            return None
+        return connection_stats(self._api_client.rest_client.pool_manager, self._ssl_context)
+
     def disconnect(self):
         if self.connected:
+            _logger.info(f"{self} {self.connection_stats}")
+            if self._informers:
+                self._informers.clear()
             self._api_client.close()
             self._resources = {}
+            self._resource_index = ResourceIndex()
 
     @property
     def connection_error(self):
@@ -107,6 +223,23 @@ class Cluster:
             _logger.exception("Error connecting to cluster")
             self._connection_error = e
             self._on_error(e)
+            return
+
+        try:
+            self._server_version = self._get_server_version()
+            if self._cached_discovery and self._discovery_cache.server_version == self._server_version:
+                _logger.info(f"Using cached api discovery for {self}")
+                if self._discovery_cache.etag:
+                    # Aggregated discovery allows checking for new groups with a conditional request
+                    self._discover_api_groups(include_core=True, etag=self._discovery_cache.etag)
+            else:
+                if self._cached_discovery:
+                    # Resources cached for another server version may no longer be served
+                    _logger.info(f"Server version changed, dropping cached api discovery for {self}")
+                    self._discovery_cache.invalidate()
+                self._discover_api_groups(include_core=self._cached_discovery)
+        except Exception:
+            _logger.exception("Error discovering api groups")
 
     def build_path_for_resource(self, api_group, resource_kind, namespace=None, name=None):
         resource = self.get_resource(api_group, resource_kind)
@@ -114,24 +247,16 @@ class Cluster:
         return self.build_path(api_group, resource, name=name, namespace=namespace)
 
     def build_path(self, api_group, resource, name=None, namespace=None, verb=None):
-        resource_name = resource["name"]
-        namespaced = resource["namespaced"]
-        path = "/"
-        if api_group != "api/v1":  # TODO Fix
-            if api_group == "v1":
-                path += "api/"
-            else:
-                path += "apis/"
-        path += api_group
-        if namespaced and namespace:
-            path += f"/namespaces/{namespace}"
-        path += f"/{resource_name}"
+        path = self._resource_index.base_path(api_group)
+        if namespace and resource["namespaced"]:
+            path = f"{path}/namespaces/{namespace}"
+        path = f"{path}/{resource['name']}"
 
         if name:
-            path += f"/{name}"
+            path = f"{path}/{name}"
 
         if verb:
-            path += f"/{verb}"
+            path = f"{path}/{verb}"
 
         return path
 
@@ -144,56 +269,144 @@ class Cluster:
         return self._config_loader.current_context
 
     def _create_connection(self):
+        # Imported here, as it takes long and isn't needed until connecting
+        from kubernetes import client
 
         self._config_loader = self._create_config_loader(self.config_file)
         self._name = self._config_loader.current_context["name"]
 
         self.config = self._read_kube_config(self._config_loader)
+        if self._pool_size:
+            self.config.connection_pool_maxsize = self._pool_size
+        if self._rate_limiter:
+            from urllib3.util.retry import Retry
+
+            # Throttled requests are retried through the rate limiter, not by urllib3
+            self.config.retries = Retry(3, respect_retry_after_header=False)
         _logger.info(f"Config: {self.config.__dict__}")
         api_client = client.ApiClient(self.config)
+        # Connections reuse TLS sessions of previous ones, when the server allows it
+        self._ssl_context = create_ssl_context(self.config.verify_ssl)
+        api_client.rest_client.pool_manager.connection_pool_kw["ssl_context"] = self._ssl_context
         self._api_client = api_client
-        apis = client.ApisApi(api_client).get_api_versions()
-        for api_group in apis.groups:
-            for version in api_group.versions:
-                _logger.debug(f"Api group version {version.group_version}")
-                api_group_version = version.group_version
-                try:
-                    self._resources[api_group_version] = self._get_resources(api_client, f"/apis/{api_group_version}/")
-                except ApiException:
-                    _logger.info(f"No info for api group {api_group_version}")
-
-        self._resources["api/v1"] = self._get_resources(api_client, "/api/v1/")
-        self._resources["v1"] = self._get_resources(api_client, "/api/v1/")  # TODO Fix this
-
-    def _get_resources(self, api_client, path):
-        _logger.info(f"get resource {path}")
+
+        self._discovery_complete = False
+        core_resources = None
+        if self._discovery_cache and self._discovery_cache.valid:
+            core_resources = self._discovery_cache.load("v1")
+        self._cached_discovery = core_resources is not None
+
+        if not self._cached_discovery:
+            core_resources = self._discovery.discover_core()
+        self._add_resources("v1", core_resources)
+
+    def _get_server_version(self) -> Optional[str]:
+        return loads(self.do_simple_get("/version")).get("gitVersion")
+
+    @property
+    def _discovery(self) -> Discovery:
+        return Discovery(self._fetch_discovery, self._discovery_workers)
+
+    def _fetch_discovery(self, path, accept=None, etag=None) -> DiscoveryResponse:
+        from kubernetes.client.rest import ApiException
+
+        headers = {}
+        if accept:
+            headers["Accept"] = accept
+        if etag:
+            headers["If-None-Match"] = etag
         try:
-            data = self.do_simple_get(path)
-            return json.loads(data.decode())["resources"]
-        except Exception:
-            _logger.exception(f"Unable to get resource {path}")
-            return {}
+            response, status, response_headers = self._call_api(
+                path, "GET", header_params=headers, _preload_content=False, **self._request_args()
+            )
+        except ApiException as e:
+            if e.status == 304:
+                return DiscoveryResponse(e.status, None, etag, b"")
+            raise
+        return DiscoveryResponse(
+            status, response_headers.get("Content-Type"), response_headers.get("ETag"), response.data
+        )
+
+    def _discover_api_groups(self, include_core=False, etag=None):
+        resources, etag = self._discovery.discover(include_core, etag, on_group=self._add_resources)
+        if resources is None:
+            return
+
+        self._discovery_complete = True
+
+        if self._discovery_cache:
+            resources["v1"] = self._resources["v1"]
+            self._discovery_cache.save(self._server_version, resources, etag)
+
+    def _load_cached_resources(self, api_group) -> List[Dict[str, Any]]:
+        """
+        Looks up a group version not loaded yet in the discovery cache.
+        If the cache doesn't know about it either, the whole discovery
+        is run again in background, since it may be a group created
+        after the cache was saved.
+        """
+        if not self._cached_discovery or self._discovery_complete:
+            return []
+
+        resources = self._discovery_cache.load(api_group)
+        if resources is not None:
+            self._add_resources(api_group, resources)
+            return resources
+
+        if not (self._discovery_thread and self._discovery_thread.is_alive()):
+            self._discovery_thread = threading.Thread(target=self._discover_api_groups, daemon=True)
+            self._discovery_thread.start()
+        return []
+
+    def _read_kube_config(self, config_loader: "KubeConfigLoader") -> "client.Configuration":
+        from kubernetes import client
 
-    def _read_kube_config(self, config_loader: KubeConfigLoader) -> client.Configuration:
         config = client.Configuration()
         config_loader.load_and_set(config)
         return config
 
-    def _create_config_loader(self, config_file: str) -> KubeConfigLoader:
+    def _create_config_loader(self, config_file: str) -> "KubeConfigLoader":
+        import yaml
+        from kubernetes.config.kube_config import KubeConfigLoader
+
         base_path = os.path.dirname(config_file)
         with open(config_file, "r") as f:
             return KubeConfigLoader(config_dict=yaml.safe_load(f), config_base_path=base_path)
 
     def get_resource(self, api_group, resource_name) -> Dict[str, Any]:
-        found = list(filter(lambda x: x["kind"] == resource_name, self._resources.get(api_group, [])))
-        if found:
-            return found[0]
-
-        raise UnknownResource(api_group, resource_name)
-
-    def do_simple_get(self, path) -> bytes:
-        response, status, _ = self.api_client.call_api(
-            path, "GET", _preload_content=False, **self._request_args()
+        resource = self._resource_index.get(api_group, resource_name)
+        if resource is None and api_group not in self._resource_index:
+            self._load_cached_resources(normalize_group_version(api_group))
+            resource = self._resource_index.get(api_group, resource_name)
+
+        if resource is None:
+            raise UnknownResource(api_group, resource_name)
+        return resource
+
+    def find_resource(self, name) -> Tuple[str, Dict[str, Any]]:
+        """
+        Looks up a resource by its plural, singular or short name,
+        returns its group version and the resource.
+        """
+        found = self._resource_index.find(name)
+        if found is None:
+            raise UnknownResource(None, name)
+        return found
+
+    def _add_resources(self, group_version, resources):
+        self._resources[group_version] = resources
+        self._resource_index.add(group_version, resources)
+
+    def do_simple_get(self, path, query=None, accept=None, priority=BACKGROUND) -> bytes:
+        headers = {"Accept": accept} if accept else None
+        response, status, _ = self._call_api(
+            path,
+            "GET",
+            query_params=query,
+            header_params=headers,
+            _preload_content=False,
+            _priority=priority,
+            **self._request_args(),
         )
 
         if status != 200:
@@ -201,15 +414,190 @@ class Cluster:
 
         return response.data
 
+    def do_stream_get(
+        self, path, query=None, accept=None, request_timeout=None, priority=BACKGROUND
+    ) -> ResponseChunks:
+        """
+        Like do_simple_get, but returns an iterator over the response body
+        in chunks as it arrives. The request is sent when the first chunk
+        is requested. A request timeout overrides the cluster one, as
+        (connect, read). Closing the iterator stops the stream, even from
+        another thread while waiting for a chunk. Errors returned by the
+        server are raised as ServiceError.
+        """
+        from kubernetes.client.rest import ApiException
+
+        headers = {"Accept": accept} if accept else None
+        request_args = self._request_args()
+        if request_timeout:
+            request_args["_request_timeout"] = request_timeout
+
+        def request():
+            try:
+                response, status, _ = self._call_api(
+                    path,
+                    "GET",
+                    query_params=query,
+                    header_params=headers,
+                    _preload_content=False,
+                    _priority=priority,
+                    **request_args,
+                )
+            except ApiException as e:
+                raise ServiceError(e.status, e.body)
+            if status != 200:
+                raise ServiceError(status, response.data)
+            return response
+
+        return ResponseChunks(request, _CHUNK_SIZE)
+
+    def do_logs(
+        self,
+        name,
+        namespace,
+        container=None,
+        follow=False,
+        tail_lines=None,
+        since_seconds=None,
+        limit_bytes=None,
+        timestamps=False,
+    ) -> ResponseChunks:
+        """
+        Streams the logs of a pod container, returns an iterator over chunks
+        as they arrive. When following, there is no read timeout, the stream
+        lasts until the container ends or the iterator is closed.
+        """
+        resource = self.get_resource("v1", "Pod")
+        path = self.build_path("v1", resource, name=name, namespace=namespace, verb="log")
+
+        query = []
+        if container:
+            query.append(("container", container))
+        if follow:
+            query.append(("follow", "true"))
+        if tail_lines is not None:
+            query.append(("tailLines", str(tail_lines)))
+        if since_seconds is not None:
+            query.append(("sinceSeconds", str(since_seconds)))
+        if limit_bytes is not None:
+            query.append(("limitBytes", str(limit_bytes)))
+        if timestamps:
+            query.append(("timestamps", "true"))
+
+        request_timeout = (self._request_timeout, None) if follow else None
+        return self.do_stream_get(path, query, request_timeout=request_timeout, priority=INTERACTIVE)
+
     def do_get(self, api_group, resource_kind, name=None, namespace=None, verb=None) -> bytes:
         resource = self.get_resource(api_group, resource_kind)
         path = self.build_path(api_group, resource, name=name, namespace=namespace, verb=verb)
-        return self.do_simple_get(path)
+        return self.do_simple_get(path, priority=INTERACTIVE)
+
+    def do_list(
+        self,
+        api_group,
+        resource_kind,
+        namespace=None,
+        limit=None,
+        label_selector=None,
+        field_selector=None,
+        metadata_only=False,
+        table=False,
+        priority=BACKGROUND,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lists a resource collection in chunks of the given size, yields
+        every page as it arrives. Page items are an iterator decoding them
+        from the response as they are consumed, other page fields should
+        be read after it. Raises a ServiceError with status 410 if the
+        continue token expires in the middle. When metadata_only is True,
+        items only contain their metadata. When table is True, the server
+        renders the list as a table, items contain their metadata and
+        cells by column name, and pages keep the column definitions.
+        """
+        resource = self.get_resource(api_group, resource_kind)
+        path = self.build_path(api_group, resource, namespace=namespace)
+
+        if table:
+            accept = TABLE_ACCEPT
+        elif metadata_only:
+            accept = _METADATA_LIST_ACCEPT
+        else:
+            accept = None
+
+        columns = None
+        continue_token = None
+        while True:
+            query = _selector_query(label_selector, field_selector)
+            if table:
+                query.append(("includeObject", "Metadata"))
+            if limit:
+                query.append(("limit", str(limit)))
+            if continue_token:
+                query.append(("continue", continue_token))
+            chunks = self.do_stream_get(path, query, accept, priority=priority)
+            page = stream_list(chunks, "rows" if table else "items")
+
+            if table:
+                columns = page.get("columnDefinitions") or columns
+                page["items"] = table_rows(page.pop("rows"), columns or [])
+                page["columnDefinitions"] = columns
+
+            yield page
+
+            # Items left by the consumer are read, fields after them may be needed
+            collections.deque(page["items"], maxlen=0)
+
+            continue_token = page["metadata"].get("continue")
+            if not continue_token:
+                break
+
+    def do_watch(
+        self,
+        api_group,
+        resource_kind,
+        namespace=None,
+        resource_version=None,
+        timeout=60,
+        label_selector=None,
+        field_selector=None,
+        metadata_only=False,
+        table=False,
+    ) -> WatchEvents:
+        """
+        Watches a resource collection starting from a given resource version,
+        returns an iterator over watch events as they arrive, which can be
+        closed to stop watching. The server closes the stream after the
+        given timeout in seconds. When metadata_only is True, event
+        objects only contain their metadata. When table is True, event
+        objects are the items do_list returns for tables.
+        """
+        resource = self.get_resource(api_group, resource_kind)
+        path = self.build_path(api_group, resource, namespace=namespace)
+
+        query = [("watch", "1"), ("allowWatchBookmarks", "true"), ("timeoutSeconds", str(timeout))]
+        query += _selector_query(label_selector, field_selector)
+        if resource_version:
+            query.append(("resourceVersion", resource_version))
+        if table:
+            query.append(("includeObject", "Metadata"))
+
+        if table:
+            accept = TABLE_ACCEPT
+        elif metadata_only:
+            accept = _METADATA_ACCEPT
+        else:
+            accept = None
+
+        request_timeout = (self._request_timeout, timeout + self._request_timeout)
+        chunks = self.do_stream_get(path, query, accept, request_timeout=request_timeout)
+        return WatchEvents(chunks, table)
 
     def do_post(self, api_group, resource_kind, name=None, namespace=None, body=None) -> None:
         resource = self.get_resource(api_group, resource_kind)
         path = self.build_path(api_group, resource, name=name, namespace=namespace)
-        response, status, _ = self._api_client.call_api(path, "POST", body=body, **self._request_args())
+        response, status, _ = self._call_api(
+            path, "POST", body=body, _priority=INTERACTIVE, **self._request_args()
+        )
 
         if status not in [200, 201]:
             raise ServiceError(status, response)
@@ -217,7 +605,7 @@ class Cluster:
     def do_delete(self, api_group, resource_kind, name, namespace=None) -> None:
         resource = self.get_resource(api_group, resource_kind)
         path = self.build_path(api_group, resource, name=name, namespace=namespace)
-        response, status, _ = self.api_client.call_api(path, "DELETE", **self._request_args())
+        response, status, _ = self._call_api(path, "DELETE", _priority=INTERACTIVE, **self._request_args())
         if status != 200:
             raise ServiceError(status,response)
 
@@ -237,12 +625,67 @@ class Cluster:
         if content_type:
             headers["Content-Type"] = content_type
 
-        response, status, _ = self.api_client.call_api(
-            path, "PATCH", body=body, header_params=headers, **self._request_args()
+        response, status, _ = self._call_api(
+            path, "PATCH", body=body, header_params=headers, _priority=INTERACTIVE, **self._request_args()
         )
 
         if status not in [200, 201]:
             raise ServiceError(status, response)
 
+    def _call_api(self, path, method, _priority=BACKGROUND, **kwargs):
+        """
+        Calls the API once the rate limiter lets the request through.
+        Requests throttled by the server slow down the limiter, and are
+        sent again after the time the server asks for.
+        """
+        from kubernetes.client.rest import ApiException
+
+        if self._rate_limiter is None:
+            return self.api_client.call_api(path, method, **kwargs)
+
+        for attempt in range(_THROTTLED_RETRIES + 1):
+            self._rate_limiter.acquire(_priority)
+            try:
+                result = self.api_client.call_api(path, method, **kwargs)
+            except ApiException as e:
+                if e.status != 429:
+                    raise
+                _logger.warning(f"{self} throttled requests to {path}")
+                self._rate_limiter.throttled(_retry_after(e.headers))
+                if attempt == _THROTTLED_RETRIES:
+                    raise
+            else:
+                self._rate_limiter.succeeded()
+                return result
+
     def _request_args(self) -> Dict[str, Any]:
         return dict(auth_settings=["BearerToken"], _request_timeout=self._request_timeout)
+
+
+def _selector_query(label_selector, field_selector) -> List:
+    query = []
+    if label_selector:
+        query.append(("labelSelector", label_selector))
+    if field_selector:
+        query.append(("fieldSelector", field_selector))
+    return query
+
+
+def _iter_lines(chunks) -> Iterator[bytes]:
+    pending = b""
+    for chunk in chunks:
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+def _retry_after(headers) -> Optional[float]:
+    # Servers throttling requests tell the seconds to wait before retrying
+    try:
+        return float(headers.get("Retry-After")) if headers else None
+    except (TypeError, ValueError):
+        return None
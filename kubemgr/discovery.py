@@ -0,0 +1,310 @@
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_logger = logging.getLogger(__name__)
+
+_INDEX_FILE = "index.json"
+
+AGGREGATED_DISCOVERY_ACCEPT = ",".join(
+    [
+        "application/json;g=apidiscovery.k8s.io;v=v2;as=APIGroupDiscoveryList",
+        "application/json;g=apidiscovery.k8s.io;v=v2beta1;as=APIGroupDiscoveryList",
+        "application/json",
+    ]
+)
+_AGGREGATED_CONTENT_TYPE = "g=apidiscovery.k8s.io"
+
+_HTTP_NOT_MODIFIED = 304
+
+DiscoveryResponse = namedtuple("DiscoveryResponse", ["status", "content_type", "etag", "body"])
+
+Resources = Dict[str, List[Dict[str, Any]]]
+
+
+def _file_name(group_version: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", group_version) + ".json"
+
+
+class DiscoveryCache:
+    """
+    Keeps API discovery results on disk, similar to kubectl discovery cache.
+    There is an index file with the server version and the list of group
+    versions, plus one file per group version with its resources.
+    Contents older than the TTL, or saved for a different server version,
+    are considered invalid.
+    """
+
+    def __init__(self, cache_dir: str, ttl: int):
+        self._cache_dir = cache_dir
+        self._ttl = ttl
+        self._index = None
+
+    def _read_index(self) -> Optional[Dict[str, Any]]:
+        if self._index is None:
+            try:
+                with open(os.path.join(self._cache_dir, _INDEX_FILE), "r") as f:
+                    self._index = json.load(f)
+            except FileNotFoundError:
+                return None
+            except Exception:
+                _logger.exception(f"Unable to read discovery cache in {self._cache_dir}")
+                return None
+        return self._index
+
+    @property
+    def valid(self) -> bool:
+        index = self._read_index()
+        return index is not None and time.time() - index["timestamp"] < self._ttl
+
+    @property
+    def server_version(self) -> Optional[str]:
+        index = self._read_index()
+        return index["server_version"] if index else None
+
+    @property
+    def etag(self) -> Optional[str]:
+        index = self._read_index()
+        return index.get("etag") if index else None
+
+    @property
+    def group_versions(self) -> List[str]:
+        index = self._read_index()
+        return index["group_versions"] if index else []
+
+    def load(self, group_version: str) -> Optional[List[Dict[str, Any]]]:
+        if not self.valid or group_version not in self.group_versions:
+            return None
+        try:
+            with open(os.path.join(self._cache_dir, _file_name(group_version)), "r") as f:
+                return json.load(f)
+        except Exception:
+            _logger.exception(f"Unable to read cached discovery for {group_version}")
+            return None
+
+    def save(self, server_version: Optional[str], resources: Resources, etag: Optional[str] = None):
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            for group_version, group_resources in resources.items():
+                with open(os.path.join(self._cache_dir, _file_name(group_version)), "w") as f:
+                    json.dump(group_resources, f)
+
+            index = {
+                "server_version": server_version,
+                "etag": etag,
+                "timestamp": time.time(),
+                "group_versions": list(resources.keys()),
+            }
+            # Written last, so an interrupted save leaves the previous index in place
+            index_path = os.path.join(self._cache_dir, _INDEX_FILE)
+            with open(index_path + ".tmp", "w") as f:
+                json.dump(index, f)
+            os.replace(index_path + ".tmp", index_path)
+            self._index = index
+        except Exception:
+            _logger.exception(f"Unable to write discovery cache in {self._cache_dir}")
+
+    def invalidate(self):
+        self._index = None
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+
+
+def normalize_group_version(group_version: str) -> str:
+    # Core resources are referred both as "api/v1" and "v1"
+    return "v1" if group_version == "api/v1" else group_version
+
+
+def base_path(group_version: str) -> str:
+    group_version = normalize_group_version(group_version)
+    return f"/api/{group_version}" if group_version == "v1" else f"/apis/{group_version}"
+
+
+def _index_names(by_kind: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    by_name = {}
+    for group_version in sorted(by_kind, key=lambda group_version: (group_version != "v1", group_version)):
+        for resource in by_kind[group_version].values():
+            names = [resource["name"], resource.get("singularName")] + resource.get("shortNames", [])
+            for name in names:
+                if name:
+                    by_name.setdefault(name.lower(), (group_version, resource))
+    return by_name
+
+
+class ResourceIndex:
+    """
+    Indexes discovered resources by group version and kind, and by
+    plural, singular and short names. Also keeps the base path of
+    each group version, so request paths don't need to be worked out
+    on every call. Adding a group version again replaces its resources.
+    Names served by several group versions resolve to core resources
+    first, then to group versions in alphabetical order.
+    """
+
+    def __init__(self):
+        self._by_kind = {}
+        # Names index, with the kinds index it was built from
+        self._by_name = ({}, {})
+        self._base_paths = {}
+
+    def __contains__(self, group_version: str) -> bool:
+        return normalize_group_version(group_version) in self._base_paths
+
+    def add(self, group_version: str, resources: List[Dict[str, Any]]):
+        group_version = normalize_group_version(group_version)
+        kinds = {}
+        for resource in resources:
+            if "/" in resource["name"]:
+                # Subresource
+                continue
+            kinds.setdefault(resource["kind"], resource)
+        # Replaced at once, readers in other threads see either the old or the new resources
+        self._by_kind = {**self._by_kind, group_version: kinds}
+        self._base_paths[group_version] = base_path(group_version)
+
+    def get(self, group_version: str, kind: str) -> Optional[Dict[str, Any]]:
+        return self._by_kind.get(normalize_group_version(group_version), {}).get(kind)
+
+    def find(self, name: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Looks up a resource by its plural, singular or short name,
+        returns its group version and the resource.
+        """
+        by_kind, by_name = self._by_name
+        if by_kind is not self._by_kind:
+            by_kind = self._by_kind
+            by_name = _index_names(by_kind)
+            self._by_name = by_kind, by_name
+        return by_name.get(name.lower())
+
+    def base_path(self, group_version: str) -> str:
+        group_version = normalize_group_version(group_version)
+        path = self._base_paths.get(group_version)
+        return path if path else base_path(group_version)
+
+
+def _to_api_resource(resource: Dict[str, Any], name: str, kind: Optional[str], namespaced: bool) -> Dict[str, Any]:
+    # Translates aggregated discovery entries to the APIResource format of per group discovery
+    api_resource = {
+        "name": name,
+        "singularName": resource.get("singularResource", ""),
+        "namespaced": namespaced,
+        "kind": kind,
+        "verbs": resource.get("verbs", []),
+    }
+    if "shortNames" in resource:
+        api_resource["shortNames"] = resource["shortNames"]
+    if "categories" in resource:
+        api_resource["categories"] = resource["categories"]
+    return api_resource
+
+
+def parse_aggregated_discovery(document: Dict[str, Any]) -> Resources:
+    """
+    Converts an APIGroupDiscoveryList document into a map of
+    group version to resource list.
+    """
+    resources = {}
+    for group in document.get("items", []):
+        group_name = group.get("metadata", {}).get("name", "")
+        for version in group.get("versions", []):
+            group_version = f"{group_name}/{version['version']}" if group_name else version["version"]
+            group_resources = []
+            for resource in version.get("resources", []):
+                namespaced = resource.get("scope") == "Namespaced"
+                kind = resource.get("responseKind", {}).get("kind")
+                group_resources.append(_to_api_resource(resource, resource["resource"], kind, namespaced))
+                for subresource in resource.get("subresources", []):
+                    name = f"{resource['resource']}/{subresource['subresource']}"
+                    subresource_kind = subresource.get("responseKind", {}).get("kind", kind)
+                    group_resources.append(_to_api_resource(subresource, name, subresource_kind, namespaced))
+            resources[group_version] = group_resources
+    return resources
+
+
+class Discovery:
+    """
+    Discovers the resources served by an API server.
+    Aggregated discovery is used when the server supports it, getting
+    all groups in a single request. Otherwise the server returns the plain
+    group list, and group versions are fetched concurrently one by one.
+    Requests go through a fetch function which receives the path, the
+    accepted content types and an optional ETag, and returns a DiscoveryResponse.
+    """
+
+    def __init__(self, fetch: Callable[..., DiscoveryResponse], workers: int = 8):
+        self._fetch = fetch
+        self._workers = workers
+
+    def discover_core(self) -> List[Dict[str, Any]]:
+        return self._get_resources("/api/v1/", fail=True)
+
+    def discover(
+        self, include_core=False, etag=None, on_group: Optional[Callable[[str, List], None]] = None
+    ) -> Tuple[Optional[Resources], Optional[str]]:
+        """
+        Returns the resources by group version, plus the ETag of the group
+        list if any. When given an ETag and the server reports no changes,
+        returns None as resources. Group versions which fail to load are
+        left out, so they aren't cached as having no resources. The
+        on_group callback, if given, receives each group version as soon
+        as it is available.
+        """
+        start = time.monotonic()
+        response = self._fetch("/apis", accept=AGGREGATED_DISCOVERY_ACCEPT, etag=etag)
+
+        if response.status == _HTTP_NOT_MODIFIED:
+            _logger.info("Discovery not modified")
+            return None, etag
+
+        document = json.loads(response.body)
+
+        if _AGGREGATED_CONTENT_TYPE in (response.content_type or ""):
+            resources = parse_aggregated_discovery(document)
+            if include_core:
+                core = self._fetch("/api", accept=AGGREGATED_DISCOVERY_ACCEPT)
+                resources.update(parse_aggregated_discovery(json.loads(core.body)))
+            if on_group:
+                for group_version, group_resources in resources.items():
+                    on_group(group_version, group_resources)
+            _logger.info(f"Aggregated discovery of {len(resources)} groups in {time.monotonic() - start:.2f}s")
+            return resources, response.etag
+
+        paths = {
+            version["groupVersion"]: f"/apis/{version['groupVersion']}/"
+            for api_group in document.get("groups", [])
+            for version in api_group.get("versions", [])
+        }
+        if include_core:
+            paths["v1"] = "/api/v1/"
+
+        resources = {}
+        with ThreadPoolExecutor(max_workers=self._workers) as pool:
+            futures = {pool.submit(self._get_resources, path): group_version for group_version, path in paths.items()}
+            for future in as_completed(futures):
+                group_version = futures[future]
+                _logger.debug(f"Api group version {group_version}")
+                group_resources = future.result()
+                if group_resources is None:
+                    continue
+                resources[group_version] = group_resources
+                if on_group:
+                    on_group(group_version, group_resources)
+
+        _logger.info(f"Discovered {len(resources)} of {len(paths)} api groups in {time.monotonic() - start:.2f}s")
+        return resources, None
+
+    def _get_resources(self, path: str, fail=False) -> Optional[List[Dict[str, Any]]]:
+        _logger.info(f"get resource {path}")
+        try:
+            return json.loads(self._fetch(path).body)["resources"]
+        except Exception:
+            if fail:
+                raise
+            _logger.exception(f"Unable to get resource {path}")
+            return None
@@ -0,0 +1,92 @@
+import logging
+import threading
+
+from .discovery import normalize_group_version
+from .watch import ResourceWatcher
+
+_logger = logging.getLogger(__name__)
+
+
+class InformerCache:
+    """
+    Shares resource watchers across the list models of a cluster.
+    There is at most one cluster wide watcher per group version, kind,
+    selectors, projection, metadata only and table modes, models subscribe
+    to it and slice it by namespace in memory.
+    Watchers are reference counted, and stopped when the last model
+    releases them.
+    """
+
+    def __init__(self, cluster):
+        self._cluster = cluster
+        self._watchers = {}
+        self._references = {}
+        self._lock = threading.Lock()
+
+    def subscribe(
+        self,
+        api_group,
+        resource_kind,
+        page_size=None,
+        label_selector=None,
+        field_selector=None,
+        projection=None,
+        metadata_only=False,
+        table=False,
+    ) -> ResourceWatcher:
+        key = (
+            normalize_group_version(api_group),
+            resource_kind,
+            label_selector,
+            field_selector,
+            projection,
+            metadata_only,
+            table,
+        )
+        with self._lock:
+            watcher = self._watchers.get(key)
+            if not watcher:
+                _logger.info(f"Starting informer for {key} on {self._cluster}")
+                watcher = ResourceWatcher(
+                    self._cluster,
+                    api_group,
+                    resource_kind,
+                    page_size,
+                    label_selector,
+                    field_selector,
+                    projection,
+                    metadata_only,
+                    table,
+                )
+                watcher.start()
+                self._watchers[key] = watcher
+                self._references[key] = 0
+            self._references[key] += 1
+            return watcher
+
+    def release(self, watcher: ResourceWatcher):
+        key = (
+            normalize_group_version(watcher.api_group),
+            watcher.resource_kind,
+            watcher.label_selector,
+            watcher.field_selector,
+            watcher.projection,
+            watcher.metadata_only,
+            watcher.table,
+        )
+        with self._lock:
+            if self._watchers.get(key) is not watcher:
+                return
+            self._references[key] -= 1
+            if self._references[key] <= 0:
+                _logger.info(f"Stopping informer for {key} on {self._cluster}")
+                watcher.stop()
+                del self._watchers[key]
+                del self._references[key]
+
+    def clear(self):
+        with self._lock:
+            for watcher in self._watchers.values():
+                watcher.stop()
+            self._watchers = {}
+            self._references = {}
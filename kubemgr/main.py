@@ -1,12 +1,14 @@
 import configparser
 import logging
 import os
+import queue
+import signal
 import subprocess
+import threading
 from collections import defaultdict
 from typing import Any, Dict, Optional
 
 from cdtui import COLORS, Application, QuestionDialog, Rect, TabbedView, TextView, TitledView, ansi, kbd
-from jinja2 import Template
 
 from .actions import (
     CreateResource,
@@ -15,24 +17,32 @@ from .actions import (
     EditFilterAction,
     EditGlobalFilterAction,
     EditResource,
+    ShowClusterInfo,
     ShowHelp,
     ShowLogs,
     ShowNodeLabels,
+    ShowWorkloadLogs,
     ViewResource,
 )
 from .cluster import Cluster
 from .texts import CLUSTERS_CONFIG_EMPTY_TEMPLATE, CLUSTERS_CONFIG_TEMPLATE, KUBEMGR_DEFAUL_CONFIG_TEMPLATE, TEMPLATES
 from .util import misc
-from .util.executor import TaskExecutor
+from .util.executor import Task, TaskExecutor
+from .util.mappedtext import MappedText
 from .views.clusters import ClusterListView, ClustersListModel
 from .views.namespaces import NamespacesListModel, NamespacesListView, NsItem
 from .views.renderer import ItemRenderer
 from .views.resource import Filter, ResourceListModel, ResourceListView
+from .views.templates import TemplateStore
+from .views.textfile import MappedTextModel, TextFileView
 from .views.contexts import ContextsListModel, ContextsListView
 
 logging.basicConfig(handlers=[logging.FileHandler("kubemgr.log")], level=logging.DEBUG)
 _logger = logging.getLogger(__name__)
 
+# Kinds whose pods logs can be shown together
+_WORKLOAD_KINDS = {"Deployment", "DaemonSet", "StatefulSet", "ReplicaSet", "Job"}
+
 
 class TabInfo:
     def __init__(self, title, model, view):
@@ -45,13 +55,16 @@ class MainApp(Application):
     def __init__(self, config_dir):
         super().__init__()
         self._config_dir = config_dir
-        self._task_executor = TaskExecutor()
         self._clusters = []
         self._config = {}
-        self._templates = {}
+        self._templates = None
         self._filters = {}
         self._resource_views = []
+        self._popups = []
+        self._ui_callbacks = queue.SimpleQueue()
+        signal.signal(signal.SIGUSR1, self._run_ui_callbacks)
         first_time = self._read_configuration(config_dir)
+        self._task_executor = TaskExecutor(self.get_general_config().getint("workers", 4))
 
         self._clusters_model = ClustersListModel(self)
         self._clusters_view = ClusterListView(model=self._clusters_model, selectable=True)
@@ -62,7 +75,13 @@ class MainApp(Application):
         self._contexts_model = ContextsListModel(self)
         self._contexts_view = ContextsListView(model=self._contexts_model)
 
-        self._nodes_model = ResourceListModel(self, "Node")
+        watch = self.get_general_config().getboolean("watch", True)
+        page_size = self.get_general_config().getint("page_size", 500)
+        projection = self.get_general_config().getboolean("projection", False)
+
+        tabs_config = self._get_tabs_config()
+
+        self._nodes_model = ResourceListModel(self, "Node", watch=watch, page_size=page_size, projection=projection)
         self._nodes_view = ResourceListView(model=self._nodes_model)
         self._nodes_view.set_item_renderer(self._item_renderer)
 
@@ -70,17 +89,30 @@ class MainApp(Application):
         self._namespaces_view = NamespacesListView(model=self._namespaces_model)
         self._namespaces_view.on_select.add(self._on_namespace_selected)
 
-        self._pods_model = ResourceListModel(self, "Pod")
+        self._pods_model = ResourceListModel(
+            self,
+            "Pod",
+            watch=watch,
+            page_size=int(tabs_config["podstab"].get("page_size", page_size)),
+            projection=projection,
+        )
         self._pods_view = ResourceListView(model=self._pods_model)
         self._pods_view.set_item_renderer(self._item_renderer)
 
         self._custom_tabs = []
 
-        tabs_config = self._get_tabs_config()
-
         for tabname, config in tabs_config.items():
             if tabname != "podstab":
-                model = ResourceListModel(self, config["kind"], config["group_version"])
+                model = ResourceListModel(
+                    self,
+                    config["kind"],
+                    config["group_version"],
+                    watch=watch,
+                    page_size=int(config.get("page_size", page_size)),
+                    projection=projection,
+                    metadata_only=config.get("metadata_only", "false").lower() == "true",
+                    table=config.get("table", "false").lower() == "true",
+                )
                 view = ResourceListView(model=model)
                 self._custom_tabs.append(TabInfo(config["title"], model, view))
                 view.set_item_renderer(self._item_renderer)
@@ -148,7 +180,16 @@ class MainApp(Application):
         self.set_key_handler(kbd.keystroke_from_str("h"), help_action)
         self.set_key_handler(kbd.keystroke_from_str("c"), CreateResource(self))
         self._pods_view.set_key_handler(kbd.keystroke_from_str("l"), ShowLogs(self))
+        self._pods_view.set_key_handler(kbd.keystroke_from_str("L"), ShowLogs(self, follow=True))
         self._nodes_view.set_key_handler(kbd.keystroke_from_str("l"), ShowNodeLabels(self))
+        self._clusters_view.set_key_handler(kbd.keystroke_from_str("i"), ShowClusterInfo(self))
+
+        workload_logs_action = ShowWorkloadLogs(self)
+        follow_workload_logs_action = ShowWorkloadLogs(self, follow=True)
+        for tab in self._custom_tabs:
+            if tab.model.resource_kind in _WORKLOAD_KINDS:
+                tab.view.set_key_handler(kbd.keystroke_from_str("l"), workload_logs_action)
+                tab.view.set_key_handler(kbd.keystroke_from_str("L"), follow_workload_logs_action)
 
         self._resource_views = [self._pods_view, self._nodes_view, self._namespaces_view] + [
             tab.view for tab in self._custom_tabs
@@ -166,7 +207,7 @@ class MainApp(Application):
 
             if isinstance(view.model, ResourceListModel):
                 if view.model.resource_kind in self._filters:
-                    view.model.filter = Filter(self._filters[view.model.resource_kind])
+                    view.model.filter = Filter(self._filters[view.model.resource_kind], self._templates)
 
                 if global_filter:
                     view.model.global_filter = global_filter
@@ -211,14 +252,47 @@ class MainApp(Application):
     def clusters(self):
         return self._clusters
 
-    def add_task(self, task, loop=True):
-        self._task_executor.add_task(task, loop)
+    def add_task(self, task, loop=True, interval=None, priority=None, timeout=None) -> Task:
+        return self._task_executor.add_task(task, loop, interval, priority, timeout)
+
+    def call_in_ui(self, callback):
+        """
+        Runs a callback in the UI thread, for what background tasks can't
+        do, like pausing the application to run an external program. The
+        UI thread is woken with a signal, as it may be waiting for a key.
+        """
+        self._ui_callbacks.put(callback)
+        signal.pthread_kill(threading.main_thread().ident, signal.SIGUSR1)
+
+    def _run_ui_callbacks(self, *args):
+        while True:
+            try:
+                callback = self._ui_callbacks.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                callback()
+            except Exception as e:
+                self.show_error(e)
+
+    def open_popup(self, popup):
+        self._popups.append(popup)
+        super().open_popup(popup)
+
+    def close_popup(self):
+        super().close_popup()
+        if self._popups:
+            # Popups may need to release resources, like streams feeding them
+            popup = self._popups.pop()
+            if hasattr(popup, "on_close"):
+                popup.on_close()
 
     def show_question_dialog(self, title, message, options):
         def _wrap_op(f):
             def call():
-                f()
+                # Closed first, so popups opened by the option stay open
                 self.close_popup()
+                f()
 
             return call
 
@@ -226,46 +300,75 @@ class MainApp(Application):
         dialog = QuestionDialog(title, message, options)
         self.open_popup(dialog)
 
-    def show_text_popup(self, text: str):
+    def popup_rect(self) -> Rect:
         max_height, max_width = ansi.terminal_size()
 
         popup_width = int(max_width * 0.75)
         popup_height = int(max_height * 0.75)
 
-        rect = Rect(
+        return Rect(
             int((max_width - popup_width) / 2),
             int((max_height - popup_height) / 2),
             popup_width,
             popup_height,
         )
-        text_view = TextView(rect=rect, text=text)
+
+    def show_text_popup(self, text: str):
+        text_view = TextView(rect=self.popup_rect(), text=text)
         self.open_popup(text_view)
 
-    def show_file(self, text: str, format_hint=None, force_internal_viewer=False):
-        viewer = self.get_general_config().get("viewer")
+    def get_viewer(self) -> Optional[str]:
+        return self.get_general_config().get("viewer")
 
-        if viewer and not force_internal_viewer:
-            tf = misc.make_tempfile(text, format_hint)
+    def run_viewer(self, path: str):
+        with self.pause_app():
+            subprocess.run([self.get_viewer(), path])
+        self.refresh()
 
-            with self.pause_app():
-                subprocess.run([viewer, tf.name])
-            self.refresh()
-        else:
+    def show_text_file(self, path: str, remove=False):
+        """
+        Shows a text file in the internal viewer, which maps it in memory,
+        so files of any size open right away. The file is removed when
+        the viewer is closed, if asked to.
+        """
+        model = MappedTextModel(MappedText(path))
+        self.open_popup(TextFileView(self.popup_rect(), model, path, remove))
+
+    def show_file(self, text: str, format_hint=None, force_internal_viewer=False):
+        viewer = self.get_viewer()
+
+        if force_internal_viewer:
+            # Keeps the formatting of custom templates
             self.show_text_popup(text)
+            return
+
+        tf = misc.make_tempfile(text, format_hint)
+        tf.close()
+        if viewer:
+            try:
+                self.run_viewer(tf.name)
+            finally:
+                os.unlink(tf.name)
+        else:
+            self.show_text_file(tf.name, remove=True)
 
     def edit_file(self, text: str, format_hint=None) -> Optional[str]:
         editor = self.get_general_config().get("editor")
         if editor:
             tf = misc.make_tempfile(text, format_hint)
-
-            with self.pause_app():
-                result = subprocess.run([editor, tf.name])
-            self.refresh()
-            if result.returncode == 0:
-                tf.seek(0)
-                new_text = tf.read()
-                if new_text != text:
-                    return new_text
+            try:
+                with self.pause_app():
+                    result = subprocess.run([editor, tf.name])
+                self.refresh()
+                if result.returncode == 0:
+                    # Editors may write a new file in place of the original one
+                    with open(tf.name) as edited:
+                        new_text = edited.read()
+                    if new_text != text:
+                        return new_text
+            finally:
+                tf.close()
+                os.unlink(tf.name)
         return None
 
     def _format_error(self, error: Any) -> str:
@@ -282,9 +385,25 @@ class MainApp(Application):
             model.namespace = namespace
         self._update_view()
 
+    @property
+    def cache_dir(self) -> str:
+        return os.path.join(self._config_dir, "cache")
+
     def get_general_config(self):
         return self._config["general"]
 
+    def get_concurrent_requests(self) -> int:
+        """
+        Number of requests that may be running at once against a cluster:
+        one per background worker, a watch per tab, and pod logs.
+        """
+        config = self.get_general_config()
+        requests = config.getint("workers", 4)
+        if config.getboolean("watch", True):
+            # Tabs plus nodes
+            requests += len(self._get_tabs_config()) + 1
+        return requests + max(config.getint("log_workers", 8), config.getint("log_max_streams", 20))
+
     def _get_tabs_config(self) -> Dict[str, Any]:
         config = defaultdict(dict)
         tabs_config = self._config["tabs"]
@@ -303,8 +422,7 @@ class MainApp(Application):
         self._read_general_config(config_dir)
         self._read_colors_config(config_dir)
         self._read_clusters_config(config_dir)
-        self._read_item_templates(config_dir)
-        self._read_detail_templates(config_dir)
+        self._read_templates(config_dir)
         self._read_filters(config_dir)
 
         return first_time
@@ -375,41 +493,35 @@ class MainApp(Application):
             self._clusters.append(cluster)
             cluster.connect()
 
-    def _read_item_templates(self, config_dir: str):
-        templates_dir = os.path.join(config_dir, "item-templates")
+    def _read_templates(self, config_dir: str):
+        item_templates_dir = os.path.join(config_dir, "item-templates")
 
-        if not os.path.isdir(templates_dir):
+        if not os.path.isdir(item_templates_dir):
             # Create default templates
-            os.makedirs(templates_dir)
+            os.makedirs(item_templates_dir)
             for name, template in TEMPLATES.items():
-                with open(os.path.join(templates_dir, f"{name}.tpl"), "w") as f:
+                with open(os.path.join(item_templates_dir, f"{name}.tpl"), "w") as f:
                     f.write(template)
 
-        templates = {}
-        for fname in os.listdir(templates_dir):
-            if fname[-4:] == ".tpl":
-                try:
-                    with open(os.path.join(templates_dir, fname), "r") as f:
-                        templates[fname.replace(".tpl", "")] = Template(f.read())
-                except Exception as e:
-                    _logger.error(f"Error loading template {fname}", e)
-        self._item_templates = templates
-
-    def _read_detail_templates(self, config_dir: str):
-        templates_dir = os.path.join(config_dir, "detail-templates")
-
-        if not os.path.isdir(templates_dir):
-            os.makedirs(templates_dir)
-
-        templates = {}
-        for fname in os.listdir(templates_dir):
-            if fname[-4:] == ".tpl":
-                try:
-                    with open(os.path.join(templates_dir, fname), "r") as f:
-                        templates[fname.replace(".tpl", "")] = Template(f.read())
-                except Exception as e:
-                    _logger.error(f"Error loading template {fname}", e)
-        self._detail_templates = templates
+        detail_templates_dir = os.path.join(config_dir, "detail-templates")
+
+        if not os.path.isdir(detail_templates_dir):
+            os.makedirs(detail_templates_dir)
+
+        self._templates = TemplateStore(config_dir, os.path.join(self.cache_dir, "templates"))
+
+    @property
+    def templates(self) -> TemplateStore:
+        return self._templates
+
+    def get_item_template(self, kind: str):
+        return self._templates.get_item_template(kind)
+
+    def get_item_fields(self, kind: str):
+        return self._templates.get_item_fields(kind)
+
+    def get_detail_template(self, kind: str):
+        return self._templates.get_detail_template(kind)
 
     def _read_filters(self, config_dir: str):
         filters_dir = os.path.join(self._config_dir, "filters")
@@ -431,7 +543,7 @@ class MainApp(Application):
     def set_global_filter(self, filter_string):
         self.save_filter("GLOBAL", filter_string)
 
-        global_filter = Filter(filter_string) if filter_string else None
+        global_filter = Filter(filter_string, self._templates) if filter_string else None
 
         for view in self._resource_views:
             if isinstance(view.model, ResourceListModel):
@@ -439,7 +551,7 @@ class MainApp(Application):
 
     def _build_global_filter(self) -> Optional[Filter]:
         filter_string = self.get_global_filter()
-        return Filter(filter_string) if filter_string else None
+        return Filter(filter_string, self._templates) if filter_string else None
 
     def save_filter(self, kind, filter_text: str):
         self._filters[kind] = filter_text
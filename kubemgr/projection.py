@@ -0,0 +1,67 @@
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+Path = Tuple[str, ...]
+
+# Fields every object keeps, as they identify it
+REQUIRED_PATHS = frozenset(
+    [
+        ("metadata", "name"),
+        ("metadata", "namespace"),
+        ("metadata", "uid"),
+        ("metadata", "resourceVersion"),
+    ]
+)
+
+
+def _build_tree(paths: Iterable[Path]) -> Dict[str, Any]:
+    # Leaves are None, and mean the whole value is kept
+    tree = {}
+    for path in sorted(paths, key=len):
+        node = tree
+        for key in path[:-1]:
+            child = node.setdefault(key, {})
+            if child is None:
+                break
+            node = child
+        else:
+            node[path[-1]] = None
+    return tree
+
+
+def _project(value: Any, tree: Optional[Dict[str, Any]]) -> Any:
+    if tree is None:
+        return value
+    if isinstance(value, dict):
+        return {key: _project(value[key], subtree) for key, subtree in tree.items() if key in value}
+    if isinstance(value, list):
+        return [_project(element, tree) for element in value]
+    return value
+
+
+class Projection:
+    """
+    Keeps only some fields of objects, given as paths. Lists along a path
+    are projected element by element, and a path ending in a dict or a
+    list keeps it whole. Projections with the same paths are equal, so
+    they can be part of cache keys.
+    """
+
+    def __init__(self, paths: Iterable[Path]):
+        self._paths = frozenset(paths) | REQUIRED_PATHS
+        self._tree = _build_tree(self._paths)
+
+    @property
+    def paths(self) -> FrozenSet[Path]:
+        return self._paths
+
+    def __call__(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        return _project(item, self._tree)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Projection) and self._paths == other._paths
+
+    def __hash__(self) -> int:
+        return hash(self._paths)
+
+    def __repr__(self) -> str:
+        return f"Projection({sorted('.'.join(path) for path in self._paths)})"
@@ -0,0 +1,54 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Content type asking the server to render collections as tables
+TABLE_ACCEPT = "application/json;as=Table;g=meta.k8s.io;v=v1,application/json"
+
+Columns = List[Dict[str, Any]]
+
+
+def is_table(document: Dict[str, Any]) -> bool:
+    return document.get("kind") == "Table"
+
+
+def table_rows(rows: Iterable[Dict[str, Any]], columns: Columns) -> Iterator[Dict[str, Any]]:
+    """
+    Converts table rows, requested with includeObject=Metadata, into
+    items with the object metadata and a map of column name to cell.
+    """
+    names = [column["name"] for column in columns]
+    for row in rows:
+        yield {"metadata": (row.get("object") or {}).get("metadata", {}), "columns": dict(zip(names, row["cells"]))}
+
+
+def table_items(table: Dict[str, Any], columns: Optional[Columns] = None) -> List[Dict[str, Any]]:
+    """
+    Converts the rows of a table into items, as table_rows does.
+    Tables sent in watch events only include column definitions in the
+    first event, so they can be given.
+    """
+    return list(table_rows(table.get("rows") or [], table.get("columnDefinitions") or columns or []))
+
+
+def table_events(events: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Converts a stream of watch events whose objects are tables into one
+    event per row, with items as table_items returns them.
+    """
+    columns = None
+    for event in events:
+        table = event["object"]
+        if not is_table(table):
+            yield event
+            continue
+        columns = table.get("columnDefinitions") or columns
+        items = table_items(table, columns)
+        if not items:
+            # Bookmarks carry no rows, only the resource version
+            yield {"type": event["type"], "object": {"metadata": table.get("metadata", {})}}
+        for item in items:
+            yield {"type": event["type"], "object": item}
+
+
+def visible_columns(columns: Columns) -> Columns:
+    # Columns with a higher priority are only shown by kubectl in wide output
+    return [column for column in columns if column.get("priority", 0) == 0]
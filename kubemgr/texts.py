@@ -12,17 +12,46 @@ configfile={cluster_file}
 KUBEMGR_DEFAUL_CONFIG_TEMPLATE = """[general]
 # Editor for yaml resource files
 editor=/usr/bin/vim
-# Viewer for yaml and logs, if not set uses internal viewer (I haven't put too much effort on it).
+# Viewer for yaml and logs, if not set uses internal viewer. Followed logs always use the internal viewer.
+# In the internal viewer, / searches, n finds next, : jumps to a line, g and G go to first and last lines.
 viewer=/usr/bin/view
+# Keep lists up to date by watching for changes instead of listing resources every second.
+watch=true
+# Number of background threads used to fetch data from clusters.
+workers=4
+# Number of items requested per page when listing resources, can be also set per tab.
+page_size=500
+# Keep in memory only the fields of resources used by item templates and filters.
+projection=false
+# Number of last log lines requested when showing pod logs.
+log_tail_lines=1000
+# Maximum log bytes requested when not following logs.
+log_limit_bytes=10485760
+# Only request logs newer than a number of seconds.
+#log_since_seconds=3600
+# Prefix log lines with their timestamp.
+log_timestamps=false
+# Maximum log lines kept by the internal viewer while following logs.
+log_buffer_lines=10000
+# Number of pods whose logs are requested at once, for workloads.
+log_workers=8
+# Maximum number of pods followed at once, for workloads.
+log_max_streams=20
 [tabs]
 # Fixed tab, allows basic customizing
 # Uses basic python formatting with some exceptions.
 # MAX is replaced by the available width.
 podstab.format=item.metadata.name:MAX,item.status.phase:>10
+#podstab.page_size=500
 
 # Custom tabs
 # You can add more tabs by specifying a title, resource kind and group_version (AKA version). 
 # The prefix (tabN) is just for differentiating them.
+# Optionally, tabN.page_size sets the number of items requested per page.
+# Optionally, tabN.metadata_only=true only requests the metadata of resources, the whole
+# resource is requested when viewing or editing it.
+# Optionally, tabN.table=true shows the columns the server computes for the resource, as
+# kubectl get does, without needing an item template. Useful for custom resources.
 tab1.title=Cronjobs
 tab1.kind=CronJob
 tab1.group_version=batch/v1beta1
@@ -46,10 +75,19 @@ tab5.group_version=apps/v1
 tab6.title=ConfigMaps
 tab6.kind=ConfigMap
 tab6.group_version=v1
+tab6.metadata_only=true
 
 tab7.title=Secrets
 tab7.kind=Secret
 tab7.group_version=v1
+# Secret type is not part of metadata, it won't be shown with this option.
+#tab7.metadata_only=true
+
+# Custom resources can be shown with their printer columns, for instance:
+#tab8.title=Certificates
+#tab8.kind=Certificate
+#tab8.group_version=cert-manager.io/v1
+#tab8.table=true
 """
 HELP_CONTENTS = f"""
 {ansi.BOLD}Help:{ansi.RESET}
@@ -71,7 +109,13 @@ HELP_CONTENTS = f"""
         c: Creates/updates a kubernetes resource from a yaml file.
         f: Edit filters for a given view
     for pods:
-        l: View pod logs.
+        l: View the last lines of pod logs.
+        L: Follow pod logs as they arrive.
+    for deployments, daemonsets, statefulsets, replicasets and jobs:
+        l: View the last lines of the logs of all their pods.
+        L: Follow the logs of all their pods.
+    for clusters:
+        i: show connection pool usage.
     for nodes:
         l: view labels for node.
     for namespaces:
@@ -88,6 +132,9 @@ HELP_CONTENTS = f"""
         Clusters configuration file.
         [Cluster name enclosed in brackets]
         configfile=[Absolute path to kubeconfig yaml file]
+        pool_size=[Maximum connections kept open to the cluster]
+        qps=[Requests per second sent to the cluster, 0 for no limit]
+        burst=[Requests sent at once before limiting them]
 
     {ansi.BOLD}$HOME/.kubemgr/colors.ini:{ansi.RESET}
         UI colors and styles.
@@ -156,6 +203,10 @@ FILTER_TEMPLATE = """{#
  The resources being filtered are exposed to jinja context as the variable "item".
  For example:
  item.metadata.name == 'pod1'
+ Simple comparisons of labels and names joined by "and" are also sent to the server
+ as selectors, to reduce the amount of data transferred. Selectors can be also set
+ explicitly, each one in its own comment, like "labelSelector: app=web" or
+ "fieldSelector: status.phase=Running" enclosed in comment delimiters.
 #}
 {{ True }}
 """
@@ -169,6 +220,10 @@ GLOBAL_FILTER_TEMPLATE = """{#
  The resources being filtered are exposed to jinja context as the variable "item".
  For example:
  item.metadata.name == 'pod1'
+ Simple comparisons of labels and names joined by "and" are also sent to the server
+ as selectors, to reduce the amount of data transferred. Selectors can be also set
+ explicitly, each one in its own comment, like "labelSelector: app=web" or
+ "fieldSelector: status.phase=Running" enclosed in comment delimiters.
 #}
 {{ True }}
 """
@@ -0,0 +1,211 @@
+import socket
+import ssl
+import threading
+from collections import namedtuple
+from typing import Any, Callable, Iterator, Optional
+
+ConnectionStats = namedtuple(
+    "ConnectionStats", ["pool_size", "requests", "connections", "handshakes", "resumed"]
+)
+
+
+class _SessionRecordingSocket(ssl.SSLSocket):
+    """
+    Socket giving its session to its context once it can be resumed, and
+    again before closing, to keep the latest one. With TLS 1.3, tickets
+    only arrive after the handshake, with the first data read.
+    """
+
+    _recorded = False
+
+    def do_handshake(self, *args, **kwargs):
+        super().do_handshake(*args, **kwargs)
+        self._record_session()
+
+    def recv_into(self, *args, **kwargs):
+        received = super().recv_into(*args, **kwargs)
+        if not self._recorded:
+            self._record_session()
+        return received
+
+    def unwrap(self):
+        self._record_session()
+        return super().unwrap()
+
+    def close(self):
+        self._record_session()
+        super().close()
+
+    def _record_session(self):
+        context = self.context
+        # Only wrapped sockets have a session
+        if not isinstance(context, SessionReusingContext) or getattr(self, "_sslobj", None) is None:
+            return
+        session = self.session
+        # TLS 1.3 sessions can only be resumed with a ticket
+        if session is not None and (session.has_ticket or self.version() != "TLSv1.3"):
+            context.record_session(self.server_hostname, session)
+            self._recorded = True
+
+
+class SessionReusingContext(ssl.SSLContext):
+    """
+    SSL context offering servers the last session of a connection to the
+    same host when opening a new one, so servers supporting session
+    resumption skip the full handshake. Counts handshakes, and how many
+    resumed a session.
+    """
+
+    sslsocket_class = _SessionRecordingSocket
+
+    def __new__(cls, protocol=ssl.PROTOCOL_TLS_CLIENT, *args, **kwargs):
+        return super().__new__(cls, protocol, *args, **kwargs)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.handshakes = 0
+        self.resumed = 0
+
+    def wrap_socket(self, sock, *args, server_hostname=None, session=None, **kwargs):
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(server_hostname)
+        ssl_sock = super().wrap_socket(sock, *args, server_hostname=server_hostname, session=session, **kwargs)
+        with self._lock:
+            self.handshakes += 1
+            if ssl_sock.session_reused:
+                self.resumed += 1
+        return ssl_sock
+
+    def record_session(self, hostname: Optional[str], session: Optional[ssl.SSLSession]):
+        """
+        Keeps the session of a connection to a host, to offer it to the
+        next connection to the same host.
+        """
+        if session is not None:
+            with self._lock:
+                self._sessions[hostname] = session
+
+
+def create_ssl_context(verify_ssl: bool = True) -> SessionReusingContext:
+    """
+    Creates a context for a pool of connections. Certificates and keys are
+    loaded by urllib3 from the pool settings, as with its own contexts.
+    """
+    context = SessionReusingContext()
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.options |= ssl.OP_NO_COMPRESSION
+    if not verify_ssl:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def connection_stats(pool_manager, ssl_context: Optional[SessionReusingContext] = None) -> ConnectionStats:
+    """
+    Adds up the requests of the pools of a urllib3 pool manager, and the
+    connections they opened. Connections are counted by the handshakes
+    done with a session reusing context, as pools don't count those opened
+    again when dropped. Without handshakes, that is over plain http, only
+    the new connections of the pools are known.
+    """
+    requests = new_connections = 0
+    pools = pool_manager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is not None:
+            requests += pool.num_requests
+            new_connections += pool.num_connections
+    handshakes = ssl_context.handshakes if ssl_context else 0
+    return ConnectionStats(
+        pool_manager.connection_pool_kw.get("maxsize", 1),
+        requests,
+        handshakes or new_connections,
+        handshakes,
+        ssl_context.resumed if ssl_context else 0,
+    )
+
+
+class ResponseChunks:
+    """
+    Iterator over the body of a response in chunks as they arrive, the
+    request is sent when the first chunk is requested. It can be closed
+    from another thread while waiting for a chunk, which ends the wait,
+    so streams without read timeout, like followed logs, can be stopped.
+    The connection is given back to the pool once the body is read, or
+    closed if the stream is.
+    """
+
+    def __init__(self, request: Callable[[], Any], chunk_size: int):
+        self._request = request
+        self._chunk_size = chunk_size
+        self._response = None
+        self._chunks = None
+        self._reading = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        with self._lock:
+            closed = self._closed
+            self._reading = not closed
+        if closed:
+            self._release()
+            raise StopIteration
+        try:
+            if self._chunks is None:
+                response = self._request()
+                with self._lock:
+                    self._response = response
+                if self._closed:
+                    raise StopIteration
+                self._chunks = response.stream(self._chunk_size, decode_content=True)
+            return next(self._chunks)
+        except StopIteration:
+            self._release()
+            raise
+        except Exception:
+            self._release()
+            if self._closed:
+                # Interrupted by close
+                raise StopIteration
+            raise
+        finally:
+            with self._lock:
+                self._reading = False
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            response = self._response
+            reading = self._reading
+        if response is None:
+            return
+        if reading:
+            # Wakes the reader up, which releases the response
+            _shutdown(response)
+        else:
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            response, self._response = self._response, None
+        if response is not None:
+            if self._closed:
+                response.close()
+            response.release_conn()
+
+
+def _shutdown(response):
+    connection = getattr(response, "connection", None) or getattr(response, "_connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
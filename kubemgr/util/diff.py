@@ -0,0 +1,63 @@
+import operator
+from collections import namedtuple
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+# Indexes of inserted and updated items are positions in the new list,
+# removed ones positions in the old list. Moved maps old positions of
+# kept items to their new positions.
+ListChange = namedtuple("ListChange", ["inserted", "updated", "removed", "moved"])
+
+
+def diff_lists(
+    old: List, new: List, key: Callable[[Any], Hashable], version: Callable[[Any], Any]
+) -> Tuple[List, Optional[ListChange]]:
+    """
+    Compares two lists of items by identity and version in a single pass.
+    Returns the list to keep, where unchanged items are the instances
+    from the old list, plus the changes found, or None if there are none.
+    """
+    if len(old) == len(new) and all(map(operator.is_, old, new)):
+        # Same instances, as returned by watchers when nothing changed
+        return old, None
+
+    # Items still being the same instance are matched first, so keys
+    # are only worked out for the rest
+    identities = {id(item): index for index, item in enumerate(old)}
+    result = list(new)
+    pending = []
+    moved = {}
+    reordered = False
+
+    for index, item in enumerate(new):
+        old_index = identities.pop(id(item), None)
+        if old_index is None:
+            pending.append(index)
+        else:
+            moved[old_index] = index
+            reordered = reordered or old_index != index
+
+    inserted = []
+    updated = []
+    positions = {key(old[old_index]): old_index for old_index in identities.values()} if pending else {}
+
+    for index in pending:
+        item = new[index]
+        old_index = positions.pop(key(item), None)
+        if old_index is None:
+            inserted.append(index)
+            continue
+        previous = old[old_index]
+        item_version = version(item)
+        if item_version is not None and item_version == version(previous):
+            result[index] = previous
+        else:
+            updated.append(index)
+        moved[old_index] = index
+        reordered = reordered or old_index != index
+
+    removed = sorted(positions.values() if pending else identities.values())
+
+    if not (inserted or updated or removed or reordered):
+        return old, None
+
+    return result, ListChange(inserted, updated, removed, moved)
@@ -3,48 +3,170 @@ import time
 import logging
 import traceback
 
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+_WATCHDOG_INTERVAL = 0.5
+
+
+class Task:
+    """
+    A handle to a task scheduled on a TaskExecutor.
+    """
+
+    def __init__(self, executor, function, loop, interval, priority, timeout):
+        self._executor = executor
+        self.function = function
+        self.loop = loop
+        self.interval = interval
+        self.priority = priority
+        self.base_priority = priority
+        self.timeout = timeout
+        self.due = time.monotonic()
+        self.started = None
+        self.overdue = False
+        self.cancelled = False
+        self.finished = False
+        self.rerun = False
+
+    @property
+    def running(self) -> bool:
+        return self.started is not None
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run_now(self, priority=PRIORITY_INTERACTIVE) -> bool:
+        """
+        Schedules the task to run as soon as possible, or to run again right
+        after the current execution if it is running. Several calls before
+        the task starts result in a single execution.
+        Returns False if the task is one-shot and already finished.
+        """
+        return self._executor._run_now(self, priority)
+
+    def __str__(self):
+        return f"Task {getattr(self.function, '__qualname__', self.function)}"
+
 
 class TaskExecutor:
     """
-    A background thread where to push things when we don't want to 
-    block UI. 
-    Cycles over tasks every second. Tasks can run only once or on every loop.
+    A pool of background threads where to push things when we don't want to
+    block UI.
+    Tasks can run only once or periodically, each one with its own interval,
+    priority and timeout. When several tasks are due, lower priority values
+    run first. A periodic task never runs concurrently with itself.
+    Timeouts can't interrupt a task, but a task running over its timeout
+    gets its worker replaced so the pool keeps its capacity.
     """
 
-    def __init__(self):
-        self._thread = threading.Thread(target=self._run, daemon=True)
+    def __init__(self, workers=4, interval=1):
+        self._max_workers = workers
+        self._interval = interval
+        self._workers = set()
         self._tasks = []
-        self._active = True
-        self._lock = threading.Lock()
+        self._active = False
+        self._condition = threading.Condition()
 
     def start(self):
-        self._thread.start()
+        with self._condition:
+            self._active = True
+            for _ in range(self._max_workers):
+                self._spawn_worker()
+        threading.Thread(target=self._watchdog, daemon=True).start()
 
-    def add_task(self, task, loop=True):
-        with self._lock:
-            self._tasks.append((task, loop))
+    def add_task(self, task, loop=True, interval=None, priority=None, timeout=None) -> Task:
+        if priority is None:
+            priority = PRIORITY_BACKGROUND if loop else PRIORITY_INTERACTIVE
+        item = Task(self, task, loop, interval or self._interval, priority, timeout)
+        with self._condition:
+            self._tasks.append(item)
+            self._condition.notify()
+        return item
 
     def finish(self):
-        if self._active and self._thread:
+        with self._condition:
             self._tasks.clear()
             self._active = False
+            self._condition.notify_all()
 
-    def _run(self):
+    def _run_now(self, task, priority) -> bool:
+        with self._condition:
+            if task.finished or task.cancelled:
+                return False
+            if task.running:
+                task.rerun = True
+            task.due = min(task.due, time.monotonic())
+            task.priority = min(task.priority, priority)
+            self._condition.notify()
+            return True
+
+    def _spawn_worker(self):
+        worker = threading.Thread(target=self._run, daemon=True)
+        self._workers.add(worker)
+        worker.start()
+
+    def _next_task(self):
+        """
+        Waits for the next task due to run, must be called holding the condition.
+        """
         while self._active:
+            now = time.monotonic()
+            self._tasks = [t for t in self._tasks if not t.cancelled]
+            waiting = [t for t in self._tasks if not t.running]
+            ready = [t for t in waiting if t.due <= now]
+            if ready:
+                task = min(ready, key=lambda t: (t.priority, t.due))
+                task.started = now
+                return task
+            next_due = min([t.due for t in waiting], default=None)
+            self._condition.wait(next_due - now if next_due is not None else None)
+        return None
+
+    def _run(self):
+        worker = threading.current_thread()
+        while True:
+            with self._condition:
+                task = self._next_task()
+            if not task:
+                break
+
             try:
-                to_remove = set()
-                for item in self._tasks:
-                    task, loop = item
-                    try:
-                        task()
-                    except Exception as e:
-                        logging.error(str(e) + str(traceback.format_exc()))
-                    if not loop:
-                        to_remove.add(item)
-
-                with self._lock:
-                    self._tasks = [t for t in self._tasks if not t in to_remove]
+                task.function()
             except Exception as e:
                 logging.error(str(e) + str(traceback.format_exc()))
 
-            time.sleep(1)
+            with self._condition:
+                overdue = task.overdue
+                task.started = None
+                task.overdue = False
+                task.priority = task.base_priority
+                if task.rerun:
+                    task.rerun = False
+                    task.due = time.monotonic()
+                elif task.loop:
+                    task.due = time.monotonic() + task.interval
+                else:
+                    task.finished = True
+                    if task in self._tasks:
+                        self._tasks.remove(task)
+                self._condition.notify()
+
+                if overdue:
+                    logging.warning(f"{task} finished after its timeout")
+                    if len(self._workers) > self._max_workers:
+                        # This worker was already replaced
+                        break
+        with self._condition:
+            self._workers.discard(worker)
+
+    def _watchdog(self):
+        while self._active:
+            time.sleep(_WATCHDOG_INTERVAL)
+            now = time.monotonic()
+            with self._condition:
+                for task in self._tasks:
+                    if task.running and task.timeout and not task.overdue and now - task.started > task.timeout:
+                        logging.warning(f"{task} exceeded its timeout of {task.timeout}s")
+                        task.overdue = True
+                        self._spawn_worker()
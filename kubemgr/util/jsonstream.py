@@ -0,0 +1,131 @@
+import codecs
+import itertools
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+_END = object()
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Decodes a whole JSON document, with orjson if it is installed.
+    Bytes are decoded as they are, without making a string copy first.
+    """
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class _Buffer:
+    """
+    Text decoded from a stream of chunks, where only the part not
+    consumed yet is kept.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._text = ""
+        self._pos = 0
+        self._ended = False
+
+    def _fill(self) -> bool:
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self._text = self._text[self._pos :] + text
+                self._pos = 0
+                return True
+        self._ended = True
+        return False
+
+    def _error(self, message: str):
+        return json.JSONDecodeError(message, self._text, self._pos)
+
+    def peek(self) -> str:
+        while True:
+            self._pos = _WHITESPACE.match(self._text, self._pos).end()
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            if not self._fill():
+                raise self._error("Unexpected end of document")
+
+    def next_char(self) -> str:
+        char = self.peek()
+        self._pos += 1
+        return char
+
+    def expect(self, expected: str):
+        if self.next_char() != expected:
+            raise self._error(f"Expecting '{expected}'")
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._text, self._pos)
+                # A value reaching the end of the text may be a truncated number
+                if end < len(self._text) or self._ended:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._ended:
+                    raise
+            # Reads until the pending text doubles, so values spanning
+            # many chunks aren't decoded over and over.
+            pending = len(self._text) - self._pos
+            while len(self._text) - self._pos < 2 * pending and self._fill():
+                pass
+
+
+def _members(buffer: _Buffer, document: Dict[str, Any], items_key: str) -> Iterator[Any]:
+    buffer.expect("{")
+    if buffer.peek() == "}":
+        return
+    while True:
+        key = buffer.value()
+        buffer.expect(":")
+        if key == items_key and buffer.peek() == "[":
+            buffer.expect("[")
+            if buffer.peek() == "]":
+                buffer.expect("]")
+            else:
+                while True:
+                    yield buffer.value()
+                    char = buffer.next_char()
+                    if char == "]":
+                        break
+                    if char != ",":
+                        raise buffer._error("Expecting ',' or ']'")
+        else:
+            document[key] = buffer.value()
+        char = buffer.next_char()
+        if char == "}":
+            return
+        if char != ",":
+            raise buffer._error("Expecting ',' or '}'")
+
+
+def stream_list(chunks: Iterable[bytes], items_key: str = "items") -> Dict[str, Any]:
+    """
+    Decodes a list document as its chunks arrive. The returned document
+    has the fields before the items array already decoded, and an
+    iterator decoding items one at a time in place of the array. Fields
+    after the array are only there once items are consumed.
+    """
+    document = {}
+    members = _members(_Buffer(chunks), document, items_key)
+    first = next(members, _END)
+    if first is _END:
+        document[items_key] = iter(document.get(items_key) or ())
+    else:
+        document[items_key] = itertools.chain([first], members)
+    return document
@@ -0,0 +1,69 @@
+import collections
+import threading
+from typing import List, Tuple
+
+
+def decode_line(line: bytes) -> str:
+    return line.decode(errors="replace").rstrip("\r")
+
+
+def split_lines(pending: bytes, chunk: bytes) -> Tuple[List[str], bytes]:
+    """
+    Splits a chunk of a stream into lines, where pending is the
+    incomplete line left by the previous chunk. Returns the complete
+    lines, and the new incomplete one.
+    """
+    lines = (pending + chunk).split(b"\n")
+    pending = lines.pop()
+    return [decode_line(line) for line in lines], pending
+
+
+class LineBuffer:
+    """
+    Keeps the last lines of a stream of text chunks, older lines are
+    discarded once the maximum is reached. Chunks may end in the middle
+    of a line, which is completed by the next chunk. The version
+    increases on every change, so readers can tell when to read again.
+    """
+
+    def __init__(self, max_lines: int):
+        self._lines = collections.deque(maxlen=max_lines)
+        self._pending = b""
+        self._discarded = 0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def discarded(self) -> int:
+        """
+        Number of lines discarded for exceeding the maximum.
+        """
+        return self._discarded
+
+    def write(self, chunk: bytes):
+        lines, self._pending = split_lines(self._pending, chunk)
+        if lines:
+            self.append(lines)
+
+    def close(self):
+        """
+        Adds the last line, if the stream didn't end with a new line.
+        """
+        if self._pending:
+            self.append([decode_line(self._pending)])
+            self._pending = b""
+
+    def append(self, lines: List[str]):
+        with self._lock:
+            maxlen = self._lines.maxlen
+            self._discarded += max(0, len(self._lines) + len(lines) - maxlen)
+            self._lines.extend(lines[-maxlen:])
+            self._version += 1
+
+    def get_lines(self) -> List[str]:
+        with self._lock:
+            return list(self._lines)
@@ -0,0 +1,116 @@
+import heapq
+import itertools
+import re
+import threading
+import time
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+from .lines import decode_line, split_lines
+
+_TIMESTAMP = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}")
+
+
+def timestamp_key(timestamp: str) -> str:
+    """
+    Sort key of an RFC 3339 timestamp, as the API prefixes log lines with
+    when asked for timestamps. Fractions of seconds come without their
+    trailing zeros, so they are padded to compare as text.
+    """
+    seconds, _, fraction = timestamp.partition(".")
+    return seconds[:19] + fraction.rstrip("Z").ljust(9, "0")
+
+
+def _format(name: str, line: str, timestamps: bool) -> Tuple[str, str]:
+    timestamp, _, text = line.partition(" ")
+    if not _TIMESTAMP.match(timestamp):
+        # Not a log line, like errors reading logs, these go first
+        return "", f"[{name}] {line}"
+    return timestamp_key(timestamp), f"[{name}] {line if timestamps else text}"
+
+
+def _keyed(name: str, lines: Iterable[str], timestamps: bool) -> Iterator[Tuple[str, str]]:
+    for line in lines:
+        yield _format(name, line, timestamps)
+
+
+def merge_lines(sources: Iterable[Tuple[str, Iterable[str]]], timestamps: bool = False) -> Iterator[str]:
+    """
+    Merges log lines of several sources, given as (name, lines), in
+    timestamp order. Lines of each source are in order already, as logs
+    are, and must start with their timestamp. Lines are prefixed with
+    the source name, and only keep their timestamp if asked to.
+    """
+    keyed = [_keyed(name, lines, timestamps) for name, lines in sources]
+    for _, line in heapq.merge(*keyed):
+        yield line
+
+
+class LiveMerger:
+    """
+    Merges log lines of several followed sources as they arrive. Lines are
+    held for a delay after arriving, and released in timestamp order, so
+    lines from different sources arriving close in time come out in order.
+    Released lines are passed to a callback, from a background thread.
+    """
+
+    def __init__(self, output: Callable[[List[str]], None], delay: float = 1.0, timestamps: bool = False):
+        self._output = output
+        self._delay = delay
+        self._timestamps = timestamps
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._active = False
+
+    def source(self, name: str) -> "_Source":
+        """
+        Returns a sink for the chunks of a source, with write and close methods.
+        """
+        return _Source(self, name)
+
+    def add(self, name: str, lines: List[str]):
+        arrival = time.monotonic()
+        with self._lock:
+            for line in lines:
+                key, text = _format(name, line, self._timestamps)
+                heapq.heappush(self._heap, (key, next(self._counter), arrival, text))
+
+    def flush(self, everything: bool = False):
+        deadline = time.monotonic() - self._delay
+        released = []
+        with self._lock:
+            heap = self._heap
+            while heap and (everything or heap[0][2] <= deadline):
+                released.append(heapq.heappop(heap)[3])
+        if released:
+            self._output(released)
+
+    def start(self):
+        self._active = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._active = False
+
+    def _run(self):
+        while self._active:
+            time.sleep(self._delay / 2)
+            self.flush()
+        self.flush(everything=True)
+
+
+class _Source:
+    def __init__(self, merger: LiveMerger, name: str):
+        self._merger = merger
+        self._name = name
+        self._pending = b""
+
+    def write(self, chunk: bytes):
+        lines, self._pending = split_lines(self._pending, chunk)
+        if lines:
+            self._merger.add(self._name, lines)
+
+    def close(self):
+        if self._pending:
+            self._merger.add(self._name, [decode_line(self._pending)])
+            self._pending = b""
@@ -0,0 +1,104 @@
+import bisect
+import mmap
+import os
+import threading
+from array import array
+from typing import Optional
+
+# Bytes scanned for new lines at once when indexing
+_BLOCK_SIZE = 1024 * 1024
+
+
+class MappedText:
+    """
+    A text file mapped in memory and read line by line. Offsets of lines
+    are indexed incrementally, a block at a time, and only the lines
+    requested are decoded, so huge files open right away and take little
+    memory besides the index.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._size = os.fstat(self._file.fileno()).st_size
+        # Empty files can't be mapped
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+        # Start offset of every line found so far
+        self._offsets = array("Q", [0])
+        self._indexed = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def complete(self) -> bool:
+        """
+        True once the whole file is indexed.
+        """
+        return self._indexed >= self._size
+
+    def index(self, size: int = _BLOCK_SIZE) -> bool:
+        """
+        Indexes the lines of the next block of the file.
+        Returns True if there is more to index.
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            start = self._indexed
+            end = min(self._size, start + size)
+            if start < end:
+                mapped = self._map
+                offsets = self._offsets
+                position = mapped.find(b"\n", start, end)
+                while position != -1:
+                    offsets.append(position + 1)
+                    position = mapped.find(b"\n", position + 1, end)
+                self._indexed = end
+            return not self.complete
+
+    def index_all(self):
+        while self.index():
+            pass
+
+    def line_count(self) -> int:
+        """
+        Number of lines indexed so far, all of them once complete.
+        """
+        count = len(self._offsets) - 1
+        if self.complete and self._offsets[-1] < self._size:
+            # Last line without a new line at its end
+            count += 1
+        return count
+
+    def get_line(self, number: int) -> str:
+        while number >= self.line_count() and self.index():
+            pass
+        offsets = self._offsets
+        start = offsets[number]
+        end = offsets[number + 1] - 1 if number + 1 < len(offsets) else self._size
+        return self._map[start:end].decode(errors="replace").rstrip("\r")
+
+    def find(self, text: str, start_line: int = 0) -> Optional[int]:
+        """
+        Returns the number of the first line from a given one containing
+        a text, or None if not found.
+        """
+        if not self._map or start_line >= len(self._offsets):
+            return None
+        position = self._map.find(text.encode(), self._offsets[start_line])
+        if position == -1:
+            return None
+        while self._indexed <= position and self.index():
+            pass
+        return bisect.bisect_right(self._offsets, position) - 1
+
+    def close(self):
+        # Waits for indexing in progress, which may be in another thread
+        with self._lock:
+            self._closed = True
+            if self._map:
+                self._map.close()
+            self._file.close()
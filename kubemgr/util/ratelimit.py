@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Optional
+
+# Request priorities, lower ones go first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Longest wait asked by a server honoured, in seconds
+_MAX_PAUSE = 30.0
+
+
+class RateLimiter:
+    """
+    Token bucket letting requests through at a number per second, with
+    bursts of up to a number of requests. Requests waiting for a token
+    are served by priority, so interactive ones go ahead of background
+    polling. The rate adapts to the server: it's halved when the server
+    throttles requests, and increases again a little on every request
+    that succeeds, up to the configured one. When the server asks to
+    retry after some time, no request is let through until then.
+    """
+
+    def __init__(self, qps: float, burst: int, min_qps: float = 1.0, increase: float = 0.1):
+        self._max_qps = qps
+        self._qps = qps
+        self._min_qps = min(min_qps, qps)
+        self._increase = increase
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._decreased = 0.0
+        self._waiting = [0, 0]
+        self._condition = threading.Condition()
+
+    @property
+    def qps(self) -> float:
+        return self._qps
+
+    def acquire(self, priority: int = BACKGROUND):
+        """
+        Waits until a request with the given priority can be sent.
+        """
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if any(self._waiting[:priority]):
+                        # Woken up when requests of higher priority leave
+                        self._condition.wait()
+                    elif now < self._paused_until:
+                        self._condition.wait(self._paused_until - now)
+                    elif self._tokens < 1:
+                        self._condition.wait((1 - self._tokens) / self._qps)
+                    else:
+                        self._tokens -= 1
+                        return
+            finally:
+                self._waiting[priority] -= 1
+                self._condition.notify_all()
+
+    def throttled(self, retry_after: Optional[float] = None):
+        """
+        Called when the server rejects a request for exceeding its limits.
+        """
+        with self._condition:
+            now = time.monotonic()
+            # Requests sent together get throttled together, the rate is reduced once for them
+            if now - self._decreased >= 1.0:
+                self._decreased = now
+                self._refill(now)
+                self._qps = max(self._min_qps, self._qps / 2)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + min(retry_after, _MAX_PAUSE))
+
+    def succeeded(self):
+        """
+        Called when a request gets through.
+        """
+        if self._qps < self._max_qps:
+            with self._condition:
+                self._refill(time.monotonic())
+                self._qps = min(self._max_qps, self._qps + self._increase)
+
+    def _refill(self, now: float):
+        self._tokens = min(self._burst, self._tokens + (now - self._updated) * self._qps)
+        self._updated = now
@@ -22,7 +22,7 @@ class ContextsListModel(AsyncListModel):
 
     def set_cluster(self, cluster: Cluster):
         self._cluster = cluster
-        self.refresh()
+        self.refresh(reset=True)
 
     def get_cluster(self) -> Cluster:
         return self._cluster
@@ -32,6 +32,12 @@ class ContextsListModel(AsyncListModel):
     def enabled(self):
         return self._cluster is not None
 
+    def get_item_key(self, item):
+        return item.name
+
+    def get_item_version(self, item):
+        return item.context
+
     def fetch_data(self):
         if self._cluster and self._cluster.connected:
             return [Context(c) for c in self._cluster.get_contexts()]
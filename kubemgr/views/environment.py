@@ -0,0 +1,70 @@
+from typing import FrozenSet, List, Optional, Tuple
+
+from jinja2 import Environment, nodes
+
+from .itempath import item_path
+from .util import BASE_JINJA_CONTEXT, TIME_DEPENDENT_HELPERS
+
+_DICT_ATTRIBUTES = frozenset(dir(dict))
+
+# Attributes ending a path to a field, as they are methods of its value
+_VALUE_ATTRIBUTES = _DICT_ATTRIBUTES | frozenset(dir(list)) | frozenset(dir(str))
+
+
+def _collect_paths(node, paths: List[List[str]]) -> bool:
+    """
+    Adds the paths into the item used under a node, returns False if the
+    item is used in a way other than through paths.
+    """
+    if isinstance(node, (nodes.Getattr, nodes.Getitem)):
+        path = item_path(node)
+        if path is not None:
+            for index, key in enumerate(path):
+                if key in _VALUE_ATTRIBUTES:
+                    path = path[:index]
+                    break
+            if not path:
+                return False
+            paths.append(path)
+            return True
+    elif isinstance(node, nodes.Name) and node.name == "item":
+        return False
+    return all(_collect_paths(child, paths) for child in node.iter_child_nodes())
+
+
+class ResourceEnvironment(Environment):
+    """
+    Jinja environment for templates evaluated over resources.
+    Resources are plain dicts, so attribute access looks up keys first,
+    avoiding the cost of a failed attribute lookup on every access.
+    Names of dict attributes, like items or keys, still resolve to them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.globals.update(BASE_JINJA_CONTEXT)
+
+    def getattr(self, obj, attribute):
+        if type(obj) is dict and attribute not in _DICT_ATTRIBUTES:
+            try:
+                return obj[attribute]
+            except KeyError:
+                pass
+        return super().getattr(obj, attribute)
+
+    def is_time_dependent(self, source: str) -> bool:
+        """
+        Tells if a template uses helpers whose output changes over time,
+        so its results can't be kept for objects that didn't change.
+        """
+        return any(node.name in TIME_DEPENDENT_HELPERS for node in self.parse(source).find_all(nodes.Name))
+
+    def item_fields(self, source: str) -> Optional[FrozenSet[Tuple[str, ...]]]:
+        """
+        Returns the paths of the item fields a template uses, or None if
+        it uses the item as a whole, so all fields are needed.
+        """
+        paths = []
+        if not _collect_paths(self.parse(source), paths):
+            return None
+        return frozenset(tuple(path) for path in paths)
@@ -0,0 +1,22 @@
+from typing import List, Optional
+
+from jinja2 import nodes
+
+
+def item_path(node) -> Optional[List[str]]:
+    """
+    Returns the path of an expression like item.a.b['c'], or None
+    if it isn't a path into the item. The path is empty for item itself.
+    """
+    path = []
+    while True:
+        if isinstance(node, nodes.Getattr):
+            path.insert(0, node.attr)
+            node = node.node
+        elif isinstance(node, nodes.Getitem) and isinstance(node.arg, nodes.Const) and isinstance(node.arg.value, str):
+            path.insert(0, node.arg.value)
+            node = node.node
+        elif isinstance(node, nodes.Name) and node.name == "item":
+            return path
+        else:
+            return None
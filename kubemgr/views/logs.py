@@ -0,0 +1,63 @@
+from typing import List
+
+from cdtui import ListView, ansi
+
+from kubemgr.util.lines import LineBuffer
+
+from .util import AsyncListModel, printable
+
+# Seconds between checks for new lines, shorter than for lists so followed logs show up right away
+_REFRESH_INTERVAL = 0.2
+
+
+class LogsListModel(AsyncListModel):
+    """
+    Shows the lines of a log buffer, while a stream fills it in background.
+    """
+
+    def __init__(self, application, buffer: LineBuffer):
+        self._buffer = buffer
+        self._version = None
+        super().__init__(application, interval=_REFRESH_INTERVAL)
+
+    def fetch_data(self) -> List[str]:
+        version = self._buffer.version
+        if version == self._version:
+            return self._items
+        self._version = version
+        return self._buffer.get_lines()
+
+    def close(self):
+        self._task.cancel()
+
+
+class LogsView(ListView):
+    """
+    Popup showing logs as they arrive. While the cursor is on the last
+    line it follows new lines, as tail -f does. The stream is stopped
+    when the popup is closed.
+    """
+
+    def __init__(self, rect, model: LogsListModel, stream):
+        super().__init__(rect, model)
+        self._stream = stream
+        self._count = 0
+        model.on_list_changed.add(self._lines_changed)
+
+    def _lines_changed(self, model):
+        count = model.get_item_count()
+        if count and self._current_index >= self._count - 1:
+            self._current_index = count - 1
+        self._count = count
+
+    def render_item(self, item, current, selected: bool) -> str:
+        buff = ansi.begin()
+        if self.focused and current:
+            buff.underline()
+        buff.writefill(printable(item), self._rect.width)
+        buff.reset()
+        return str(buff)
+
+    def on_close(self):
+        self._stream.stop()
+        self._model.close()
@@ -1,8 +1,8 @@
-import json
 from cdtui import ansi
 import logging
 from typing import Any
 
+from ..util.jsonstream import loads
 from .resource import ResourceListView
 from .util import AsyncListModel
 
@@ -34,7 +34,7 @@ class NamespacesListModel(AsyncListModel):
 
     def set_cluster(self, cluster):
         self._cluster = cluster
-        self.refresh()
+        self.refresh(reset=True)
 
     def get_cluster(self):
         return self._cluster
@@ -44,13 +44,19 @@ class NamespacesListModel(AsyncListModel):
     def enabled(self):
         return self._cluster is not None
 
+    def get_item_key(self, item):
+        return item.name
+
+    def get_item_version(self, item):
+        return item.namespace["metadata"].get("resourceVersion")
+
     def fetch_data(self):
         _logger.info(f"1 {self._cluster} {self._cluster.connected if self._cluster else ''}")
         if self._cluster and self._cluster.connected:
             try:
                 result = self._cluster.do_simple_get("/api/v1/namespaces")
                 _logger.info("2")
-                namespaces = json.loads(result.decode())["items"]
+                namespaces = loads(result)["items"]
                 _logger.info("3")
                 _logger.info(f"Namespaces: {namespaces}")
                 return [NsItem(i) for i in namespaces]
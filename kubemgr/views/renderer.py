@@ -1,19 +1,114 @@
+import time
 from typing import Any
 
-from .util import BASE_JINJA_CONTEXT
+from ..util.cache import LRUCache
+from .util import BASE_JINJA_CONTEXT, TIME_DEPENDENT_HELPERS, _do_fill
+
+# Maximum number of rendered rows kept, across all kinds
+_ROW_CACHE_SIZE = 5000
+
+_COLUMN_SEPARATOR = "  "
+_NUMERIC_TYPES = {"integer", "number"}
+
+
+def _format_cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return ",".join(map(str, value))
+    return str(value)
+
+
+def _render_cells(item, columns, widths, width) -> str:
+    """
+    Renders the cells of a table row. The first column, usually the name,
+    takes the space the others leave.
+    """
+    rest = sum(widths[column["name"]] for column in columns[1:]) + len(_COLUMN_SEPARATOR) * (len(columns) - 1)
+    cells = item["columns"]
+    row = []
+    for index, column in enumerate(columns):
+        name = column["name"]
+        length = max(width - rest, len(name)) if index == 0 else widths[name]
+        if column.get("type") in _NUMERIC_TYPES:
+            length = -length
+        row.append(_do_fill(_format_cell(cells.get(name)), length))
+    return _COLUMN_SEPARATOR.join(row)[:width]
+
+
+class _Recorder:
+    """
+    Wraps a helper, recording if the template called it.
+    """
+
+    def __init__(self, function):
+        self._function = function
+        self.called = False
+
+    def __call__(self, *args, **kwargs):
+        self.called = True
+        return self._function(*args, **kwargs)
 
 
 class ItemRenderer:
+    """
+    Renders list rows with the item template of each kind, or with the
+    columns sent by the server for lists in table mode.
+    Rows are kept by list mode and object uid, as objects have different
+    fields in each mode, and reused while the resource version,
+    the view width and the template stay the same. Rows using time
+    dependent helpers, like age(), are kept until the next minute.
+    """
+
     def __init__(self, app):
         self._app = app
+        self._rows = LRUCache(_ROW_CACHE_SIZE)
 
     def __call__(self, view, item: Any) -> str:
-        template = self._get_template(view.model.resource_kind)
+        model = view.model
+        kind = model.resource_kind
+        columns = model.columns
+        if columns:
+            return self._render_table_row(view, kind, columns, item)
+
+        template = self._get_template(kind)
         if not template:
             return item["metadata"]["name"]
-        ctx = dict(BASE_JINJA_CONTEXT)
-        ctx.update({"item": item, "width": view._rect.width})
-        return template.render(ctx).replace("\n", "").strip()
+
+        width = view._rect.width
+        metadata = item.get("metadata") or {}
+        key = (kind, model.mode, metadata.get("uid"))
+        version = (metadata.get("resourceVersion"), width, template)
+
+        entry = self._rows.get(key)
+        if entry and entry[0] == version and (not entry[2] or time.time() < entry[2]):
+            return entry[1]
+
+        recorders = {name: _Recorder(BASE_JINJA_CONTEXT[name]) for name in TIME_DEPENDENT_HELPERS}
+        row = template.render(item=item, width=width, **recorders).replace("\n", "").strip()
+
+        if key[2] and version[0]:
+            expires = None
+            if any(recorder.called for recorder in recorders.values()):
+                expires = (int(time.time() / 60) + 1) * 60
+            self._rows.put(key, (version, row, expires))
+        return row
+
+    def _render_table_row(self, view, kind, columns, item) -> str:
+        width = view._rect.width
+        widths = view.model.column_widths
+        metadata = item["metadata"]
+        key = (kind, view.model.mode, metadata.get("uid"))
+        version = (metadata.get("resourceVersion"), width, tuple(widths.items()))
+
+        entry = self._rows.get(key)
+        if entry and entry[0] == version:
+            return entry[1]
+
+        row = _render_cells(item, columns, widths, width)
+        if key[2] and version[0]:
+            self._rows.put(key, (version, row, None))
+        return row
 
     def _get_template(self, kind):
-        return self._app._item_templates.get(kind)
+        return self._app.get_item_template(kind)
@@ -1,44 +1,248 @@
-import json
+import itertools
 import logging
+import re
+import threading
 
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
 from cdtui import ListView
-from jinja2 import Template
 
-from kubemgr.cluster import UnknownResource, Cluster
+from kubemgr.cluster import UnknownResource, Cluster, ServiceError
+from kubemgr.projection import Projection
+from kubemgr.table import visible_columns
+from kubemgr.util.jsonstream import loads
+from kubemgr.watch import ResourceWatcher
 
-from .util import BASE_JINJA_CONTEXT, AsyncListModel
+from .util import AsyncListModel
+
+if TYPE_CHECKING:
+    from jinja2 import Template
+
+    from . import selectors
+    from .environment import ResourceEnvironment
+    from .templates import TemplateStore
 
 _DEFAULT_PATH_PREFIX = "api/v1"
+_HTTP_GONE = 410
+# Times a list is started again when its continue token expires
+_LIST_RETRIES = 3
+# Seconds after which a slow list gets its worker replaced, so other views keep refreshing
+_FETCH_TIMEOUT = 30
 
 _logger = logging.getLogger(__name__)
 
 
+_EXPRESSION_TEMPLATE = re.compile(r"^\{\{-?(.*?)-?\}\}$", re.DOTALL)
+_COMMENT = re.compile(r"\{#.*?#\}", re.DOTALL)
+
+# Maximum number of objects whose filter result is remembered, per filter and list mode
+_RESULT_CACHE_SIZE = 100000
+
+# List modes, the objects of each one have different fields
+MODE_FULL = "full"
+MODE_METADATA = "metadata"
+MODE_TABLE = "table"
+
+def _compile_expression(environment: "ResourceEnvironment", filter_string: str) -> Optional["Template"]:
+    """
+    Filters usually consist of comments plus a single {{ expression }},
+    those are compiled into a template that assigns the expression
+    result to a variable, so it can be evaluated without rendering
+    anything.
+    """
+    source = _COMMENT.sub("", filter_string).strip()
+    matched = _EXPRESSION_TEMPLATE.match(source)
+    if not matched:
+        return None
+    expression = matched.group(1)
+    if "{{" in expression or "{%" in expression:
+        return None
+
+    from jinja2 import TemplateSyntaxError
+
+    try:
+        return environment.from_string(f"{{% set result = {expression} %}}")
+    except TemplateSyntaxError:
+        return None
+
+
+def _expression_evaluator(template: "Template") -> Callable[[Any], Any]:
+    # A single context is reused for a whole batch, instead of creating one per item.
+    context = template.new_context({})
+    variables = context.vars
+
+    def evaluate(item):
+        variables["item"] = item
+        for _ in template.root_render_func(context):
+            pass
+        return variables["result"]
+
+    return evaluate
+
+
+def _passes(result: Any) -> bool:
+    return result is True or (isinstance(result, str) and result.strip() == "True")
+
+
 class Filter:
-    def __init__(self, filter_string):
+    """
+    Filters items with a Jinja template, compiled in the environment
+    of the application templates.
+    """
+
+    def __init__(self, filter_string, templates: "TemplateStore"):
         self._filter_string = filter_string
-        self._template = Template(filter_string)
+        self._templates = templates
+        self._compiled = None
+        self._selectors = {}
+        self._fields = False
+        # Results by list mode and object uid, as (resourceVersion, result). Not used
+        # for filters depending on time, as their result may change for the same object.
+        self._results = {}
+        self._results_lock = threading.Lock()
 
     @property
     def filter_string(self):
         return self._filter_string
 
-    def __call__(self, item):
-        ctx = dict(BASE_JINJA_CONTEXT)
-        ctx["item"] = item
-        result = self._template.render(ctx).strip()
-        return result == "True"
+    def get_selectors(self, kind) -> "selectors.Selectors":
+        """
+        Returns the label and field selectors that can be sent to the
+        server for this filter and a given kind.
+        """
+        from . import selectors
+
+        if kind not in self._selectors:
+            self._selectors[kind] = selectors.translate(self._filter_string, kind)
+        return self._selectors[kind]
+
+    @property
+    def fields(self) -> Optional[FrozenSet[Tuple[str, ...]]]:
+        """
+        Paths of the item fields used by the filter, or None if it
+        needs whole objects.
+        """
+        if self._fields is False:
+            self._fields = self._templates.environment.item_fields(self._filter_string)
+        return self._fields
+
+    def __call__(self, item) -> bool:
+        return bool(self.filter_items([item]))
+
+    def _compile(self) -> Tuple[Optional["Template"], Optional["Template"]]:
+        """
+        Compiles the filter the first time it is used, returns the
+        expression template, or the whole filter template if it
+        isn't a single expression.
+        """
+        if not self._compiled:
+            environment = self._templates.environment
+            expression = _compile_expression(environment, self._filter_string)
+            template = environment.from_string(self._filter_string) if not expression else None
+            if environment.is_time_dependent(self._filter_string):
+                self._results = None
+            self._compiled = expression, template
+        return self._compiled
+
+    def _evaluator(self) -> Callable[[Any], Any]:
+        expression, template = self._compile()
+        if expression:
+            return _expression_evaluator(expression)
+        return lambda item: template.render(item=item)
+
+    def filter_items(self, items: Iterable, mode: str = MODE_FULL) -> List:
+        """
+        Returns the items passing the filter, items for which the filter
+        fails to evaluate are left out. The result is remembered for
+        each object and resource version, so unchanged objects are
+        not evaluated again. Results are kept apart for each list mode,
+        as objects listed in each one have different fields.
+        """
+        self._compile()
+        result = []
+        errors = 0
+        evaluate = None
+        with self._results_lock:
+            results = self._results.setdefault(mode, {}) if self._results is not None else None
+            for item in items:
+                metadata = item.get("metadata") or {}
+                uid = metadata.get("uid")
+                resource_version = metadata.get("resourceVersion")
+                cached = results.get(uid) if results is not None else None
+                if cached and cached[0] == resource_version:
+                    passed = cached[1]
+                else:
+                    if not evaluate:
+                        evaluate = self._evaluator()
+                    try:
+                        passed = _passes(evaluate(item))
+                    except Exception:
+                        passed = False
+                        errors += 1
+                    if results is not None and uid and resource_version:
+                        results[uid] = (resource_version, passed)
+                if passed:
+                    result.append(item)
+
+            if results is not None and len(results) > _RESULT_CACHE_SIZE:
+                # Discards the oldest entries
+                for uid in list(itertools.islice(results, len(results) - _RESULT_CACHE_SIZE)):
+                    del results[uid]
+
+        if errors:
+            _logger.debug(f"Filter failed to evaluate on {errors} items")
+        return result
+
+    def forget(self, uids: Iterable[str], mode: str = MODE_FULL):
+        """
+        Discards remembered results of objects listed in a mode, when
+        they are deleted.
+        """
+        if self._results is not None:
+            with self._results_lock:
+                results = self._results.get(mode, {})
+                for uid in uids:
+                    results.pop(uid, None)
 
 
 class ResourceListModel(AsyncListModel):
-    def __init__(self, application, resource_kind, api_group=_DEFAULT_PATH_PREFIX):
-        super().__init__(application)
+    """
+    Lists a resource kind of the current cluster, optionally in a namespace.
+    With projection enabled, objects only keep the fields used by the
+    item template and filters. With metadata_only, only object metadata
+    is requested. With table, the server renders objects as table rows,
+    items keep their metadata and cells by column name, and the columns
+    are available to render them. In all these cases get_full_item
+    fetches the whole object.
+    """
+
+    def __init__(
+        self,
+        application,
+        resource_kind,
+        api_group=_DEFAULT_PATH_PREFIX,
+        watch=True,
+        page_size=None,
+        projection=False,
+        metadata_only=False,
+        table=False,
+    ):
+        super().__init__(application, timeout=_FETCH_TIMEOUT)
         self._resource_kind = resource_kind
         self._api_group = api_group
+        self._watch = watch
+        self._page_size = page_size
+        self._use_projection = projection
+        self._metadata_only = metadata_only
+        self._table = table
+        self._columns = None
+        self._column_widths = (None, None)
+        self._projection = None
+        self._watcher = None
         self._cluster = None
         self._namespace = None
         self._global_filter = None
         self._filter = None
+        self._uids = set()
 
     def set_global_filter(self, global_filter):
         self._global_filter = global_filter
@@ -66,9 +270,52 @@ class ResourceListModel(AsyncListModel):
     def resource_kind(self):
         return self._resource_kind
 
+    @property
+    def mode(self) -> str:
+        """
+        The list mode, tells which fields objects have.
+        """
+        if self._table:
+            return MODE_TABLE
+        if self._metadata_only:
+            return MODE_METADATA
+        return MODE_FULL
+
+    @property
+    def columns(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        The table columns to show, None when not in table mode or until
+        the server returns them.
+        """
+        if not self._table:
+            return None
+        watcher = self._watcher
+        columns = watcher.columns if watcher else self._columns
+        return visible_columns(columns) if columns else None
+
+    @property
+    def column_widths(self) -> Dict[str, int]:
+        """
+        Width of each table column, enough for its name and all current
+        cells. Worked out again only when items change.
+        """
+        items, widths = self._column_widths
+        if items is not self._items:
+            items = self._items
+            widths = {column["name"]: len(column["name"]) for column in self.columns or []}
+            for item in items:
+                for name, value in item["columns"].items():
+                    if name in widths:
+                        widths[name] = max(widths[name], len(str(value)))
+            self._column_widths = items, widths
+        return widths
+
     def set_cluster(self, cluster: Optional[Cluster]):
+        if cluster is not self._cluster:
+            # The watcher belongs to the previous cluster
+            self._release_watcher()
         self._cluster = cluster
-        self.refresh()
+        self.refresh(reset=True)
 
     def get_cluster(self) -> Optional[Cluster]:
         return self._cluster
@@ -81,30 +328,174 @@ class ResourceListModel(AsyncListModel):
 
     def set_namespace(self, namespace):
         self._namespace = namespace
+        self.refresh()
 
     def get_namespace(self):
         return self._namespace
 
     namespace = property(get_namespace, set_namespace)
 
+    def get_full_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Returns an item with all its fields, fetching it from the
+        cluster if the list only keeps some of them.
+        """
+        if not (self._projection or self._metadata_only or self._table):
+            return item
+        metadata = item["metadata"]
+        response = self._cluster.do_get(
+            self._api_group, self._resource_kind, metadata["name"], metadata.get("namespace")
+        )
+        return loads(response)
+
     def fetch_data(self):
         if self.enabled:
             try:
-                result = self._cluster.do_get(self._api_group, self._resource_kind, namespace=self._namespace)
-                return self._filter_data(json.loads(result.decode())["items"])
+                projection = self._get_projection()
+                if projection != self._projection:
+                    # Current items were projected differently, they can't be reused
+                    self._items = []
+                    self._projection = projection
+
+                if self._can_watch():
+                    watcher = self._get_watcher()
+                    if not (watcher.forbidden and self._namespace):
+                        items = watcher.get_items(self._namespace)
+                        self._forget_removed(items)
+                        return self._filter_data(items)
+                else:
+                    self._release_watcher()
+                return self._list_items()
             except UnknownResource:
                 _logger.info(f"Unknown resource {self._api_group} {self._resource_kind} ns:{self._namespace}")
             except Exception:
                 _logger.exception("Error fetching data")
         return []
 
+    def _list_items(self):
+        for attempt in range(_LIST_RETRIES + 1):
+            try:
+                return self._list_pages()
+            except ServiceError as e:
+                if e.status_code != _HTTP_GONE or attempt == _LIST_RETRIES:
+                    raise
+                _logger.info(f"List of {self._resource_kind} expired, listing again")
+
+    def _list_pages(self):
+        progressive = not self._items
+        items = []
+        filtered = []
+        label_selector, field_selector = self._get_selectors()
+        pages = self._cluster.do_list(
+            self._api_group,
+            self._resource_kind,
+            namespace=self._namespace,
+            limit=self._page_size,
+            label_selector=label_selector,
+            field_selector=field_selector,
+            metadata_only=self._metadata_only,
+            table=self._table,
+        )
+        for page in pages:
+            if self._table:
+                self._columns = page["columnDefinitions"]
+            if self._projection:
+                page_items = [self._projection(item) for item in page["items"]]
+            else:
+                page_items = list(page["items"])
+            items.extend(page_items)
+            # Pages are filtered as they arrive, items already shown aren't filtered again
+            filtered.extend(self._filter_data(page_items))
+            if progressive and page["metadata"].get("continue"):
+                self._publish_partial(list(filtered))
+        self._forget_removed(items)
+        return filtered
+
+    def _can_watch(self) -> bool:
+        if not self._watch:
+            return False
+        resource = self._cluster.get_resource(self._api_group, self._resource_kind)
+        return "watch" in resource.get("verbs", [])
+
+    def _get_selectors(self) -> "selectors.Selectors":
+        from . import selectors
+
+        filters = [f for f in [self._global_filter, self._filter] if f]
+        label_selectors = [f.get_selectors(self._resource_kind)[0] for f in filters]
+        field_selectors = [f.get_selectors(self._resource_kind)[1] for f in filters]
+        return selectors.combine(*label_selectors), selectors.combine(*field_selectors)
+
+    def _get_projection(self) -> Optional[Projection]:
+        """
+        Works out the fields to keep from the item template and filters,
+        returns None if objects must be kept whole.
+        """
+        if not self._use_projection or self._table:
+            return None
+        paths = set()
+        fields = [self._application.get_item_fields(self._resource_kind)]
+        fields += [f.fields for f in [self._global_filter, self._filter] if f]
+        for field_paths in fields:
+            if field_paths is None:
+                return None
+            paths.update(field_paths)
+        return Projection(paths)
+
+    def _get_watcher(self) -> ResourceWatcher:
+        watcher = self._watcher
+        label_selector, field_selector = self._get_selectors()
+        if (
+            not watcher
+            or watcher.cluster != self._cluster
+            or watcher.label_selector != label_selector
+            or watcher.field_selector != field_selector
+            or watcher.projection != self._projection
+        ):
+            self._release_watcher()
+            watcher = self._cluster.informers.subscribe(
+                self._api_group,
+                self._resource_kind,
+                self._page_size,
+                label_selector,
+                field_selector,
+                self._projection,
+                self._metadata_only,
+                self._table,
+            )
+            self._watcher = watcher
+        return watcher
+
+    def _release_watcher(self):
+        if self._watcher:
+            self._watcher.cluster.informers.release(self._watcher)
+            self._watcher = None
+
+    def get_item_key(self, item):
+        metadata = item["metadata"]
+        return metadata.get("uid") or (metadata.get("namespace"), metadata["name"])
+
+    def get_item_version(self, item):
+        return item["metadata"].get("resourceVersion")
+
+    def _forget_removed(self, items):
+        """
+        Removes results remembered by filters for objects which are gone.
+        """
+        uids = {item["metadata"].get("uid") for item in items}
+        removed = self._uids - uids
+        self._uids = uids
+        if removed:
+            for f in [self._global_filter, self._filter]:
+                if f:
+                    f.forget(removed, self.mode)
+
     def _filter_data(self, items):
         if self._global_filter:
             _logger.debug("Applying global filter")
-            items = filter(self._global_filter, items)
+            items = self._global_filter.filter_items(items, self.mode)
         if self._filter:
             _logger.debug("Applying filter")
-            items = filter(self._filter, items)
+            items = self._filter.filter_items(items, self.mode)
         return list(items)
 
 
@@ -113,6 +504,25 @@ class ResourceListView(ListView):
         super().__init__(rect, model, selectable)
         self._key_handlers = {}
         self._formatter = None
+        if model:
+            model.on_items_changed.add(self._items_changed)
+
+    @property
+    def current_full_item(self):
+        """
+        The current item with all its fields, which may need to be
+        fetched from the cluster when the list only keeps some.
+        """
+        item = self.current_item
+        if item and isinstance(self._model, ResourceListModel):
+            return self._model.get_full_item(item)
+        return item
+
+    def _items_changed(self, model, change):
+        # Keeps the cursor on the same object when items before it are added or removed
+        index = change.moved.get(self._current_index)
+        if index is not None:
+            self._current_index = index
 
     def set_key_handler(self, key, handler):
         self._key_handlers[key] = handler
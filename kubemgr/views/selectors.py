@@ -0,0 +1,182 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from jinja2 import Environment, nodes
+
+from .itempath import item_path
+
+_DIRECTIVE = re.compile(r"\{#-?\s*(labelSelector|fieldSelector)\s*:\s*(.*?)\s*-?#\}")
+
+# Fields supported by field selectors for every kind.
+_COMMON_FIELDS = {"metadata.name", "metadata.namespace"}
+
+# Additional fields supported by field selectors per kind.
+_KIND_FIELDS = {
+    "Pod": {
+        "spec.nodeName",
+        "spec.restartPolicy",
+        "spec.schedulerName",
+        "spec.serviceAccountName",
+        "status.phase",
+        "status.podIP",
+        "status.nominatedNodeName",
+    },
+    "Secret": {"type"},
+    "Namespace": {"status.phase"},
+    "Node": {"spec.unschedulable"},
+    "ReplicaSet": {"status.replicas"},
+    "ReplicationController": {"status.replicas"},
+    "Job": {"status.successful"},
+    "Event": {
+        "involvedObject.kind",
+        "involvedObject.namespace",
+        "involvedObject.name",
+        "involvedObject.uid",
+        "involvedObject.apiVersion",
+        "involvedObject.resourceVersion",
+        "involvedObject.fieldPath",
+        "reason",
+        "reportingComponent",
+        "source",
+        "type",
+    },
+}
+
+_OPERATORS = {"eq": "=", "ne": "!="}
+
+# Values that can be sent to the server, others are never pushed down, as the server
+# would reject the whole list. Label values are at most 63 characters, alphanumeric at
+# both ends, field values may be API versions.
+_VALID_LABEL_VALUE = re.compile(r"^([A-Za-z0-9]([-A-Za-z0-9_.]*[A-Za-z0-9])?)?$")
+_MAX_LABEL_VALUE = 63
+# Label keys are a name like label values, but not empty, with an optional DNS subdomain prefix.
+_VALID_LABEL_NAME = re.compile(r"^[A-Za-z0-9]([-A-Za-z0-9_.]*[A-Za-z0-9])?$")
+_VALID_LABEL_PREFIX = re.compile(r"^[a-z0-9]([-a-z0-9]*[a-z0-9])?(\.[a-z0-9]([-a-z0-9]*[a-z0-9])?)*$")
+_MAX_LABEL_PREFIX = 253
+_VALID_FIELD_VALUE = re.compile(r"^[A-Za-z0-9_.\-/]*$")
+
+Selectors = Tuple[Optional[str], Optional[str]]
+
+
+def _valid_label_value(value: str) -> bool:
+    return len(value) <= _MAX_LABEL_VALUE and bool(_VALID_LABEL_VALUE.match(value))
+
+
+def _valid_label_key(key: str) -> bool:
+    name = key
+    if "/" in key:
+        prefix, name = key.rsplit("/", 1)
+        if not (len(prefix) <= _MAX_LABEL_PREFIX and _VALID_LABEL_PREFIX.match(prefix)):
+            return False
+    return len(name) <= _MAX_LABEL_VALUE and bool(_VALID_LABEL_NAME.match(name))
+
+
+def _conjunction(node) -> List:
+    if isinstance(node, nodes.And):
+        return _conjunction(node.left) + _conjunction(node.right)
+    return [node]
+
+
+def _translate_term(node, kind: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    if not (isinstance(node, nodes.Compare) and len(node.ops) == 1 and node.ops[0].op in _OPERATORS):
+        return None, None
+
+    left, right = node.expr, node.ops[0].expr
+    if isinstance(left, nodes.Const):
+        left, right = right, left
+    if not (isinstance(right, nodes.Const) and isinstance(right.value, str)):
+        return None, None
+
+    path = item_path(left)
+    if not path:
+        return None, None
+
+    operator = _OPERATORS[node.ops[0].op]
+
+    value = right.value
+    if len(path) == 3 and path[0:2] == ["metadata", "labels"]:
+        key = path[2]
+        if isinstance(key, str) and _valid_label_key(key) and _valid_label_value(value):
+            return f"{key}{operator}{value}", None
+        return None, None
+
+    field = ".".join(path)
+    if _VALID_FIELD_VALUE.match(value) and (field in _COMMON_FIELDS or field in _KIND_FIELDS.get(kind, set())):
+        return None, f"{field}{operator}{value}"
+
+    return None, None
+
+
+def _join(terms: List[str]) -> Optional[str]:
+    return ",".join(terms) if terms else None
+
+
+def translate(filter_string: str, kind: Optional[str] = None) -> Selectors:
+    """
+    Works out the label and field selectors which can be sent to the server
+    for a filter, so it only returns items that might pass it.
+    Selectors can be given explicitly as comments in the filter:
+
+        {# labelSelector: app=web #}
+        {# fieldSelector: status.phase=Running #}
+
+    Otherwise, when the filter is a single expression made of equality
+    checks joined by 'and', the checks on labels and on fields supported
+    by the server are translated. The filter is still evaluated locally,
+    so a partial translation is fine.
+    """
+    directives = _DIRECTIVE.findall(filter_string)
+    if directives:
+        label_terms = [value for name, value in directives if name == "labelSelector" and value]
+        field_terms = [value for name, value in directives if name == "fieldSelector" and value]
+        return _join(label_terms), _join(field_terms)
+
+    try:
+        template = Environment().parse(filter_string)
+    except Exception:
+        return None, None
+
+    expressions = [
+        node
+        for output in template.body
+        if isinstance(output, nodes.Output)
+        for node in output.nodes
+        if not (isinstance(node, nodes.TemplateData) and not node.data.strip())
+    ]
+    if len(template.body) != 1 or len(expressions) != 1:
+        return None, None
+
+    label_terms, field_terms = [], []
+    for term in _conjunction(expressions[0]):
+        label_term, field_term = _translate_term(term, kind)
+        if label_term:
+            label_terms.append(label_term)
+        if field_term:
+            field_terms.append(field_term)
+
+    return _join(label_terms), _join(field_terms)
+
+
+def combine(*selectors: Optional[str]) -> Optional[str]:
+    return _join([s for s in selectors if s])
+
+
+def from_label_selector(selector: Dict[str, Any]) -> Optional[str]:
+    """
+    Converts a label selector object, as workloads have to find their
+    pods, into a label selector string.
+    """
+    terms = [f"{key}={value}" for key, value in (selector.get("matchLabels") or {}).items()]
+    for expression in selector.get("matchExpressions") or []:
+        key = expression["key"]
+        operator = expression["operator"]
+        values = ",".join(expression.get("values") or [])
+        if operator == "In":
+            terms.append(f"{key} in ({values})")
+        elif operator == "NotIn":
+            terms.append(f"{key} notin ({values})")
+        elif operator == "Exists":
+            terms.append(key)
+        elif operator == "DoesNotExist":
+            terms.append(f"!{key}")
+    return _join(terms)
@@ -0,0 +1,94 @@
+import logging
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, FrozenSet, Optional, Tuple
+
+if TYPE_CHECKING:
+    from jinja2 import Template
+
+    from .environment import ResourceEnvironment
+
+_logger = logging.getLogger(__name__)
+
+# Seconds between checks for changes in template files
+_CHECK_INTERVAL = 2
+
+
+class TemplateStore:
+    """
+    Gives access to the item and detail templates in the configuration
+    directory. Templates are compiled the first time they are used,
+    with compiled code kept in a bytecode cache on disk, and reloaded
+    when their file changes. File changes are checked at most every
+    few seconds, so templates can be fetched on every render.
+    """
+
+    def __init__(self, config_dir: str, cache_dir: str, check_interval: float = _CHECK_INTERVAL):
+        self._config_dir = config_dir
+        self._cache_dir = cache_dir
+        self._check_interval = check_interval
+        self._environment = None
+        self._templates = {}
+        self._fields = {}
+        self._lock = threading.Lock()
+
+    @property
+    def environment(self) -> "ResourceEnvironment":
+        # Created on first use, so Jinja isn't imported at startup
+        if self._environment is None:
+            from jinja2 import FileSystemBytecodeCache, FileSystemLoader
+
+            from .environment import ResourceEnvironment
+
+            os.makedirs(self._cache_dir, exist_ok=True)
+            self._environment = ResourceEnvironment(
+                loader=FileSystemLoader(self._config_dir),
+                bytecode_cache=FileSystemBytecodeCache(self._cache_dir),
+                auto_reload=True,
+            )
+        return self._environment
+
+    def get_item_template(self, kind: str) -> Optional["Template"]:
+        return self._get(f"item-templates/{kind}.tpl")
+
+    def get_item_fields(self, kind: str) -> Optional[FrozenSet[Tuple[str, ...]]]:
+        """
+        Returns the paths of the fields used by the item template of a kind,
+        or None if it needs whole objects.
+        """
+        template = self.get_item_template(kind)
+        if not template:
+            # Only the name is shown
+            return frozenset()
+        cached = self._fields.get(kind)
+        if cached and cached[0] is template:
+            return cached[1]
+        name = f"item-templates/{kind}.tpl"
+        source, _, _ = self.environment.loader.get_source(self.environment, name)
+        fields = self.environment.item_fields(source)
+        self._fields[kind] = (template, fields)
+        return fields
+
+    def get_detail_template(self, kind: str) -> Optional["Template"]:
+        return self._get(f"detail-templates/{kind}.tpl")
+
+    def _get(self, name: str) -> Optional["Template"]:
+        entry = self._templates.get(name)
+        now = time.monotonic()
+        if entry and now - entry[1] < self._check_interval:
+            return entry[0]
+
+        from jinja2 import TemplateNotFound
+
+        with self._lock:
+            try:
+                # The environment only compiles the file again if it changed
+                template = self.environment.get_template(name)
+            except TemplateNotFound:
+                template = None
+            except Exception:
+                _logger.exception(f"Error loading template {name}")
+                template = entry[0] if entry else None
+            self._templates[name] = (template, now)
+        return template
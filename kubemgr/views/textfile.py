@@ -0,0 +1,150 @@
+import os
+import string
+import threading
+import time
+
+from cdtui import ListModel, ListView, ansi, kbd
+
+from kubemgr.util.mappedtext import MappedText
+
+from .util import printable
+
+# Minimum seconds between list change notifications while indexing
+_NOTIFY_INTERVAL = 0.5
+
+
+class MappedTextModel(ListModel):
+    """
+    Lines of a memory mapped text file. The file is indexed in background,
+    lines show up as they are found, and are only decoded when shown.
+    """
+
+    def __init__(self, text: MappedText):
+        super().__init__()
+        self._text = text
+        self._active = True
+        threading.Thread(target=self._index, daemon=True).start()
+
+    @property
+    def text(self) -> MappedText:
+        return self._text
+
+    def _index(self):
+        notified = time.monotonic()
+        while self._active and self._text.index():
+            if time.monotonic() - notified > _NOTIFY_INTERVAL:
+                notified = time.monotonic()
+                self.notify_list_changed()
+        if self._active:
+            self.notify_list_changed()
+
+    def get_item_count(self) -> int:
+        return self._text.line_count()
+
+    def get_item(self, index: int) -> str:
+        return self._text.get_line(index)
+
+    def close(self):
+        self._active = False
+        self._text.close()
+
+
+def _keys(strings):
+    # Maps keystrokes to the characters they type
+    keys = {}
+    for value in strings:
+        try:
+            keys[kbd.keystroke_from_str(value)] = value
+        except Exception:
+            pass
+    return keys
+
+
+class TextFileView(ListView):
+    """
+    Internal viewer for text files of any size, backed by MappedText.
+    Keys:
+        / : search a text, typed in place of the current line, enter runs it.
+        n : next line with the last text searched.
+        : : jump to a line number.
+        g, G : go to the first and last lines.
+    The file is removed when the view is closed, if asked to.
+    """
+
+    _chars = None
+    _enter_keys = None
+    _backspace_keys = None
+
+    def __init__(self, rect, model: MappedTextModel, path: str, remove=False):
+        super().__init__(rect, model)
+        self._path = path
+        self._remove = remove
+        self._prompt = None
+        self._input = ""
+        self._search = None
+        if TextFileView._chars is None:
+            TextFileView._chars = _keys(string.digits + string.ascii_letters + string.punctuation + " ")
+            TextFileView._enter_keys = _keys(["\n", "\r"])
+            TextFileView._backspace_keys = _keys(["\x7f", "\x08"])
+
+    def render_item(self, item, current, selected: bool) -> str:
+        buff = ansi.begin()
+        if current and self._prompt:
+            buff.writefill(f"{self._prompt}{self._input}_", self._rect.width)
+        else:
+            if self.focused and current:
+                buff.underline()
+            buff.writefill(printable(item), self._rect.width)
+        buff.reset()
+        return str(buff)
+
+    def on_key_press(self, input_key):
+        char = self._chars.get(input_key)
+        if self._prompt:
+            if char is not None:
+                self._input += char
+            elif input_key in self._enter_keys:
+                self._run_prompt()
+            elif input_key in self._backspace_keys:
+                self._input = self._input[:-1]
+            self.update()
+        elif char == "/" or char == ":":
+            self._prompt = char
+            self._input = ""
+            self.update()
+        elif char == "n" and self._search:
+            self._find(self._search, self._current_index + 1)
+        elif char == "g":
+            self._go_to(0)
+        elif char == "G":
+            text = self._model.text
+            text.index_all()
+            self._go_to(text.line_count() - 1)
+        else:
+            super().on_key_press(input_key)
+
+    def _run_prompt(self):
+        prompt, value = self._prompt, self._input.strip()
+        self._prompt = None
+        if prompt == "/" and value:
+            self._search = value
+            self._find(value, self._current_index)
+        elif prompt == ":" and value.isdigit():
+            self._go_to(int(value) - 1)
+
+    def _find(self, value: str, start_line: int):
+        line = self._model.text.find(value, start_line)
+        if line is not None:
+            self._go_to(line)
+
+    def _go_to(self, line: int):
+        count = self._model.get_item_count()
+        if count:
+            self._current_index = max(0, min(line, count - 1))
+            self.update()
+
+    def on_close(self):
+        self._model.close()
+        if self._remove:
+            os.unlink(self._path)
+
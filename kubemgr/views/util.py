@@ -1,24 +1,62 @@
 import re
 from abc import ABCMeta, abstractmethod
 from datetime import datetime, timezone
-from typing import Any, List, Optional
+from typing import Any, Hashable, List, Optional
 
-from cdtui import ListModel
+from cdtui import ListModel, ListenerHandler
+
+from ..util.diff import diff_lists
+
+
+# Escape sequences and control characters which would mess the screen up
+_CONTROL = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]|[\x00-\x08\x0b-\x1f\x7f]")
+
+
+def printable(text: str) -> str:
+    """
+    Removes escape sequences and control characters from text
+    coming from outside, like logs, and expands tabs.
+    """
+    return _CONTROL.sub("", text.expandtabs(4))
 
 
 class AsyncListModel(ListModel, metaclass=ABCMeta):
-    def __init__(self, application, periodic=True):
+    """
+    List model whose contents are fetched in background.
+    When items have an identity, given by get_item_key, new contents are
+    compared to current ones by identity and version, unchanged items keep
+    their current instance, and listeners of on_items_changed receive the
+    ListChange before the list changed notification. Otherwise contents
+    are compared by equality. Contents are fetched every interval
+    seconds, or the default interval of background tasks, a fetch
+    running over timeout seconds has its worker replaced.
+    """
+
+    def __init__(self, application, periodic=True, interval=None, timeout=None):
         super().__init__()
         self._application = application
         self._periodic = periodic
+        self._interval = interval
+        self._timeout = timeout
+        self.on_items_changed = ListenerHandler(self)
         self._items = []
-        self._application.add_task(self._async_fetch_data, periodic)
+        self._generation = 0
+        self._fetch_generation = None
+        self._task = self._application.add_task(self._async_fetch_data, periodic, interval, timeout=timeout)
 
-    def refresh(self):
+    def refresh(self, reset=False):
         """
-        Forces refresh of contents
+        Forces refresh of contents. Refreshes requested while one is pending
+        are merged into it, and results of fetches started before the
+        request are discarded. When reset is True, current contents
+        are cleared right away.
         """
-        self._application.add_task(self._async_fetch_data, False)
+        self._generation += 1
+        if reset and self._items:
+            self._items = []
+            self.notify_list_changed()
+        if not self._task.run_now():
+            self._task = self._application.add_task(self._async_fetch_data, False, timeout=self._timeout)
 
     def get_item_count(self) -> int:
         return len(self._items)
@@ -26,13 +64,47 @@ class AsyncListModel(ListModel, metaclass=ABCMeta):
     def get_item(self, index: int) -> Any:
         return self._items[index]
 
+    def _publish_partial(self, items: List):
+        """
+        Shows partial results while fetch_data is still running.
+        """
+        if self._fetch_generation == self._generation:
+            self._set_items(items)
+
     def _async_fetch_data(self):
+        generation = self._generation
+        self._fetch_generation = generation
         items = self.fetch_data()
-        changed = items != self._items
-        self._items = items
-        if changed:
+        self._fetch_generation = None
+        if generation != self._generation:
+            # Stale, a newer refresh is already scheduled
+            return
+        self._set_items(items)
+
+    def _set_items(self, items: List):
+        if self._items and items and self.get_item_key(items[0]) is not None:
+            items, change = diff_lists(self._items, items, self.get_item_key, self.get_item_version)
+            if change:
+                self._items = items
+                self.on_items_changed(change)
+                self.notify_list_changed()
+        elif items != self._items:
+            self._items = items
             self.notify_list_changed()
 
+    def get_item_key(self, item: Any) -> Optional[Hashable]:
+        """
+        Returns the identity of an item, or None if items don't have one.
+        """
+        return None
+
+    def get_item_version(self, item: Any) -> Any:
+        """
+        Returns the version of an item, items with the same identity
+        and version are considered the same.
+        """
+        return None
+
     @abstractmethod
     def fetch_data(self) -> List:
         pass
@@ -119,3 +191,6 @@ BASE_JINJA_CONTEXT = {
     "str": str,
     "int": int,
 }
+
+# Helpers whose output changes over time for the same input
+TIME_DEPENDENT_HELPERS = {"age"}
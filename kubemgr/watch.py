@@ -0,0 +1,263 @@
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from .cluster import ServiceError, UnknownResource
+
+_logger = logging.getLogger(__name__)
+
+_WATCH_TIMEOUT = 60
+_RETRY_DELAY = 5
+_HTTP_UNAUTHORIZED = 401
+_HTTP_FORBIDDEN = 403
+_HTTP_GONE = 410
+
+
+def _uid(item: Dict[str, Any]) -> str:
+    metadata = item["metadata"]
+    return metadata.get("uid") or f"{metadata.get('namespace')}/{metadata['name']}"
+
+
+def _sort_key(item: Dict[str, Any]):
+    metadata = item["metadata"]
+    return (metadata.get("namespace") or "", metadata["name"])
+
+
+class ResourceWatcher:
+    """
+    Keeps a local copy of a cluster wide resource collection. The collection
+    is listed once, then kept up to date by applying the events of a watch
+    stream started from the last known resource version. When the server
+    reports the resource version as expired (410 Gone) the collection is
+    listed again. When it can't be listed, for lack of permissions, the
+    watcher stops. When given a projection, only the fields it keeps are
+    stored for each object. With metadata_only, the server only sends
+    object metadata. With table, the server sends table rows, and the
+    column definitions are kept along with them.
+    """
+
+    def __init__(
+        self,
+        cluster,
+        api_group,
+        resource_kind,
+        page_size=None,
+        label_selector=None,
+        field_selector=None,
+        projection=None,
+        metadata_only=False,
+        table=False,
+    ):
+        self._cluster = cluster
+        self._api_group = api_group
+        self._resource_kind = resource_kind
+        self._page_size = page_size
+        self._label_selector = label_selector
+        self._field_selector = field_selector
+        self._projection = projection
+        self._metadata_only = metadata_only
+        self._table = table
+        self._columns = None
+        self._objects = {}
+        self._snapshots = {}
+        self._resource_version = None
+        self._synced = False
+        self._forbidden = False
+        self._active = False
+        self._stopped = threading.Event()
+        self._events = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        selectors = f" labels:{self._label_selector} fields:{self._field_selector}"
+        return f"Watcher {self._api_group} {self._resource_kind}{selectors} on {self._cluster}"
+
+    @property
+    def cluster(self):
+        return self._cluster
+
+    @property
+    def api_group(self):
+        return self._api_group
+
+    @property
+    def resource_kind(self):
+        return self._resource_kind
+
+    @property
+    def label_selector(self):
+        return self._label_selector
+
+    @property
+    def field_selector(self):
+        return self._field_selector
+
+    @property
+    def projection(self):
+        return self._projection
+
+    @property
+    def metadata_only(self):
+        return self._metadata_only
+
+    @property
+    def table(self):
+        return self._table
+
+    @property
+    def columns(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        The column definitions of tables, once listed.
+        """
+        return self._columns
+
+    @property
+    def forbidden(self) -> bool:
+        """
+        True when the collection can't be listed cluster wide,
+        the watcher is stopped then.
+        """
+        return self._forbidden
+
+    def get_items(self, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the objects of the collection, optionally only those
+        in a given namespace. Slices are cached until the collection changes.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(namespace)
+            if snapshot is None:
+                items = self._objects.values()
+                if namespace:
+                    items = [i for i in items if i["metadata"].get("namespace") == namespace]
+                snapshot = sorted(items, key=_sort_key)
+                self._snapshots[namespace] = snapshot
+            return snapshot
+
+    def start(self):
+        if not self._active:
+            self._active = True
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stops watching, closing the watch stream right away.
+        """
+        self._active = False
+        self._stopped.set()
+        events = self._events
+        if events:
+            events.close()
+
+    def _run(self):
+        while self._active:
+            try:
+                if self._resource_version is None:
+                    self._list()
+                self._watch()
+            except ServiceError as e:
+                if e.status_code == _HTTP_GONE:
+                    _logger.info(f"{self} resource version expired, listing again")
+                    self._resource_version = None
+                elif e.status_code in (_HTTP_UNAUTHORIZED, _HTTP_FORBIDDEN):
+                    # Models list by namespace instead, trying again won't help
+                    _logger.info(f"{self} not allowed, stopping: {e}")
+                    self._forbidden = True
+                    self.stop()
+                else:
+                    _logger.error(f"{self} error: {e}")
+                    self._stopped.wait(_RETRY_DELAY)
+            except UnknownResource:
+                _logger.info(f"{self} unknown resource")
+                self._stopped.wait(_RETRY_DELAY)
+            except Exception:
+                _logger.exception(f"{self} error watching resources")
+                self._stopped.wait(_RETRY_DELAY)
+
+    def _list(self):
+        # The first time pages are shown as they arrive, when listing
+        # again current contents are kept until the new list is complete.
+        progressive = not self._synced
+        objects = {}
+
+        if progressive:
+            with self._lock:
+                self._objects = objects
+                self._snapshots = {}
+
+        pages = self._cluster.do_list(
+            self._api_group,
+            self._resource_kind,
+            limit=self._page_size,
+            label_selector=self._label_selector,
+            field_selector=self._field_selector,
+            metadata_only=self._metadata_only,
+            table=self._table,
+        )
+        for page in pages:
+            if not self._active:
+                return
+            items = page["items"]
+            if self._table:
+                self._columns = page["columnDefinitions"]
+            if self._projection:
+                items = (self._projection(item) for item in items)
+            # Items are decoded from the response as they are read, out of the lock
+            page_objects = {_uid(item): item for item in items}
+            if progressive:
+                with self._lock:
+                    objects.update(page_objects)
+                    self._snapshots = {}
+            else:
+                objects.update(page_objects)
+
+        with self._lock:
+            self._objects = objects
+            self._snapshots = {}
+
+        self._resource_version = page["metadata"]["resourceVersion"]
+        self._synced = True
+        self._forbidden = False
+
+    def _watch(self):
+        events = self._cluster.do_watch(
+            self._api_group,
+            self._resource_kind,
+            resource_version=self._resource_version,
+            timeout=_WATCH_TIMEOUT,
+            label_selector=self._label_selector,
+            field_selector=self._field_selector,
+            metadata_only=self._metadata_only,
+            table=self._table,
+        )
+        self._events = events
+        # Stopped while the watch was being requested
+        if not self._active:
+            events.close()
+        for event in events:
+            if not self._active:
+                break
+
+            event_type = event["type"]
+            item = event["object"]
+
+            if event_type == "ERROR":
+                raise ServiceError(item.get("code"), item.get("message"))
+
+            self._resource_version = item["metadata"]["resourceVersion"]
+
+            if event_type == "BOOKMARK":
+                continue
+
+            if self._projection:
+                item = self._projection(item)
+
+            with self._lock:
+                if event_type == "DELETED":
+                    self._objects.pop(_uid(item), None)
+                else:
+                    self._objects[_uid(item)] = item
+                self._snapshots = {}
@@ -22,6 +22,7 @@ setuptools.setup(
     packages=setuptools.find_packages(),
     entry_points={"console_scripts": ["kubemgr = kubemgr.main:main"]},
     install_requires=requirements,
+    extras_require={"fast": ["orjson"]},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: GNU Library or Lesser General Public License (LGPL)",
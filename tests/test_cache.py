@@ -0,0 +1,25 @@
+from unittest import TestCase
+
+from kubemgr.util.cache import LRUCache
+
+
+class LRUCacheTestCase(TestCase):
+    def test_discards_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(1, cache.get("a"))
+        cache.put("c", 3)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(1, cache.get("a"))
+        self.assertEqual(3, cache.get("c"))
+
+    def test_pop_and_clear(self):
+        cache = LRUCache(10)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(1, cache.pop("a"))
+        self.assertIsNone(cache.pop("a"))
+        cache.clear()
+        self.assertEqual(0, len(cache))
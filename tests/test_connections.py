@@ -0,0 +1,169 @@
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase, skipUnless
+
+import urllib3
+
+from kubemgr.util.connections import ResponseChunks, connection_stats, create_ssl_context
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Released to end endless streams
+    done = threading.Event()
+
+    def do_GET(self):
+        if self.path == "/follow":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.wfile.write(b"3\r\none\r\n")
+            self.wfile.flush()
+            self.done.wait(10)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+class _ClosingHandler(_Handler):
+    def do_GET(self):
+        # Clients have to reconnect for every request
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+
+class ConnectionsTestCase(TestCase):
+    def setUp(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        _Handler.done.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def test_stats_count_reused_connections(self):
+        pool_manager = urllib3.PoolManager(maxsize=2)
+        url = f"http://127.0.0.1:{self._server.server_port}/version"
+        for _ in range(5):
+            pool_manager.request("GET", url)
+
+        stats = connection_stats(pool_manager)
+        self.assertEqual(2, stats.pool_size)
+        self.assertEqual(5, stats.requests)
+        self.assertEqual(1, stats.connections)
+        self.assertEqual(0, stats.handshakes)
+        pool_manager.clear()
+
+    def test_ssl_context_verification(self):
+        context = create_ssl_context()
+        self.assertEqual(ssl.CERT_REQUIRED, context.verify_mode)
+        self.assertTrue(context.check_hostname)
+
+        context = create_ssl_context(verify_ssl=False)
+        self.assertEqual(ssl.CERT_NONE, context.verify_mode)
+        self.assertFalse(context.check_hostname)
+
+    def test_close_stream_while_reading(self):
+        pool_manager = urllib3.PoolManager()
+        url = f"http://127.0.0.1:{self._server.server_port}/follow"
+        chunks = ResponseChunks(lambda: pool_manager.request("GET", url, preload_content=False), 1024)
+        self.assertEqual(b"one", next(chunks))
+
+        threading.Timer(0.2, chunks.close).start()
+        # Would wait for the server otherwise
+        self.assertEqual([], list(chunks))
+        self.assertEqual([], list(chunks))
+        pool_manager.clear()
+
+    def test_close_before_reading(self):
+        requests = []
+        chunks = ResponseChunks(lambda: requests.append(1), 1024)
+        chunks.close()
+        self.assertEqual([], list(chunks))
+        self.assertEqual([], requests)
+
+
+@skipUnless(shutil.which("openssl"), "openssl is needed to create a certificate")
+class SessionReuseTestCase(TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._cert = os.path.join(self._temp_dir.name, "cert.pem")
+        key = os.path.join(self._temp_dir.name, "key.pem")
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1"]
+            + ["-keyout", key, "-out", self._cert, "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1"],
+            check=True,
+            capture_output=True,
+        )
+        self._server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self._server_context.load_cert_chain(self._cert, key)
+        self._server = None
+
+    def tearDown(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        self._temp_dir.cleanup()
+
+    def _start(self, tls_version):
+        self._server_context.maximum_version = tls_version
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _ClosingHandler)
+        self._server.socket = self._server_context.wrap_socket(self._server.socket, server_side=True)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def _client_context(self):
+        context = create_ssl_context()
+        context.load_verify_locations(self._cert)
+        return context
+
+    def _test_reconnects(self, tls_version):
+        self._start(tls_version)
+        context = self._client_context()
+        pool_manager = urllib3.PoolManager(maxsize=1, ssl_context=context)
+        url = f"https://127.0.0.1:{self._server.server_port}/version"
+        for _ in range(4):
+            self.assertEqual(b"{}", pool_manager.request("GET", url).data)
+
+        stats = connection_stats(pool_manager, context)
+        self.assertEqual(4, stats.requests)
+        self.assertEqual(4, stats.connections)
+        self.assertEqual(4, stats.handshakes)
+        self.assertEqual(3, stats.resumed)
+        pool_manager.clear()
+
+    def test_reconnects_resume_session_tls12(self):
+        self._test_reconnects(ssl.TLSVersion.TLSv1_2)
+
+    def test_reconnects_resume_session_tls13(self):
+        self._test_reconnects(ssl.TLSVersion.TLSv1_3)
+
+    def test_session_of_closed_connection_reused(self):
+        self._start(ssl.TLSVersion.TLSv1_3)
+        context = self._client_context()
+        address = ("127.0.0.1", self._server.server_port)
+        request = b"GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n"
+
+        reused = []
+        for _ in range(2):
+            with context.wrap_socket(socket.create_connection(address), server_hostname="127.0.0.1") as sock:
+                reused.append(sock.session_reused)
+                sock.sendall(request)
+                while sock.recv(1024):
+                    pass
+        self.assertEqual([False, True], reused)
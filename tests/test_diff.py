@@ -0,0 +1,39 @@
+from unittest import TestCase
+
+from kubemgr.util.diff import diff_lists
+
+
+def _item(name, version):
+    return {"name": name, "version": version}
+
+
+def _diff(old, new):
+    return diff_lists(old, new, lambda item: item["name"], lambda item: item["version"])
+
+
+class DiffListsTestCase(TestCase):
+    def test_no_changes_keeps_old_list(self):
+        old = [_item("a", 1), _item("b", 1)]
+        items, change = _diff(old, [_item("a", 1), _item("b", 1)])
+        self.assertIs(old, items)
+        self.assertIsNone(change)
+
+    def test_changes(self):
+        old = [_item("a", 1), _item("b", 1), _item("c", 1)]
+        new = [_item("x", 1), _item("a", 1), _item("c", 2)]
+        items, change = _diff(old, new)
+
+        self.assertEqual(new, items)
+        self.assertIs(old[0], items[1])
+        self.assertIs(new[2], items[2])
+        self.assertEqual([0], change.inserted)
+        self.assertEqual([2], change.updated)
+        self.assertEqual([1], change.removed)
+        self.assertEqual({0: 1, 2: 2}, change.moved)
+
+    def test_reorder(self):
+        old = [_item("a", 1), _item("b", 1)]
+        items, change = _diff(old, [_item("b", 1), _item("a", 1)])
+        self.assertEqual([old[1], old[0]], items)
+        self.assertEqual({0: 1, 1: 0}, change.moved)
+        self.assertEqual([], change.inserted + change.updated + change.removed)
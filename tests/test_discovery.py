@@ -0,0 +1,228 @@
+import json
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import TestCase
+
+from kubemgr.discovery import Discovery, DiscoveryCache, DiscoveryResponse, ResourceIndex
+
+_AGGREGATED_TYPE = "application/json;g=apidiscovery.k8s.io;v=v2;as=APIGroupDiscoveryList"
+
+_POD = {"name": "pods", "singularName": "pod", "namespaced": True, "kind": "Pod", "verbs": ["get", "list", "watch"]}
+_DEPLOYMENT = {
+    "name": "deployments",
+    "singularName": "deployment",
+    "namespaced": True,
+    "kind": "Deployment",
+    "verbs": ["get", "list", "watch"],
+    "shortNames": ["deploy"],
+}
+
+_LEGACY = {
+    "/apis": {
+        "kind": "APIGroupList",
+        "groups": [{"name": "apps", "versions": [{"groupVersion": "apps/v1", "version": "v1"}]}],
+    },
+    "/api/v1/": {"kind": "APIResourceList", "groupVersion": "v1", "resources": [_POD]},
+    "/apis/apps/v1/": {"kind": "APIResourceList", "groupVersion": "apps/v1", "resources": [_DEPLOYMENT]},
+}
+
+
+def _aggregated_resource(resource, subresources=()):
+    return {
+        "resource": resource["name"],
+        "responseKind": {"group": "", "version": "v1", "kind": resource["kind"]},
+        "scope": "Namespaced",
+        "singularResource": resource["singularName"],
+        "verbs": resource["verbs"],
+        "subresources": [
+            {"subresource": name, "responseKind": {"kind": kind}, "verbs": ["get"]} for name, kind in subresources
+        ],
+    }
+
+
+_AGGREGATED = {
+    "/apis": {
+        "kind": "APIGroupDiscoveryList",
+        "items": [
+            {
+                "metadata": {"name": "apps"},
+                "versions": [{"version": "v1", "resources": [dict(_aggregated_resource(_DEPLOYMENT), shortNames=["deploy"])]}],
+            }
+        ],
+    },
+    "/api": {
+        "kind": "APIGroupDiscoveryList",
+        "items": [
+            {
+                "metadata": {},
+                "versions": [{"version": "v1", "resources": [_aggregated_resource(_POD, [("log", "Pod")])]}],
+            }
+        ],
+    },
+}
+
+_ETAG = '"abc"'
+
+
+class _FakeApiServer(BaseHTTPRequestHandler):
+    aggregated = True
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        accept = self.headers.get("Accept") or ""
+        if self.aggregated and "apidiscovery.k8s.io" in accept and self.path in _AGGREGATED:
+            if self.headers.get("If-None-Match") == _ETAG:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._reply(_AGGREGATED[self.path], _AGGREGATED_TYPE, _ETAG)
+        elif self.path in _LEGACY:
+            self._reply(_LEGACY[self.path], "application/json")
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def _reply(self, document, content_type, etag=None):
+        body = json.dumps(document).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):
+        pass
+
+
+class DiscoveryTestCase(TestCase):
+    def setUp(self):
+        _FakeApiServer.requests = []
+        self.server = HTTPServer(("127.0.0.1", 0), _FakeApiServer)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _fetch(self, path, accept=None, etag=None):
+        request = urllib.request.Request(f"http://127.0.0.1:{self.server.server_port}{path}")
+        if accept:
+            request.add_header("Accept", accept)
+        if etag:
+            request.add_header("If-None-Match", etag)
+        try:
+            with urllib.request.urlopen(request) as response:
+                return DiscoveryResponse(
+                    response.status, response.headers.get("Content-Type"), response.headers.get("ETag"), response.read()
+                )
+        except urllib.error.HTTPError as e:
+            return DiscoveryResponse(e.code, None, None, b"")
+
+    def test_aggregated(self):
+        _FakeApiServer.aggregated = True
+        resources, etag = Discovery(self._fetch).discover(include_core=True)
+
+        self.assertEqual(_ETAG, etag)
+        self.assertEqual(["/apis", "/api"], _FakeApiServer.requests)
+        self.assertEqual([_DEPLOYMENT], resources["apps/v1"])
+        self.assertEqual(["pods", "pods/log"], [r["name"] for r in resources["v1"]])
+        self.assertEqual(_POD, resources["v1"][0])
+
+    def test_aggregated_not_modified(self):
+        _FakeApiServer.aggregated = True
+        resources, etag = Discovery(self._fetch).discover(etag=_ETAG)
+
+        self.assertIsNone(resources)
+        self.assertEqual(_ETAG, etag)
+
+    def test_fallback(self):
+        _FakeApiServer.aggregated = False
+        groups = []
+        resources, etag = Discovery(self._fetch).discover(
+            include_core=True, on_group=lambda group_version, _: groups.append(group_version)
+        )
+
+        self.assertIsNone(etag)
+        self.assertEqual({"v1": [_POD], "apps/v1": [_DEPLOYMENT]}, resources)
+        self.assertEqual({"v1", "apps/v1"}, set(groups))
+        self.assertEqual(3, len(_FakeApiServer.requests))
+
+    def test_failed_group_left_out(self):
+        _FakeApiServer.aggregated = False
+
+        def fetch(path, **kwargs):
+            if path == "/apis/apps/v1/":
+                raise ConnectionResetError()
+            return self._fetch(path, **kwargs)
+
+        resources, _ = Discovery(fetch).discover(include_core=True)
+        self.assertEqual({"v1": [_POD]}, resources)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = DiscoveryCache(cache_dir, 600)
+            cache.save("v1.29.0", resources)
+            # Not cached, so it is discovered again when needed
+            self.assertIsNone(cache.load("apps/v1"))
+
+    def test_core(self):
+        _FakeApiServer.aggregated = False
+        self.assertEqual([_POD], Discovery(self._fetch).discover_core())
+
+
+class ResourceIndexTestCase(TestCase):
+    def test_lookup(self):
+        index = ResourceIndex()
+        index.add("v1", [_POD, dict(_POD, name="pods/log")])
+        index.add("apps/v1", [_DEPLOYMENT])
+
+        self.assertIs(_POD, index.get("v1", "Pod"))
+        self.assertIs(_POD, index.get("api/v1", "Pod"))
+        self.assertIsNone(index.get("apps/v1", "Pod"))
+        self.assertEqual(("apps/v1", _DEPLOYMENT), index.find("deploy"))
+        self.assertEqual(("apps/v1", _DEPLOYMENT), index.find("Deployment"))
+        self.assertEqual(("v1", _POD), index.find("pods"))
+        self.assertEqual("/api/v1", index.base_path("v1"))
+        self.assertIs(index.base_path("v1"), index.base_path("api/v1"))
+        self.assertEqual("/apis/apps/v1", index.base_path("apps/v1"))
+        self.assertIn("api/v1", index)
+        self.assertNotIn("batch/v1", index)
+
+    def test_add_again_replaces_resources(self):
+        index = ResourceIndex()
+        index.add("apps/v1", [_DEPLOYMENT, dict(_DEPLOYMENT, name="replicasets", kind="ReplicaSet", shortNames=["rs"])])
+        self.assertIsNotNone(index.find("rs"))
+
+        deployment = dict(_DEPLOYMENT, shortNames=["dp"])
+        index.add("apps/v1", [deployment])
+        self.assertIs(deployment, index.get("apps/v1", "Deployment"))
+        self.assertIsNone(index.get("apps/v1", "ReplicaSet"))
+        self.assertIsNone(index.find("rs"))
+        self.assertIsNone(index.find("deploy"))
+        self.assertEqual(("apps/v1", deployment), index.find("dp"))
+
+    def test_names_prefer_core_resources(self):
+        event = {"name": "events", "singularName": "event", "namespaced": True, "kind": "Event", "verbs": []}
+        for order in (["events.k8s.io/v1", "v1"], ["v1", "events.k8s.io/v1"]):
+            index = ResourceIndex()
+            for group_version in order:
+                index.add(group_version, [event])
+            self.assertEqual("v1", index.find("events")[0])
+
+
+class DiscoveryCacheTestCase(TestCase):
+    def test_invalidate(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = DiscoveryCache(cache_dir, 600)
+            cache.save("v1.29.0", {"v1": [_POD]})
+            self.assertEqual([_POD], cache.load("v1"))
+
+            cache.invalidate()
+            self.assertFalse(cache.valid)
+            self.assertIsNone(cache.load("v1"))
+            self.assertFalse(DiscoveryCache(cache_dir, 600).valid)
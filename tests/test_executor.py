@@ -0,0 +1,105 @@
+import threading
+import time
+from unittest import TestCase
+
+from kubemgr.util.executor import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, TaskExecutor
+
+
+class TaskExecutorTestCase(TestCase):
+    def setUp(self):
+        self.executor = None
+
+    def tearDown(self):
+        if self.executor:
+            self.executor.finish()
+
+    def test_one_shot_task_runs_once(self):
+        self.executor = TaskExecutor(workers=2, interval=0.05)
+        calls = []
+        self.executor.add_task(lambda: calls.append(1), False)
+        self.executor.start()
+        time.sleep(0.3)
+        self.assertEqual([1], calls)
+
+    def test_periodic_task_never_overlaps(self):
+        self.executor = TaskExecutor(workers=4, interval=0.01)
+        running = []
+        overlaps = []
+        lock = threading.Lock()
+
+        def task():
+            with lock:
+                if running:
+                    overlaps.append(1)
+                running.append(1)
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+
+        self.executor.add_task(task, True)
+        self.executor.start()
+        time.sleep(0.4)
+        self.assertEqual([], overlaps)
+
+    def test_slow_task_does_not_block_others(self):
+        self.executor = TaskExecutor(workers=2, interval=0.05)
+        calls = []
+        self.executor.add_task(lambda: time.sleep(1), False)
+        self.executor.add_task(lambda: calls.append(1), True)
+        self.executor.start()
+        time.sleep(0.4)
+        self.assertGreater(len(calls), 2)
+
+    def test_priority(self):
+        self.executor = TaskExecutor(workers=1)
+        calls = []
+        self.executor.add_task(lambda: calls.append("background"), False, priority=PRIORITY_BACKGROUND)
+        self.executor.add_task(lambda: calls.append("interactive"), False, priority=PRIORITY_INTERACTIVE)
+        self.executor.start()
+        time.sleep(0.2)
+        self.assertEqual(["interactive", "background"], calls)
+
+    def test_timeout_replaces_worker(self):
+        self.executor = TaskExecutor(workers=1, interval=0.05)
+        calls = []
+        self.executor.add_task(lambda: time.sleep(1.5), False, timeout=0.1)
+        self.executor.add_task(lambda: calls.append(1), False)
+        self.executor.start()
+        time.sleep(1)
+        self.assertEqual([1], calls)
+
+    def test_cancel(self):
+        self.executor = TaskExecutor(workers=1, interval=0.05)
+        calls = []
+        task = self.executor.add_task(lambda: calls.append(1), True)
+        task.cancel()
+        self.executor.start()
+        time.sleep(0.2)
+        self.assertEqual([], calls)
+
+    def test_run_now_merges_requests(self):
+        self.executor = TaskExecutor(workers=2, interval=0.05)
+        calls = []
+        task = self.executor.add_task(lambda: calls.append(1), False)
+        for _ in range(5):
+            self.assertTrue(task.run_now())
+        self.executor.start()
+        time.sleep(0.2)
+        self.assertEqual([1], calls)
+        self.assertFalse(task.run_now())
+
+    def test_run_now_while_running_runs_again(self):
+        self.executor = TaskExecutor(workers=2, interval=0.05)
+        calls = []
+
+        def task_function():
+            calls.append(1)
+            time.sleep(0.1)
+
+        task = self.executor.add_task(task_function, False)
+        self.executor.start()
+        time.sleep(0.05)
+        task.run_now()
+        task.run_now()
+        time.sleep(0.4)
+        self.assertEqual([1, 1], calls)
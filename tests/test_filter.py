@@ -0,0 +1,153 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from jinja2 import Template
+
+from kubemgr.views import resource
+from kubemgr.views.templates import TemplateStore
+from kubemgr.views.util import BASE_JINJA_CONTEXT
+
+
+def _pod(name, phase=None, labels=None):
+    pod = {"metadata": {"name": name, "uid": f"uid-{name}", "resourceVersion": "1", "labels": labels or {}}}
+    if phase:
+        pod["status"] = {"phase": phase}
+    return pod
+
+
+_PODS = [
+    _pod("web-1", "Running", {"app": "web"}),
+    _pod("web-2", "Pending", {"app": "web"}),
+    _pod("db-1", "Running", {"app": "db"}),
+    _pod("db-2", "Failed"),
+]
+
+
+_config_dir = tempfile.TemporaryDirectory()
+_templates = TemplateStore(_config_dir.name, os.path.join(_config_dir.name, "cache"))
+
+
+def tearDownModule():
+    _config_dir.cleanup()
+
+
+def _filter(filter_string):
+    return resource.Filter(filter_string, _templates)
+
+
+def _compile_expression(filter_string):
+    return resource._compile_expression(_templates.environment, filter_string)
+
+
+def _rendered(filter_string, item):
+    # How filters were evaluated before being compiled
+    return Template(filter_string).render(dict(BASE_JINJA_CONTEXT, item=item)).strip() == "True"
+
+
+class FilterTestCase(TestCase):
+    def _assert_same_as_rendered(self, filter_string):
+        expected = [pod for pod in _PODS if _rendered(filter_string, pod)]
+        self.assertEqual(expected, _filter(filter_string).filter_items(_PODS))
+
+    def test_expressions(self):
+        for filter_string in [
+            "{{ item.status.phase == 'Running' }}",
+            "{# Comment #}\n{{- item.metadata.name.startswith('web') -}}\n",
+            "{{ item.metadata.labels.app == 'web' and item.status.phase != 'Pending' }}",
+            "{{ 'True' if item.metadata.name == 'db-1' else 'False' }}",
+        ]:
+            self.assertIsNotNone(_compile_expression(filter_string), filter_string)
+            self._assert_same_as_rendered(filter_string)
+
+    def test_templates(self):
+        for filter_string in [
+            "{% if item.status.phase == 'Running' %}True{% endif %}",
+            "{% set name = item.metadata.name %}{{ name.endswith('-1') }}",
+        ]:
+            self.assertIsNone(_compile_expression(filter_string), filter_string)
+            self._assert_same_as_rendered(filter_string)
+
+    def test_not_compilable_falls_back_to_rendering(self):
+        filter_string = "{{ item.metadata.name == 'db-1' }}{{ '' }}"
+        self.assertIsNone(_compile_expression(filter_string))
+        self.assertEqual([_PODS[2]], _filter(filter_string).filter_items(_PODS))
+
+    def test_missing_fields(self):
+        # Items without the field are left out, instead of failing the whole list
+        filter_string = "{{ item.status.phase == 'Failed' or item.spec.nodeName == 'a' }}"
+        pods = [_pod("a"), _pod("b", "Failed"), _pod("c", "Running")]
+        self.assertEqual([pods[1]], _filter(filter_string).filter_items(pods))
+        self.assertFalse(_filter(filter_string)(_pod("a")))
+
+    def test_call(self):
+        self.assertTrue(_filter("{{ item.metadata.name == 'web-1' }}")(_PODS[0]))
+        self.assertFalse(_filter("{{ item.metadata.name == 'web-1' }}")(_PODS[1]))
+
+
+def _count_evaluations(filter: resource.Filter):
+    evaluated = []
+    evaluator = filter._evaluator
+
+    def counting_evaluator():
+        evaluate = evaluator()
+
+        def counted(item):
+            evaluated.append(item["metadata"]["name"])
+            return evaluate(item)
+
+        return counted
+
+    filter._evaluator = counting_evaluator
+    return evaluated
+
+
+class FilterResultsTestCase(TestCase):
+    def test_unchanged_items_not_evaluated_again(self):
+        filter = _filter("{{ item.status.phase == 'Running' }}")
+        evaluated = _count_evaluations(filter)
+        self.assertEqual([_PODS[0], _PODS[2]], filter.filter_items(_PODS))
+        self.assertEqual(4, len(evaluated))
+
+        self.assertEqual([_PODS[0], _PODS[2]], filter.filter_items(_PODS))
+        self.assertEqual(4, len(evaluated))
+
+    def test_new_resource_version_evaluated_again(self):
+        filter = _filter("{{ item.status.phase == 'Running' }}")
+        evaluated = _count_evaluations(filter)
+        filter.filter_items(_PODS)
+
+        updated = _pod("web-2", "Running", {"app": "web"})
+        updated["metadata"]["resourceVersion"] = "2"
+        pods = [_PODS[0], updated, _PODS[2], _PODS[3]]
+        self.assertEqual([_PODS[0], updated, _PODS[2]], filter.filter_items(pods))
+        self.assertEqual(["web-2"], evaluated[4:])
+
+    def test_forgotten_objects_are_evicted(self):
+        filter = _filter("{{ item.status.phase == 'Running' }}")
+        evaluated = _count_evaluations(filter)
+        filter.filter_items(_PODS)
+        filter.forget(["uid-web-1", "uid-db-2"])
+
+        filter.filter_items(_PODS)
+        self.assertEqual(["web-1", "db-2"], evaluated[4:])
+
+    def test_results_kept_apart_by_mode(self):
+        filter = _filter("{{ item.status.phase == 'Running' }}")
+        evaluated = _count_evaluations(filter)
+        metadata_only = [{"metadata": pod["metadata"]} for pod in _PODS]
+        self.assertEqual([], filter.filter_items(metadata_only, resource.MODE_METADATA))
+
+        self.assertEqual([_PODS[0], _PODS[2]], filter.filter_items(_PODS, resource.MODE_FULL))
+        self.assertEqual(8, len(evaluated))
+
+        filter.forget(["uid-web-1"], resource.MODE_METADATA)
+        filter.filter_items(_PODS, resource.MODE_FULL)
+        self.assertEqual(8, len(evaluated))
+
+    def test_time_dependent_filters_not_remembered(self):
+        filter = _filter("{{ age(item.metadata.creationTimestamp) != '' }}")
+        evaluated = _count_evaluations(filter)
+        filter.filter_items(_PODS)
+        filter.filter_items(_PODS)
+        self.assertEqual(8, len(evaluated))
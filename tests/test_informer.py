@@ -0,0 +1,71 @@
+import threading
+from unittest import TestCase
+
+from kubemgr.informer import InformerCache
+
+
+class _Events:
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        self.closed.wait(10)
+        return iter([])
+
+    def close(self):
+        self.closed.set()
+
+
+class _Cluster:
+    def do_list(self, *args, **kwargs):
+        yield {"metadata": {"resourceVersion": "1"}, "items": iter([])}
+
+    def do_watch(self, *args, **kwargs):
+        return _Events()
+
+
+class InformerCacheTestCase(TestCase):
+    def setUp(self):
+        self.informers = InformerCache(_Cluster())
+
+    def tearDown(self):
+        self.informers.clear()
+
+    def test_shared_while_referenced(self):
+        watcher = self.informers.subscribe("v1", "Pod")
+        self.assertIs(watcher, self.informers.subscribe("api/v1", "Pod"))
+
+        self.informers.release(watcher)
+        self.assertIs(watcher, self.informers.subscribe("v1", "Pod"))
+        self.informers.release(watcher)
+        self.informers.release(watcher)
+        self.assertIsNot(watcher, self.informers.subscribe("v1", "Pod"))
+
+    def test_key_includes_selectors_projection_and_mode(self):
+        watcher = self.informers.subscribe("v1", "Pod")
+        projection = object()
+        others = [
+            self.informers.subscribe("v1", "Node"),
+            self.informers.subscribe("v1", "Pod", label_selector="app=web"),
+            self.informers.subscribe("v1", "Pod", field_selector="status.phase=Running"),
+            self.informers.subscribe("v1", "Pod", projection=projection),
+            self.informers.subscribe("v1", "Pod", metadata_only=True),
+            self.informers.subscribe("v1", "Pod", table=True),
+        ]
+        self.assertEqual(7, len({id(w) for w in [watcher] + others}))
+        self.assertIs(others[3], self.informers.subscribe("v1", "Pod", projection=projection))
+
+    def test_last_release_stops_watcher(self):
+        watcher = self.informers.subscribe("v1", "Pod")
+        self.informers.subscribe("v1", "Pod")
+
+        self.informers.release(watcher)
+        self.assertTrue(watcher._active)
+        self.informers.release(watcher)
+        self.assertFalse(watcher._active)
+        watcher._thread.join(1)
+        self.assertFalse(watcher._thread.is_alive())
+
+        # Released again by a model which didn't notice
+        self.informers.release(watcher)
+        self.assertIsNot(watcher, self.informers.subscribe("v1", "Pod"))
@@ -0,0 +1,50 @@
+import json
+from unittest import TestCase
+
+from kubemgr.util.jsonstream import loads, stream_list
+
+_DOCUMENT = {
+    "kind": "PodList",
+    "metadata": {"resourceVersion": "10", "continue": "abc"},
+    "items": [{"metadata": {"name": f"pod-{i}"}, "value": 1.5 * i, "text": "ñ" * i} for i in range(50)],
+    "trailing": 123,
+}
+
+
+def _chunks(size):
+    body = json.dumps(_DOCUMENT, ensure_ascii=False).encode()
+    return [body[start : start + size] for start in range(0, len(body), size)]
+
+
+class JsonStreamTestCase(TestCase):
+    def test_items_are_decoded_whatever_the_chunk_size(self):
+        for size in [1, 7, 100, 1 << 20]:
+            document = stream_list(_chunks(size))
+            self.assertEqual(_DOCUMENT["metadata"], document["metadata"])
+            self.assertEqual(_DOCUMENT["items"], list(document["items"]))
+            self.assertEqual(123, document["trailing"])
+
+    def test_items_are_decoded_lazily(self):
+        consumed = []
+
+        def chunks():
+            for chunk in _chunks(100):
+                consumed.append(chunk)
+                yield chunk
+
+        document = stream_list(chunks())
+        self.assertLess(len(consumed), len(_chunks(100)))
+        self.assertEqual(50, len(list(document["items"])))
+
+    def test_empty_and_missing_items(self):
+        self.assertEqual([], list(stream_list([b'{"items": []}'])["items"]))
+        self.assertEqual([], list(stream_list([b'{"items": null}'])["items"]))
+        self.assertEqual([], list(stream_list([b"{}"])["items"]))
+
+    def test_truncated_document(self):
+        document = stream_list([b'{"items": [1, 2'])
+        with self.assertRaises(json.JSONDecodeError):
+            list(document["items"])
+
+    def test_loads_bytes(self):
+        self.assertEqual({"a": [1, None]}, loads(b'{"a": [1, null]}'))
@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+from kubemgr.util.lines import LineBuffer
+
+
+class LineBufferTestCase(TestCase):
+    def test_lines_split_across_chunks(self):
+        buffer = LineBuffer(10)
+        buffer.write(b"first\nsec")
+        self.assertEqual(["first"], buffer.get_lines())
+        buffer.write(b"ond\r\nthird")
+        self.assertEqual(["first", "second"], buffer.get_lines())
+        buffer.close()
+        self.assertEqual(["first", "second", "third"], buffer.get_lines())
+
+    def test_keeps_last_lines(self):
+        buffer = LineBuffer(3)
+        buffer.write(b"".join(f"line {i}\n".encode() for i in range(10)))
+        buffer.write(b"line 10\n")
+        self.assertEqual(["line 8", "line 9", "line 10"], buffer.get_lines())
+        self.assertEqual(8, buffer.discarded)
+
+    def test_version_changes_with_lines(self):
+        buffer = LineBuffer(3)
+        version = buffer.version
+        buffer.write(b"partial")
+        self.assertEqual(version, buffer.version)
+        buffer.write(b"\n")
+        self.assertNotEqual(version, buffer.version)
+
+    def test_invalid_utf8_is_replaced(self):
+        buffer = LineBuffer(3)
+        buffer.write(b"caf\xc3\n\xff\n")
+        self.assertEqual(["caf�", "�"], buffer.get_lines())
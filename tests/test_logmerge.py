@@ -0,0 +1,38 @@
+from unittest import TestCase
+
+from kubemgr.util.logmerge import LiveMerger, merge_lines, timestamp_key
+
+
+class LogMergeTestCase(TestCase):
+    def test_timestamp_key_pads_fractions(self):
+        self.assertLess(timestamp_key("2021-03-01T10:00:00.1Z"), timestamp_key("2021-03-01T10:00:00.12Z"))
+        self.assertLess(timestamp_key("2021-03-01T10:00:00Z"), timestamp_key("2021-03-01T10:00:00.000000001Z"))
+
+    def test_merge_in_timestamp_order(self):
+        web1 = ["2021-03-01T10:00:00.5Z started", "2021-03-01T10:00:02Z ready"]
+        web2 = ["2021-03-01T10:00:00.25Z started", "2021-03-01T10:00:01Z ready"]
+        self.assertEqual(
+            ["[web-2] started", "[web-1] started", "[web-2] ready", "[web-1] ready"],
+            list(merge_lines([("web-1", web1), ("web-2", web2)])),
+        )
+
+    def test_merge_keeping_timestamps(self):
+        lines = ["2021-03-01T10:00:00Z started", "Error reading logs: gone"]
+        self.assertEqual(
+            ["[web] 2021-03-01T10:00:00Z started", "[web] Error reading logs: gone"],
+            list(merge_lines([("web", lines)], timestamps=True)),
+        )
+
+    def test_live_merger_orders_held_lines(self):
+        released = []
+        merger = LiveMerger(released.extend, delay=60)
+        web1 = merger.source("web-1")
+        web2 = merger.source("web-2")
+        web1.write(b"2021-03-01T10:00:02Z second\n2021-03-01T10:00:0")
+        web2.write(b"2021-03-01T10:00:01Z first\n")
+        merger.flush()
+        self.assertEqual([], released)
+        web1.write(b"3Z third")
+        web1.close()
+        merger.flush(everything=True)
+        self.assertEqual(["[web-2] first", "[web-1] second", "[web-1] third"], released)
@@ -0,0 +1,45 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from kubemgr.util.mappedtext import MappedText
+
+
+class MappedTextTestCase(TestCase):
+    def _text(self, content: bytes) -> MappedText:
+        file = tempfile.NamedTemporaryFile(delete=False)
+        file.write(content)
+        file.close()
+        self.addCleanup(os.unlink, file.name)
+        text = MappedText(file.name)
+        self.addCleanup(text.close)
+        return text
+
+    def test_lines_are_indexed_incrementally(self):
+        text = self._text(b"".join(f"line {i}\r\n".encode() for i in range(1000)))
+        text.index(100)
+        self.assertFalse(text.complete)
+        self.assertEqual(12, text.line_count())
+        self.assertEqual("line 3", text.get_line(3))
+        self.assertEqual("line 999", text.get_line(999))
+        self.assertTrue(text.complete)
+        self.assertEqual(1000, text.line_count())
+
+    def test_last_line_without_new_line(self):
+        text = self._text("first\nsecond ñ".encode())
+        text.index_all()
+        self.assertEqual(2, text.line_count())
+        self.assertEqual("second ñ", text.get_line(1))
+
+    def test_find(self):
+        text = self._text(b"".join(f"line {i}\n".encode() for i in range(1000)))
+        self.assertEqual(500, text.find("line 500"))
+        self.assertEqual(500, text.find("line 500", 500))
+        self.assertIsNone(text.find("line 500", 501))
+        self.assertIsNone(text.find("missing"))
+
+    def test_empty_file(self):
+        text = self._text(b"")
+        self.assertFalse(text.index())
+        self.assertEqual(0, text.line_count())
+        self.assertIsNone(text.find("anything"))
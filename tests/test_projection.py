@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+from kubemgr.projection import Projection
+
+_POD = {
+    "metadata": {
+        "name": "web",
+        "namespace": "default",
+        "uid": "1",
+        "resourceVersion": "10",
+        "labels": {"app": "web"},
+        "managedFields": [{"manager": "kubectl"}],
+    },
+    "spec": {
+        "nodeName": "node-1",
+        "containers": [{"name": "main", "image": "nginx"}, {"name": "sidecar", "image": "envoy"}],
+    },
+    "status": {"phase": "Running"},
+}
+
+
+class ProjectionTestCase(TestCase):
+    def test_keeps_only_given_fields(self):
+        projected = Projection([("status", "phase"), ("spec", "containers", "name")])(_POD)
+        self.assertEqual(
+            {
+                "metadata": {"name": "web", "namespace": "default", "uid": "1", "resourceVersion": "10"},
+                "spec": {"containers": [{"name": "main"}, {"name": "sidecar"}]},
+                "status": {"phase": "Running"},
+            },
+            projected,
+        )
+
+    def test_shorter_path_keeps_whole_value(self):
+        projection = Projection([("metadata", "labels"), ("metadata", "labels", "app"), ("spec",)])
+        projected = projection(_POD)
+        self.assertEqual({"app": "web"}, projected["metadata"]["labels"])
+        self.assertEqual(_POD["spec"], projected["spec"])
+        self.assertNotIn("managedFields", projected["metadata"])
+
+    def test_equality(self):
+        self.assertEqual(Projection([("a", "b")]), Projection([("a", "b")]))
+        self.assertEqual(hash(Projection([("a", "b")])), hash(Projection([("a", "b")])))
+        self.assertNotEqual(Projection([("a", "b")]), Projection([("a",)]))
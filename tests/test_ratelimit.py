@@ -0,0 +1,56 @@
+import threading
+import time
+from unittest import TestCase
+
+from kubemgr.util.ratelimit import BACKGROUND, INTERACTIVE, RateLimiter
+
+
+class RateLimiterTestCase(TestCase):
+    def test_burst_then_rate(self):
+        limiter = RateLimiter(20, 5)
+        start = time.monotonic()
+        for _ in range(5):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.05)
+        for _ in range(4):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_interactive_goes_first(self):
+        limiter = RateLimiter(10, 1)
+        limiter.acquire()
+        order = []
+
+        def request(name, priority):
+            limiter.acquire(priority)
+            order.append(name)
+
+        background = [threading.Thread(target=request, args=(f"b{i}", BACKGROUND)) for i in range(2)]
+        for thread in background:
+            thread.start()
+        time.sleep(0.02)
+        interactive = threading.Thread(target=request, args=("i", INTERACTIVE))
+        interactive.start()
+        for thread in background + [interactive]:
+            thread.join()
+        self.assertEqual("i", order[0])
+
+    def test_adapts_to_throttling(self):
+        limiter = RateLimiter(20, 1, min_qps=4, increase=1)
+        limiter.throttled()
+        self.assertEqual(10, limiter.qps)
+        # Requests throttled together reduce the rate once
+        limiter.throttled()
+        self.assertEqual(10, limiter.qps)
+        limiter.succeeded()
+        self.assertEqual(11, limiter.qps)
+        for _ in range(20):
+            limiter.succeeded()
+        self.assertEqual(20, limiter.qps)
+
+    def test_waits_as_asked_by_server(self):
+        limiter = RateLimiter(100, 10)
+        limiter.throttled(retry_after=0.1)
+        start = time.monotonic()
+        limiter.acquire(INTERACTIVE)
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+from unittest import TestCase
+
+from kubemgr.views.renderer import ItemRenderer
+
+
+class _Template:
+    def __init__(self, text):
+        self._text = text
+        self.renders = 0
+
+    def render(self, item, width, **helpers):
+        self.renders += 1
+        return f"{self._text} {item['metadata']['name']}"
+
+
+def _pod(resource_version="1"):
+    return {"metadata": {"name": "web-1", "uid": "uid-web-1", "resourceVersion": resource_version}}
+
+
+def _view(width=80, mode="full"):
+    model = SimpleNamespace(resource_kind="Pod", mode=mode, columns=None)
+    return SimpleNamespace(_rect=SimpleNamespace(width=width), model=model)
+
+
+class ItemRendererTestCase(TestCase):
+    def setUp(self):
+        self.template = _Template("pod")
+        self.renderer = ItemRenderer(SimpleNamespace(get_item_template=lambda kind: self.template))
+
+    def test_reuses_unchanged_rows(self):
+        view = _view()
+        self.assertEqual("pod web-1", self.renderer(view, _pod()))
+        self.assertEqual("pod web-1", self.renderer(view, _pod()))
+        self.assertEqual(1, self.template.renders)
+
+    def test_renders_changed_rows_again(self):
+        self.renderer(_view(), _pod())
+
+        self.renderer(_view(), _pod("2"))
+        self.assertEqual(2, self.template.renders)
+
+        self.renderer(_view(width=100), _pod("2"))
+        self.assertEqual(3, self.template.renders)
+
+        self.renderer(_view(width=100, mode="metadata"), _pod("2"))
+        self.assertEqual(4, self.template.renders)
+
+        old_template = self.template
+        self.template = _Template("changed")
+        self.assertEqual("changed web-1", self.renderer(_view(width=100), _pod("2")))
+        self.assertEqual(1, self.template.renders)
+        self.assertEqual(4, old_template.renders)
+
+    def test_rows_without_uid_not_kept(self):
+        pod = _pod()
+        del pod["metadata"]["uid"]
+        self.renderer(_view(), pod)
+        self.renderer(_view(), pod)
+        self.assertEqual(2, self.template.renders)
@@ -0,0 +1,232 @@
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+from kubemgr.cluster import Cluster, ServiceError
+from kubemgr.views.resource import Filter, ResourceListModel
+from kubemgr.views.templates import TemplateStore
+from kubemgr.watch import ResourceWatcher
+
+
+def _pod(index, phase="Running"):
+    return {
+        "metadata": {"name": f"pod-{index}", "uid": f"uid-{index}", "resourceVersion": "1"},
+        "status": {"phase": phase},
+    }
+
+
+class _Task:
+    def run_now(self):
+        return True
+
+
+class _Application:
+    def __init__(self, config_dir):
+        self.templates = TemplateStore(config_dir, os.path.join(config_dir, "cache"))
+
+    def add_task(self, *args, **kwargs):
+        return _Task()
+
+
+class _Cluster:
+    connected = True
+
+    def __init__(self, pages, expired=0):
+        self._pages = pages
+        self._expired = expired
+        self.lists = 0
+
+    def do_list(self, *args, **kwargs):
+        self.lists += 1
+        if self.lists <= self._expired:
+            raise ServiceError(410, "Expired")
+        for index, items in enumerate(self._pages):
+            last = index == len(self._pages) - 1
+            yield {"metadata": {} if last else {"continue": str(index)}, "items": iter(items)}
+
+
+class _Informers:
+    def __init__(self, cluster):
+        self._cluster = cluster
+        self.watchers = []
+
+    def subscribe(self, *args):
+        watcher = ResourceWatcher(self._cluster, *args)
+        self.watchers.append(watcher)
+        return watcher
+
+    def release(self, watcher):
+        self.watchers.remove(watcher)
+
+
+class _WatchedCluster:
+    connected = True
+
+    def __init__(self):
+        self.informers = _Informers(self)
+
+    def get_resource(self, *args):
+        return {"verbs": ["list", "watch"]}
+
+
+_CORE_RESOURCES = {
+    "kind": "APIResourceList",
+    "groupVersion": "v1",
+    "resources": [{"name": "pods", "singularName": "pod", "namespaced": True, "kind": "Pod", "verbs": ["get", "list"]}],
+}
+
+_KUBECONFIG = """
+apiVersion: v1
+kind: Config
+clusters: [{{name: test, cluster: {{server: "http://127.0.0.1:{port}"}}}}]
+users: [{{name: test, user: {{token: test}}}}]
+contexts: [{{name: test, context: {{cluster: test, user: test}}}}]
+current-context: test
+"""
+
+
+class _ApiServer(BaseHTTPRequestHandler):
+    """
+    Serves pods, only their metadata when asked for partial object metadata.
+    """
+
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        accept = self.headers.get("Accept") or ""
+        self.requests.append((path, accept))
+        if path == "/api/v1/":
+            self._reply(_CORE_RESOURCES)
+        elif path == "/api/v1/namespaces/default/pods":
+            if "watch=1" in self.path:
+                metadata = {"kind": "PartialObjectMetadata", "metadata": _pod(0)["metadata"]}
+                self._reply({"type": "ADDED", "object": metadata if "as=PartialObjectMetadata" in accept else _pod(0)})
+            elif "as=PartialObjectMetadataList" in accept:
+                items = [{"kind": "PartialObjectMetadata", "metadata": _pod(0)["metadata"]}]
+                self._reply({"kind": "PartialObjectMetadataList", "metadata": {"resourceVersion": "5"}, "items": items})
+            else:
+                self._reply({"kind": "PodList", "metadata": {"resourceVersion": "5"}, "items": [_pod(0)]})
+        elif path == "/api/v1/pods/pod-0":
+            self._reply(dict(_pod(0), kind="Pod"))
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def _reply(self, document):
+        body = json.dumps(document).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ResourceListModelTestCase(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.application = _Application(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _model(self, cluster, filter_string=None):
+        model = ResourceListModel(self.application, "Pod", watch=False)
+        model.cluster = cluster
+        if filter_string:
+            model.filter = Filter(filter_string, self.application.templates)
+        return model
+
+    def test_list_filters_every_page(self):
+        pages = [[_pod(0), _pod(1, "Failed")], [_pod(2), _pod(3, "Failed")]]
+        model = self._model(_Cluster(pages), "{{ item.status.phase == 'Running' }}")
+        partial = []
+        model._publish_partial = partial.append
+
+        items = model.fetch_data()
+        self.assertEqual(["pod-0", "pod-2"], [item["metadata"]["name"] for item in items])
+        self.assertEqual([["pod-0"]], [[item["metadata"]["name"] for item in p] for p in partial])
+
+    def test_expired_list_is_retried(self):
+        cluster = _Cluster([[_pod(0)]], expired=2)
+        items = self._model(cluster).fetch_data()
+        self.assertEqual(1, len(items))
+        self.assertEqual(3, cluster.lists)
+
+    def test_expired_list_retries_are_limited(self):
+        cluster = _Cluster([[_pod(0)]], expired=100)
+        self.assertEqual([], self._model(cluster).fetch_data())
+        self.assertEqual(4, cluster.lists)
+
+    def test_watcher_released_with_cluster(self):
+        cluster = _WatchedCluster()
+        model = ResourceListModel(self.application, "Pod")
+        model.cluster = cluster
+        self.assertEqual([], model.fetch_data())
+        self.assertEqual(1, len(cluster.informers.watchers))
+
+        model.cluster = None
+        self.assertEqual([], cluster.informers.watchers)
+
+
+class MetadataOnlyListTestCase(TestCase):
+    def setUp(self):
+        _ApiServer.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ApiServer)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        config_file = os.path.join(self.temp_dir.name, "kubeconfig")
+        with open(config_file, "w") as f:
+            f.write(_KUBECONFIG.format(port=self.server.server_port))
+        self.cluster = Cluster(None, "test", config_file)
+        self.cluster._create_connection()
+        self.application = _Application(self.temp_dir.name)
+
+    def tearDown(self):
+        self.cluster.disconnect()
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def test_list_requests_metadata(self):
+        model = ResourceListModel(self.application, "Pod", watch=False, metadata_only=True)
+        model.cluster = self.cluster
+        model.namespace = "default"
+        model.filter = Filter("{{ item.metadata.name == 'pod-0' }}", self.application.templates)
+
+        items = model.fetch_data()
+        self.assertEqual([{"kind": "PartialObjectMetadata", "metadata": _pod(0)["metadata"]}], items)
+        path, accept = _ApiServer.requests[-1]
+        self.assertEqual("/api/v1/namespaces/default/pods", path)
+        self.assertTrue(accept.startswith("application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1"))
+
+        # Viewing or editing needs the whole object
+        self.assertEqual({"phase": "Running"}, model.get_full_item(items[0])["status"])
+        self.assertNotIn("PartialObjectMetadata", _ApiServer.requests[-1][1])
+
+    def test_watch_requests_metadata(self):
+        events = self.cluster.do_watch("v1", "Pod", namespace="default", metadata_only=True)
+        try:
+            event = next(events)
+        finally:
+            events.close()
+        self.assertEqual({"kind": "PartialObjectMetadata", "metadata": _pod(0)["metadata"]}, event["object"])
+        self.assertTrue(_ApiServer.requests[-1][1].startswith("application/json;as=PartialObjectMetadata;g=meta.k8s.io;v=v1"))
+
+    def test_full_list_requests_objects(self):
+        model = ResourceListModel(self.application, "Pod", watch=False)
+        model.cluster = self.cluster
+        model.namespace = "default"
+
+        items = model.fetch_data()
+        self.assertEqual([_pod(0)], items)
+        self.assertNotIn("PartialObjectMetadata", _ApiServer.requests[-1][1])
+        self.assertIs(items[0], model.get_full_item(items[0]))
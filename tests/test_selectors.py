@@ -0,0 +1,65 @@
+from unittest import TestCase
+
+from kubemgr.views.selectors import combine, from_label_selector, translate
+
+
+class SelectorsTestCase(TestCase):
+    def test_labels_and_fields(self):
+        self.assertEqual(
+            ("app=web", "status.phase=Running"),
+            translate("{{ item.metadata.labels.app == 'web' and item.status.phase == 'Running' }}", "Pod"),
+        )
+
+    def test_unsupported_field_for_kind(self):
+        self.assertEqual((None, None), translate("{{ item.status.phase == 'Running' }}", "Deployment"))
+        self.assertEqual((None, "metadata.name=a"), translate("{{ item.metadata.name == 'a' }}", "Deployment"))
+
+    def test_label_item_access(self):
+        self.assertEqual(
+            ("app.kubernetes.io/name!=web", None),
+            translate("{{ item.metadata.labels['app.kubernetes.io/name'] != 'web' }}"),
+        )
+
+    def test_invalid_label_values(self):
+        for value in ["a/b", "-web", "web-", "a" * 64, "a b"]:
+            self.assertEqual((None, None), translate(f"{{{{ item.metadata.labels.app == '{value}' }}}}"))
+        self.assertEqual((f"app={'a' * 63}", None), translate(f"{{{{ item.metadata.labels.app == '{'a' * 63}' }}}}"))
+        self.assertEqual(("app=", None), translate("{{ item.metadata.labels.app == '' }}"))
+
+    def test_invalid_label_keys(self):
+        for key in ["a b", "-app", "app-", "a" * 64, "/app", "Example.com/app", "example..com/app", "a/b/c", ""]:
+            self.assertEqual((None, None), translate(f"{{{{ item.metadata.labels['{key}'] == 'web' }}}}"), key)
+        for key in ["a" * 63, "example.com/a_b.c", "k8s.io/" + "a" * 63]:
+            self.assertEqual((f"{key}=web", None), translate(f"{{{{ item.metadata.labels['{key}'] == 'web' }}}}"), key)
+
+    def test_partial_translation(self):
+        self.assertEqual(
+            ("app=web", None),
+            translate("{#comment#}\n{{ item.metadata.labels.app == 'web' and item.spec.replicas > 2 }}\n"),
+        )
+
+    def test_not_translatable(self):
+        self.assertEqual((None, None), translate("{{ True }}"))
+        self.assertEqual((None, None), translate("{{ item.metadata.labels.app == 'web' or item.metadata.name == 'a' }}"))
+        self.assertEqual((None, None), translate("{% if x %}{{ item.metadata.name == 'a' }}{% endif %}"))
+
+    def test_directives(self):
+        self.assertEqual(
+            ("app=web", "status.phase=Running"),
+            translate("{# labelSelector: app=web #}\n{# fieldSelector: status.phase=Running #}\n{{ True }}"),
+        )
+
+    def test_combine(self):
+        self.assertEqual("a=1,b=2", combine("a=1", None, "b=2"))
+        self.assertIsNone(combine(None, None))
+
+    def test_from_label_selector(self):
+        selector = {
+            "matchLabels": {"app": "web"},
+            "matchExpressions": [
+                {"key": "tier", "operator": "In", "values": ["front", "back"]},
+                {"key": "canary", "operator": "DoesNotExist"},
+            ],
+        }
+        self.assertEqual("app=web,tier in (front,back),!canary", from_label_selector(selector))
+        self.assertIsNone(from_label_selector({}))
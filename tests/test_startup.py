@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+# Modules which take long to import, and are only imported when used
+LAZY_MODULES = ["kubernetes", "yaml", "jinja2"]
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StartupTestCase(TestCase):
+    def test_heavy_modules_not_imported_at_startup(self):
+        # Run elsewhere, as importing the application creates its log file in the current directory
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [_ROOT_DIR, env.get("PYTHONPATH")]))
+        with tempfile.TemporaryDirectory() as work_dir:
+            output = subprocess.check_output(
+                [
+                    sys.executable,
+                    "-c",
+                    "import sys, kubemgr.main; print(' '.join(m for m in sys.modules if '.' not in m))",
+                ],
+                universal_newlines=True,
+                cwd=work_dir,
+                env=env,
+            )
+        imported = output.split()
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, imported)
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from kubemgr.table import table_events, table_items, visible_columns
+
+_COLUMNS = [
+    {"name": "Name", "type": "string", "format": "name", "priority": 0},
+    {"name": "Ready", "type": "string", "priority": 0},
+    {"name": "Restarts", "type": "integer", "priority": 0},
+    {"name": "IP", "type": "string", "priority": 1},
+]
+
+
+def _row(name, resource_version):
+    return {
+        "cells": [name, "1/1", 0, "10.0.0.1"],
+        "object": {
+            "kind": "PartialObjectMetadata",
+            "apiVersion": "meta.k8s.io/v1",
+            "metadata": {"name": name, "uid": name, "resourceVersion": resource_version},
+        },
+    }
+
+
+class TableTestCase(TestCase):
+    def test_rows_become_items(self):
+        table = {"kind": "Table", "columnDefinitions": _COLUMNS, "rows": [_row("web", "5")], "metadata": {}}
+        self.assertEqual(
+            [
+                {
+                    "metadata": {"name": "web", "uid": "web", "resourceVersion": "5"},
+                    "columns": {"Name": "web", "Ready": "1/1", "Restarts": 0, "IP": "10.0.0.1"},
+                }
+            ],
+            table_items(table),
+        )
+
+    def test_watch_events_reuse_first_columns(self):
+        events = [
+            {"type": "ADDED", "object": {"kind": "Table", "columnDefinitions": _COLUMNS, "rows": [_row("a", "1")]}},
+            {"type": "MODIFIED", "object": {"kind": "Table", "columnDefinitions": None, "rows": [_row("a", "2")]}},
+            {"type": "BOOKMARK", "object": {"kind": "Table", "metadata": {"resourceVersion": "3"}, "rows": []}},
+            {"type": "ERROR", "object": {"kind": "Status", "code": 410}},
+        ]
+        converted = list(table_events(iter(events)))
+        self.assertEqual(["ADDED", "MODIFIED", "BOOKMARK", "ERROR"], [e["type"] for e in converted])
+        self.assertEqual("2", converted[1]["object"]["metadata"]["resourceVersion"])
+        self.assertEqual("1/1", converted[1]["object"]["columns"]["Ready"])
+        self.assertEqual({"metadata": {"resourceVersion": "3"}}, converted[2]["object"])
+        self.assertEqual(410, converted[3]["object"]["code"])
+
+    def test_visible_columns(self):
+        self.assertEqual(["Name", "Ready", "Restarts"], [c["name"] for c in visible_columns(_COLUMNS)])
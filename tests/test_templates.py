@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from kubemgr.views.templates import TemplateStore
+
+
+class TemplateStoreTestCase(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config_dir = self.temp_dir.name
+        self.cache_dir = os.path.join(self.config_dir, "cache")
+        os.makedirs(os.path.join(self.config_dir, "item-templates"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write(self, kind, text, mtime=None):
+        path = os.path.join(self.config_dir, "item-templates", f"{kind}.tpl")
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime:
+            os.utime(path, (mtime, mtime))
+
+    def test_uses_helpers_as_globals(self):
+        self._write("Pod", "{{ fill(item.metadata.name, 5) }}|")
+        store = TemplateStore(self.config_dir, self.cache_dir)
+        template = store.get_item_template("Pod")
+        self.assertEqual("abc  |", template.render(item={"metadata": {"name": "abc"}}))
+        self.assertTrue(os.listdir(self.cache_dir))
+
+    def test_missing_template(self):
+        store = TemplateStore(self.config_dir, self.cache_dir)
+        self.assertIsNone(store.get_item_template("Pod"))
+        self.assertIsNone(store.get_detail_template("Pod"))
+
+    def test_reloads_changed_template(self):
+        self._write("Pod", "one", time.time() - 10)
+        store = TemplateStore(self.config_dir, self.cache_dir, check_interval=0)
+        template = store.get_item_template("Pod")
+        self.assertEqual("one", template.render())
+        self.assertIs(template, store.get_item_template("Pod"))
+
+        self._write("Pod", "two")
+        self.assertEqual("two", store.get_item_template("Pod").render())
+
+    def test_dict_attributes(self):
+        self._write("ConfigMap", "{{ item.data.keys()|list|length }} {{ item.data.a }}")
+        store = TemplateStore(self.config_dir, self.cache_dir)
+        template = store.get_item_template("ConfigMap")
+        self.assertEqual("2 1", template.render(item={"data": {"a": 1, "keys": 2}}))
+
+    def test_item_fields(self):
+        self._write("Pod", "{{ item.metadata.labels.items()|list }}{% for c in item.spec.containers %}{{ c }}{% endfor %}")
+        self._write("Secret", "{{ item }}")
+        store = TemplateStore(self.config_dir, self.cache_dir)
+        self.assertEqual({("metadata", "labels"), ("spec", "containers")}, store.get_item_fields("Pod"))
+        self.assertIsNone(store.get_item_fields("Secret"))
+        self.assertEqual(frozenset(), store.get_item_fields("Node"))
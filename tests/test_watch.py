@@ -0,0 +1,139 @@
+import threading
+import time
+from unittest import TestCase
+
+from kubemgr.cluster import ServiceError
+from kubemgr.watch import ResourceWatcher
+
+
+def _pod(name, resource_version="1"):
+    return {"metadata": {"name": name, "namespace": "default", "uid": name, "resourceVersion": resource_version}}
+
+
+def _names(watcher):
+    return [item["metadata"]["name"] for item in watcher.get_items()]
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.01)
+
+
+class _Events:
+    """
+    Watch events, when follow is True the stream then waits until closed,
+    like a watch with no more changes.
+    """
+
+    def __init__(self, events, follow):
+        self._events = events
+        self._follow = follow
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        yield from self._events
+        if self._follow:
+            self.closed.wait(10)
+
+    def close(self):
+        self.closed.set()
+
+
+class _Cluster:
+    """
+    Returns the given lists, as (resourceVersion, items), and watch events
+    in turn. Once those run out, watches wait until closed.
+    """
+
+    def __init__(self, lists, watches=(), error=None):
+        self._lists = lists
+        self._watches = list(watches)
+        self._error = error
+        self.lists = 0
+        self.watches = []
+        self.streams = []
+
+    def do_list(self, *args, **kwargs):
+        self.lists += 1
+        if self._error:
+            raise self._error
+        resource_version, items = self._lists[min(self.lists, len(self._lists)) - 1]
+        yield {"metadata": {"resourceVersion": resource_version}, "items": iter(items)}
+
+    def do_watch(self, *args, resource_version=None, **kwargs):
+        self.watches.append(resource_version)
+        if self._watches:
+            events = _Events(self._watches.pop(0), follow=False)
+        else:
+            events = _Events([], follow=True)
+        self.streams.append(events)
+        return events
+
+
+class ResourceWatcherTestCase(TestCase):
+    def setUp(self):
+        self.watcher = None
+
+    def tearDown(self):
+        if self.watcher:
+            self.watcher.stop()
+
+    def _start(self, cluster):
+        self.watcher = ResourceWatcher(cluster, "v1", "Pod")
+        self.watcher.start()
+        return self.watcher
+
+    def test_added_and_deleted(self):
+        events = [
+            {"type": "ADDED", "object": _pod("c", "2")},
+            {"type": "DELETED", "object": _pod("a", "3")},
+            {"type": "MODIFIED", "object": _pod("b", "4")},
+        ]
+        cluster = _Cluster([("1", [_pod("a"), _pod("b")])], [events])
+        watcher = self._start(cluster)
+
+        _wait_for(lambda: _names(watcher) == ["b", "c"])
+        self.assertEqual("4", watcher.get_items()[0]["metadata"]["resourceVersion"])
+        self.assertEqual([], watcher.get_items("other"))
+
+    def test_bookmark_updates_resource_version(self):
+        bookmark = {"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "5"}}}
+        cluster = _Cluster([("1", [_pod("a")])], [[bookmark]])
+        watcher = self._start(cluster)
+
+        _wait_for(lambda: len(cluster.watches) == 2)
+        self.assertEqual(["1", "5"], cluster.watches)
+        self.assertEqual(["a"], _names(watcher))
+        self.assertEqual(1, cluster.lists)
+
+    def test_expired_resource_version_lists_again(self):
+        expired = {"type": "ERROR", "object": {"code": 410, "message": "too old resource version"}}
+        cluster = _Cluster([("1", [_pod("a")]), ("7", [_pod("b", "7")])], [[expired]])
+        watcher = self._start(cluster)
+
+        _wait_for(lambda: len(cluster.watches) == 2)
+        self.assertEqual(["1", "7"], cluster.watches)
+        self.assertEqual(["b"], _names(watcher))
+
+    def test_stop_closes_stream(self):
+        cluster = _Cluster([("1", [_pod("a")])])
+        watcher = self._start(cluster)
+        _wait_for(lambda: cluster.streams)
+
+        watcher.stop()
+        self.assertTrue(cluster.streams[0].closed.is_set())
+        watcher._thread.join(1)
+        self.assertFalse(watcher._thread.is_alive())
+        self.assertEqual(1, len(cluster.watches))
+
+    def test_forbidden_stops(self):
+        cluster = _Cluster([], error=ServiceError(403, "Forbidden"))
+        watcher = self._start(cluster)
+
+        watcher._thread.join(1)
+        self.assertFalse(watcher._thread.is_alive())
+        self.assertTrue(watcher.forbidden)
+        self.assertEqual(1, cluster.lists)